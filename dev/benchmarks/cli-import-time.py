@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Measure how long importing the CLI module takes, using `python -X importtime`,
+and list the slowest imports.
+
+Must be run from the project root dir, e.g.:
+
+  PYTHONPATH=. python3 dev/benchmarks/cli-import-time.py --module \\
+    fooddata_vegattributes.app.generate
+"""
+from argparse import ArgumentParser
+import re
+import subprocess
+import sys
+from typing import List, Tuple
+
+
+IMPORTTIME_LINE_RE = re.compile(
+  r"^import time:\s*(\d+) \|\s*(\d+) \|( *)(\S+)$"
+)
+
+def measure_import(module: str) -> List[Tuple[int, int, str]]:
+  """
+  Returns `(self µs, cumulative µs, module name)` for each module imported by
+  importing `module` in a new interpreter.
+  """
+  stderr = subprocess.run(
+    [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+    check=True,
+    capture_output=True,
+    text=True,
+  ).stderr
+  result = []
+  for line in stderr.splitlines():
+    match = IMPORTTIME_LINE_RE.match(line)
+    if match is not None:
+      self_us, cumulative_us, _, name = match.groups()
+      result.append((int(self_us), int(cumulative_us), name))
+  return result
+
+def main():
+  arg_parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+  arg_parser.add_argument(
+    "--module", default="fooddata_vegattributes.app.cli",
+  )
+  arg_parser.add_argument("--n-runs", type=int, default=5)
+  arg_parser.add_argument("--n-slowest", type=int, default=10)
+  args = arg_parser.parse_args()
+
+  # the first run populates bytecode caches, so it's not counted
+  measure_import(args.module)
+  runs = [measure_import(args.module) for _ in range(args.n_runs)]
+  totals = sorted(
+    next(cumulative for _, cumulative, name in run if name == args.module)
+    for run in runs
+  )
+  print(
+    f"importing {args.module}: {totals[len(totals) // 2] / 1000:.1f} ms"
+    f" (median of {args.n_runs}), {len(runs[0])} modules"
+  )
+  own_modules = [
+    x for x in runs[0] if x[2].startswith("fooddata_vegattributes")
+  ]
+  print(f"slowest of this package's {len(own_modules)} modules (cumulative):")
+  own_modules.sort(key=lambda x: x[1], reverse=True)
+  for _, cumulative_us, name in own_modules[:args.n_slowest]:
+    print(f"  {cumulative_us / 1000:>7.1f} ms  {name}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Compare encoded size and decode throughput of the available entry codecs.
+
+Uses real FoodData entries if the FDC survey JSON file is given and synthetic
+ones otherwise. Must be run from the project root dir, e.g.:
+
+  PYTHONPATH=. python3 dev/benchmarks/entry-codecs.py \\
+    --survey-json FoodData_Central_survey_food_json_2021-10-28.json
+"""
+from argparse import ArgumentParser
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+
+from fooddata_vegattributes.fooddata import iter_survey_fooddata_dicts
+from fooddata_vegattributes.utils.indexed_jsonable_store import entry_codec
+from fooddata_vegattributes.utils.indexed_jsonable_store.entry_codec import (
+  EntryCodec, get_codec_impl,
+)
+
+from synthetic_fooddata import make_food_dicts
+
+
+def main():
+  arg_parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+  arg_parser.add_argument("--survey-json", type=Path)
+  arg_parser.add_argument("--n-foods", type=int, default=5000)
+  args = arg_parser.parse_args()
+
+  if args.survey_json is not None:
+    food_ds = list(
+      islice(iter_survey_fooddata_dicts(args.survey_json), args.n_foods)
+    )
+    source = "real"
+  else:
+    food_ds = make_food_dicts(args.n_foods)
+    source = "synthetic"
+  print(
+    f"{len(food_ds)} {source} foods"
+    f" (orjson {'' if entry_codec.orjson is not None else 'not '}installed)"
+  )
+  print(f"{'codec':>13}  {'avg bytes':>9}  {'entries/s':>9}  {'MB/s':>6}")
+  for codec in EntryCodec:
+    impl = get_codec_impl(codec)
+    encoded = [impl.encode(d) for d in food_ds]
+    n_bytes = sum(len(e) for e in encoded)
+    start = perf_counter()
+    for e in encoded:
+      impl.decode(e)
+    t = perf_counter() - start
+    print(
+      f"{codec.value:>13}  {n_bytes / len(encoded):>9.0f}"
+      f"  {len(encoded) / t:>9.0f}  {n_bytes / t / 1e6:>6.1f}"
+    )
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Measure the memory taken up per food by `Food` objects and by a `FoodTable`.
+
+Uses real FoodData entries if the FDC survey JSON file is given and synthetic
+ones otherwise. Must be run from the project root dir, e.g.:
+
+  PYTHONPATH=. python3 dev/benchmarks/food-memory.py --n-foods 20000
+"""
+from argparse import ArgumentParser
+from itertools import islice
+from pathlib import Path
+import tracemalloc
+
+from fooddata_vegattributes.food import Food
+from fooddata_vegattributes.food_table import FoodTable
+from fooddata_vegattributes.fooddata import iter_survey_fooddata_dicts
+
+from synthetic_fooddata import make_food_dicts
+
+
+def measure_bytes(func):
+  """
+  Returns the result of `func()` and the memory allocated for it.
+  """
+  tracemalloc.start()
+  try:
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    return result, tracemalloc.get_traced_memory()[0] - before
+  finally:
+    tracemalloc.stop()
+
+def main():
+  arg_parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+  arg_parser.add_argument("--survey-json", type=Path)
+  arg_parser.add_argument("--n-foods", type=int, default=20000)
+  args = arg_parser.parse_args()
+
+  if args.survey_json is not None:
+    food_ds = list(
+      islice(iter_survey_fooddata_dicts(args.survey_json), args.n_foods)
+    )
+    source = "real"
+  else:
+    food_ds = make_food_dicts(args.n_foods)
+    source = "synthetic"
+  n_inputs = sum(len(d["inputFoods"]) for d in food_ds)
+  print(
+    f"{len(food_ds)} {source} foods, {n_inputs / len(food_ds):.1f} input"
+    " foods each on average"
+  )
+  # strings are shared with the FoodData dicts, so only the containers'
+  # overhead is measured
+  foods, foods_bytes = measure_bytes(
+    lambda: [Food.from_fdc_food_dict(d) for d in food_ds]
+  )
+  _, table_bytes = measure_bytes(lambda: FoodTable.from_foods(foods))
+  print(f"{'container':>13}  {'bytes/food':>10}")
+  print(f"{'list of Food':>13}  {foods_bytes / len(foods):>10.0f}")
+  print(f"{'FoodTable':>13}  {table_bytes / len(foods):>10.0f}")
+
+if __name__ == "__main__":
+  main()
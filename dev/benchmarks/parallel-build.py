@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark building the compressed indexed FoodData file with different numbers
+of encoding/compression processes.
+
+Must be run from the project root dir, e.g.:
+
+  PYTHONPATH=. python3 dev/benchmarks/parallel-build.py --n-foods 20000
+"""
+from argparse import ArgumentParser
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from fooddata_vegattributes.compressed_indexed_fooddata import (
+  CompressedIndexedFoodDataJson,
+)
+from fooddata_vegattributes.utils.indexed_jsonable_store import StoreFormat
+
+from synthetic_fooddata import make_food_dicts
+
+
+def time_build(path: Path, food_ds, format: StoreFormat, jobs: int) -> float:
+  start = perf_counter()
+  with CompressedIndexedFoodDataJson.from_path(
+    path, "w", format=format, build_jobs=jobs
+  ) as cifj:
+    cifj.write_fooddata_dicts(food_ds)
+  return perf_counter() - start
+
+def main():
+  arg_parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+  arg_parser.add_argument("--n-foods", type=int, default=10000)
+  arg_parser.add_argument(
+    "--format", type=StoreFormat, choices=list(StoreFormat),
+    default=StoreFormat.ZIP,
+  )
+  arg_parser.add_argument(
+    "--max-jobs", type=int, default=os.cpu_count() or 1,
+  )
+  args = arg_parser.parse_args()
+
+  food_ds = make_food_dicts(args.n_foods)
+  jobs_to_try = sorted(
+    {1, args.max_jobs}
+    | {2**i for i in range(args.max_jobs.bit_length()) if 2**i < args.max_jobs}
+  )
+  print(f"{args.n_foods} foods, format {args.format.value}")
+  print(f"{'jobs':>4}  {'seconds':>8}  {'speedup':>7}")
+  with TemporaryDirectory() as tmp_dir:
+    serial_time = None
+    for jobs in jobs_to_try:
+      t = time_build(Path(tmp_dir)/f"build-{jobs}", food_ds, args.format, jobs)
+      if serial_time is None:
+        serial_time = t
+      print(f"{jobs:>4}  {t:>8.2f}  {serial_time / t:>6.2f}x")
+
+if __name__ == "__main__":
+  main()
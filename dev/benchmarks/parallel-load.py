@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compare wall-clock time of loading the FDC JSON files serially and with
+different numbers of parsing processes.
+
+Uses the real FDC files if both are given and synthetic ones otherwise. Must
+be run from the project root dir, e.g.:
+
+  PYTHONPATH=. python3 dev/benchmarks/parallel-load.py --n-foods 20000
+"""
+from argparse import ArgumentParser
+import json
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from fooddata_vegattributes.auto_indexed_fooddata_food_store import (
+  load_all_fooddata_dicts,
+)
+
+from synthetic_fooddata import make_food_dicts
+
+
+def write_synthetic_jsons(tmp_dir: Path, n_foods: int):
+  survey_ds = make_food_dicts(n_foods, seed=0)
+  sr_legacy_ds = make_food_dicts(n_foods, seed=1)
+  for d in sr_legacy_ds:
+    d["ndbNumber"] = d.pop("foodCode")
+    d["foodCategory"] = {
+      "description": d.pop("wweiaFoodCategory")["wweiaFoodCategoryDescription"]
+    }
+  survey_path = tmp_dir/"survey.json"
+  sr_legacy_path = tmp_dir/"sr_legacy.json"
+  survey_path.write_text(json.dumps({"SurveyFoods": survey_ds}))
+  sr_legacy_path.write_text(json.dumps({"SRLegacyFoods": sr_legacy_ds}))
+  return survey_path, sr_legacy_path
+
+def main():
+  arg_parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+  arg_parser.add_argument("--survey-json", type=Path)
+  arg_parser.add_argument("--sr-legacy-json", type=Path)
+  arg_parser.add_argument("--n-foods", type=int, default=10000)
+  arg_parser.add_argument(
+    "--max-jobs", type=int, default=os.cpu_count() or 1,
+  )
+  args = arg_parser.parse_args()
+
+  jobs_to_try = sorted(
+    {1, args.max_jobs}
+    | {2**i for i in range(args.max_jobs.bit_length()) if 2**i < args.max_jobs}
+  )
+  with TemporaryDirectory() as tmp_dir:
+    if args.survey_json is not None and args.sr_legacy_json is not None:
+      survey_path, sr_legacy_path = args.survey_json, args.sr_legacy_json
+      source = "real"
+    else:
+      survey_path, sr_legacy_path = write_synthetic_jsons(
+        Path(tmp_dir), args.n_foods
+      )
+      source = "synthetic"
+    n_bytes = survey_path.stat().st_size + sr_legacy_path.stat().st_size
+    print(f"{n_bytes / 1e6:.0f} MB of {source} FDC JSON")
+    print(f"{'jobs':>4}  {'seconds':>8}  {'speedup':>7}")
+    serial_time = None
+    for jobs in jobs_to_try:
+      start = perf_counter()
+      n_foods = sum(
+        1 for _ in load_all_fooddata_dicts(
+          survey_path, sr_legacy_path, jobs=jobs
+        )
+      )
+      t = perf_counter() - start
+      if serial_time is None:
+        serial_time = t
+      print(
+        f"{jobs:>4}  {t:>8.2f}  {serial_time / t:>6.2f}x  ({n_foods} foods)"
+      )
+
+if __name__ == "__main__":
+  main()
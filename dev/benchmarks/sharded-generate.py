@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Compare wall-clock time of categorizing all foods in one process and sharded
+across different numbers of processes, as `generate --jobs N` does.
+
+Uses synthetic foods, some of whose input foods refer to other foods so that
+there is an ingredient graph to traverse. Must be run from the project root
+dir, e.g.:
+
+  PYTHONPATH=. python3 dev/benchmarks/sharded-generate.py --n-foods 20000
+"""
+from argparse import ArgumentParser
+import os
+from pathlib import Path
+import random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from fooddata_vegattributes.auto_indexed_fooddata import (
+  auto_compressed_indexed_fooddata_json,
+)
+from fooddata_vegattributes.categorization import Categorizer
+from fooddata_vegattributes.csv_reference_sample_store import (
+  CsvReferenceSampleStore,
+)
+from fooddata_vegattributes.food import Food
+from fooddata_vegattributes.indexed_fooddata_food_store import (
+  IndexedFoodDataFoodStore,
+)
+from fooddata_vegattributes.sharded_categorization import (
+  categorize_all_sharded,
+)
+
+from synthetic_fooddata import make_food_dicts
+
+
+def make_food_dicts_with_graph(n_foods: int):
+  food_ds = make_food_dicts(n_foods, seed=0)
+  rng = random.Random(1)
+  for i, d in enumerate(food_ds):
+    for input_food_d in d["inputFoods"]:
+      # only refer to earlier foods so the graph stays acyclic
+      if i and rng.random() < 0.5:
+        input_food_d["ingredientCode"] = food_ds[rng.randrange(i)]["foodCode"]
+  return food_ds
+
+def main():
+  arg_parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+  arg_parser.add_argument("--n-foods", type=int, default=10000)
+  arg_parser.add_argument(
+    "--max-jobs", type=int, default=os.cpu_count() or 1,
+  )
+  args = arg_parser.parse_args()
+
+  jobs_to_try = sorted(
+    {1, args.max_jobs}
+    | {2**i for i in range(args.max_jobs.bit_length()) if 2**i < args.max_jobs}
+  )
+  with TemporaryDirectory() as tmp_dir:
+    archive_path = Path(tmp_dir)/"archive.zip"
+    reference_samples_path = Path(tmp_dir)/"reference_samples.csv"
+    food_ds = make_food_dicts_with_graph(args.n_foods)
+    with auto_compressed_indexed_fooddata_json(archive_path, lambda: food_ds):
+      pass
+    foods = [Food.from_fdc_food_dict(d) for d in food_ds]
+    del food_ds
+
+    print(f"{len(foods)} synthetic foods")
+    print(f"{'jobs':>4}  {'seconds':>8}  {'speedup':>7}")
+    serial_time = None
+    serial_result = None
+    for jobs in jobs_to_try:
+      start = perf_counter()
+      if jobs == 1:
+        with IndexedFoodDataFoodStore.from_path(archive_path) as food_store, (
+          CsvReferenceSampleStore.from_path_and_food_store(
+            reference_samples_path, food_store, create=True
+          )
+        ) as reference_sample_store:
+          result = Categorizer(
+            reference_sample_store=reference_sample_store,
+            food_store=food_store,
+          ).categorize_all(foods)
+      else:
+        result = categorize_all_sharded(
+          foods, archive_path, reference_samples_path, jobs=jobs
+        )
+      t = perf_counter() - start
+      if serial_time is None:
+        serial_time, serial_result = t, result
+      assert result == serial_result
+      print(f"{jobs:>4}  {t:>8.2f}  {serial_time / t:>6.2f}x")
+
+if __name__ == "__main__":
+  main()
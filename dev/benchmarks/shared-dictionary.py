@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Compare file size and per-entry decode latency of stores with and without a
+shared compression dictionary.
+
+Must be run from the project root dir, e.g.:
+
+  PYTHONPATH=. python3 dev/benchmarks/shared-dictionary.py --n-foods 20000
+"""
+from argparse import ArgumentParser
+from pathlib import Path
+import random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from fooddata_vegattributes.compressed_indexed_fooddata import (
+  CompressedIndexedFoodDataJson,
+)
+from fooddata_vegattributes.utils.indexed_jsonable_store import StoreFormat
+
+from synthetic_fooddata import make_food_dicts
+
+
+def main():
+  arg_parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+  arg_parser.add_argument("--n-foods", type=int, default=10000)
+  arg_parser.add_argument("--n-lookups", type=int, default=5000)
+  args = arg_parser.parse_args()
+
+  food_ds = make_food_dicts(args.n_foods)
+  fdc_ids = [d["fdcId"] for d in food_ds]
+  lookups = random.Random(0).choices(fdc_ids, k=args.n_lookups)
+  print(f"{args.n_foods} foods, {args.n_lookups} lookups (uncached)")
+  print(
+    f"{'format':>6}  {'dictionary':>10}  {'size (KiB)':>10}  {'µs/entry':>8}"
+  )
+  with TemporaryDirectory() as tmp_dir:
+    for format in [StoreFormat.ZIP, StoreFormat.PACKED]:
+      for shared_dictionary in [False, True]:
+        path = Path(tmp_dir)/f"{format.value}-{shared_dictionary}"
+        with CompressedIndexedFoodDataJson.from_path(
+          path, "w", format=format, shared_dictionary=shared_dictionary
+        ) as cifj:
+          cifj.write_fooddata_dicts(food_ds)
+        with CompressedIndexedFoodDataJson.from_path(
+          path, format=format
+        ) as cifj:
+          bytes_store = cifj.indexed_json.indexable_jsonable_store.bytes_store
+          # measure raw store reads (decompression included) rather than JSON
+          # parsing, which is the same in both cases
+          start = perf_counter()
+          for fdc_id in lookups:
+            bytes_store._get_entry_no_resolve("fdc-id", str(fdc_id))
+          t = perf_counter() - start
+        print(
+          f"{format.value:>6}  {str(shared_dictionary):>10}"
+          f"  {path.stat().st_size / 1024:>10.0f}"
+          f"  {t / args.n_lookups * 1e6:>8.1f}"
+        )
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,56 @@
+"""
+Synthetic FoodData-like dicts for benchmarks that shouldn't depend on the real
+(large) FDC downloads.
+"""
+import random
+from typing import Any, Dict, List
+
+
+WORDS = [
+  "beef", "chicken", "milk", "cheese", "bread", "rice", "bean", "tomato",
+  "egg", "pork", "salmon", "tofu", "apple", "butter", "soup", "salad",
+  "raw", "cooked", "fried", "baked", "canned", "frozen", "with", "and",
+]
+CATEGORIES = [
+  "Cheese", "Poultry", "Yeast breads", "Vegetable dishes", "Soups",
+  "Fish", "Fruit juice", "Milk, whole", "Beans, peas, legumes",
+]
+
+def make_food_dicts(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+  rng = random.Random(seed)
+  return [
+    {
+      "fdcId": 100000 + i,
+      "foodCode": 10000000 + i,
+      "description": ", ".join(
+        " ".join(rng.choices(WORDS, k=rng.randint(1, 3)))
+        for _ in range(rng.randint(1, 4))
+      ),
+      "wweiaFoodCategory": {
+        "wweiaFoodCategoryDescription": rng.choice(CATEGORIES),
+      },
+      "inputFoods": [
+        {
+          "id": rng.randint(1, 99999),
+          "foodDescription": description,
+          "ingredientCode": rng.randint(10000000, 99999999),
+          "ingredientDescription": description,
+        }
+        for description in (
+          " ".join(rng.choices(WORDS, k=3))
+          for _ in range(rng.randint(0, 5))
+        )
+      ],
+      # real entries are dominated by nutrient lists like this one
+      "foodNutrients": [
+        {
+          "nutrient": {
+            "id": 1000 + j, "name": f"Nutrient {j}", "unitName": "g",
+          },
+          "amount": round(rng.random() * 100, 3),
+        }
+        for j in range(rng.randint(40, 70))
+      ],
+    }
+    for i in range(n)
+  ]
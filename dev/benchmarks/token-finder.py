@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare the regex-based and trie-based token finders on food descriptions,
+using the description-based heuristic's tokens.
+
+Uses the descriptions (of foods and their input foods) from the real FDC files
+if both are given and synthetic ones otherwise. Must be run from the project
+root dir, e.g.:
+
+  PYTHONPATH=. python3 dev/benchmarks/token-finder.py \\
+    --survey-json survey.json --sr-legacy-json sr_legacy.json
+"""
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+
+from fooddata_vegattributes.auto_indexed_fooddata_food_store import (
+  load_all_fooddata_dicts,
+)
+from fooddata_vegattributes.description_based_heuristic import all_tokens
+from fooddata_vegattributes.utils.parsing import (
+  MaxiMunchTokenFinder,
+  TrieTokenFinder,
+)
+
+from synthetic_fooddata import make_food_dicts
+
+
+def main():
+  arg_parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+  arg_parser.add_argument("--survey-json", type=Path)
+  arg_parser.add_argument("--sr-legacy-json", type=Path)
+  arg_parser.add_argument("--n-foods", type=int, default=20000)
+  arg_parser.add_argument("--repeat", type=int, default=5)
+  args = arg_parser.parse_args()
+
+  if args.survey_json is not None and args.sr_legacy_json is not None:
+    food_ds = load_all_fooddata_dicts(args.survey_json, args.sr_legacy_json)
+    source = "real"
+  else:
+    food_ds = iter(make_food_dicts(args.n_foods))
+    source = "synthetic"
+  descriptions = [
+    description.lower()
+    for d in food_ds
+    for description in [d["description"]] + [
+      input_food_d.get("foodDescription", "")
+      for input_food_d in d.get("inputFoods", [])
+    ]
+  ]
+  print(
+    f"{len(descriptions)} {source} descriptions, {len(all_tokens)} tokens"
+  )
+
+  finders = {
+    "regex": MaxiMunchTokenFinder(all_tokens),
+    "trie": TrieTokenFinder(all_tokens),
+  }
+  results = {}
+  for name, finder in finders.items():
+    best_time = float("inf")
+    for _ in range(args.repeat):
+      start = perf_counter()
+      results[name] = [finder.find_all(s) for s in descriptions]
+      best_time = min(best_time, perf_counter() - start)
+    print(f"{name:>5}: {best_time:.3f} s")
+  assert results["regex"] == results["trie"]
+
+if __name__ == "__main__":
+  main()
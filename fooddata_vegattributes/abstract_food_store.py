@@ -24,3 +24,13 @@ class AbstractFoodStore(AbstractContextManager, metaclass=ABCMeta):
   def get_mapped_by_fdc_category(
     self, fdc_category_description: str
   ) -> Mapping[int, Food]: ...
+
+  @abstractmethod
+  def search_by_description_tokens(
+    self, tokens: Iterable[str]
+  ) -> Mapping[int, Food]:
+    """
+    Returns the foods whose descriptions contain all of the given words
+    (case-insensitive).
+    """
+    ...
@@ -1,12 +1,21 @@
 from abc import ABCMeta, abstractmethod
-from typing import Iterable, Union
+from typing import Dict, Iterable, Optional, Union
 
+from .build_manifest import BUILD_MANIFEST_METADATA_KEY, BuildManifest
 from .fooddata import FoodDataDict
 from .utils.indexed_jsonable_store import AbstractIndexedJsonableStore
 from .utils.close_on_exit import CloseOnExit
+from .utils.parsing import tokenize_words
 
 
+# name of the projection of entries to food stubs, see `food_stub_dict`
+FOOD_STUB_PROJECTION = "food-stub"
+
 class AbstractIndexedFoodDataJson(CloseOnExit, metaclass=ABCMeta):
+  """
+  Getters with a `stubs` argument return only the fields of entries that
+  `food_stub_dict` keeps if it's set, which is much cheaper.
+  """
   indexed_json: AbstractIndexedJsonableStore
 
   @abstractmethod
@@ -15,24 +24,84 @@ class AbstractIndexedFoodDataJson(CloseOnExit, metaclass=ABCMeta):
   def write_fooddata_dicts(self, ds: Iterable[FoodDataDict]):
     self.indexed_json.put_entries(ds)
 
+  def put_build_manifest(self, manifest: BuildManifest):
+    self.indexed_json.put_metadata(
+      BUILD_MANIFEST_METADATA_KEY, manifest.to_json_bytes()
+    )
+
+  def get_build_manifest(self) -> Optional[BuildManifest]:
+    """
+    Returns the file's build manifest or `None` if it was built without one.
+    """
+    b = self.indexed_json.get_metadata(BUILD_MANIFEST_METADATA_KEY)
+    return BuildManifest.from_json_bytes(b) if b is not None else None
+
   def get_fooddata_dict_by_fdc_id(
-    self, fdc_id: Union[int, str]
+    self, fdc_id: Union[int, str], stubs: bool = False
   ) -> FoodDataDict:
-    return self.indexed_json.get_entry("fdc-id", str(fdc_id))
+    return self.indexed_json.get_entry(
+      FOOD_STUB_PROJECTION if stubs else "fdc-id", str(fdc_id)
+    )
+
+  def get_fooddata_dicts_by_fdc_ids(
+    self, fdc_ids: Iterable[Union[int, str]], stubs: bool = False
+  ) -> Dict[str, FoodDataDict]:
+    """
+    Fetches several entries at once, keyed by their FDC IDs as strings.
+    """
+    return self.indexed_json.get_entries(
+      FOOD_STUB_PROJECTION if stubs else "fdc-id",
+      [str(fdc_id) for fdc_id in fdc_ids],
+    )
 
   def get_fooddata_dict_by_ingredient_code(
-    self, ingredient_code: Union[int, str]
+    self, ingredient_code: Union[int, str], stubs: bool = False
   ) -> FoodDataDict:
-    return self.indexed_json.get_entry(
-      "ingredient-code", str(ingredient_code)
+    if not stubs:
+      return self.indexed_json.get_entry(
+        "ingredient-code", str(ingredient_code)
+      )
+    ds = list(
+      self.indexed_json.iter_projected_entries(
+        FOOD_STUB_PROJECTION, "ingredient-code", str(ingredient_code)
+      )
     )
+    if not ds:
+      raise KeyError(f"no entry found for ingredient-code='{ingredient_code}'")
+    if len(ds) > 1:
+      raise ValueError(
+        f"more than one result for ingredient-code='{ingredient_code}'"
+      )
+    return ds[0]
 
   def get_all_fdc_ids(self) -> Iterable[int]:
     return [int(x) for x in self.indexed_json.iter_index("fdc-id")]
 
   def get_fooddata_dicts_by_fdc_category(
-    self, fdc_category_description: str
+    self, fdc_category_description: str, stubs: bool = False
   ) -> Iterable[FoodDataDict]:
+    if stubs:
+      return self.indexed_json.iter_projected_entries(
+        FOOD_STUB_PROJECTION,
+        "fdc-category-description",
+        fdc_category_description,
+      )
     return self.indexed_json.iter_entries(
       "fdc-category-description", fdc_category_description
     )
+
+  def get_fooddata_dicts_by_description_tokens(
+    self, tokens: Iterable[str], stubs: bool = False
+  ) -> Dict[str, FoodDataDict]:
+    """
+    Fetches the entries whose descriptions contain all of the given tokens
+    (words, case-insensitive), keyed by their FDC IDs as strings.
+    """
+    words = [word for token in tokens for word in tokenize_words(token)]
+    if not words:
+      return {}
+    fdc_ids = self.indexed_json.intersect("description-token", words)
+    ds_by_fdc_id = self.indexed_json.get_entries(
+      FOOD_STUB_PROJECTION if stubs else "fdc-id", fdc_ids
+    )
+    return {fdc_id: ds_by_fdc_id[fdc_id] for fdc_id in fdc_ids}
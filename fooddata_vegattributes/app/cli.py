@@ -1,33 +1,40 @@
 from argparse import ArgumentParser
+from typing import List
 
-from ..category import Category
-
-from .annotate_reference_samples import main as annotate_ref_main
-from .generate import main as generate_main
-from .input_reference_samples import main as input_ref_main
-from .list_by_veg_and_fdc_categories import (
-  main as list_by_veg_and_fdc_categories_main
-)
+# NOTE that subcommands' modules are only imported once they run, as they
+# (transitively) load the store stack and heuristics' token tables, which
+# would otherwise make even `--help` slow
 
 
 def annotate_ref():
+  from .annotate_reference_samples import main as annotate_ref_main
   return annotate_ref_main()
 
 def input_ref():
+  from .input_reference_samples import main as input_ref_main
   return input_ref_main()
 
-def generate():
-  return generate_main()
+def generate(jobs: int):
+  from .generate import main as generate_main
+  return generate_main(jobs=jobs)
 
 def list_by_veg_and_fdc_categories(
   fdc_category_description: str,
   veg_category: str
 ):
+  from ..category import Category
+  from .list_by_veg_and_fdc_categories import (
+    main as list_by_veg_and_fdc_categories_main
+  )
   return list_by_veg_and_fdc_categories_main(
     fdc_category_description,
     Category[veg_category],
   )
 
+def search(tokens: List[str]):
+  from .search import main as search_main
+  return search_main(tokens)
+
 
 def main():
   parser = ArgumentParser(prog="fooddata-vegattributes")
@@ -39,6 +46,11 @@ def main():
     help="generate vegattributes JSON"
   )
   generate_parser.set_defaults(func=generate)
+  generate_parser.add_argument(
+    "--jobs", type=int, default=1, metavar="N",
+    help="number of processes to load, index and categorize foods with"
+    " (default: 1)",
+  )
 
   # "input-ref" subcommand
   input_ref_parser = subparsers.add_parser(
@@ -65,6 +77,14 @@ def main():
   )
   list_by_categories_parser.add_argument("--veg-category", required=True)
 
+  # "search" subcommand
+  search_parser = subparsers.add_parser(
+    "search",
+    help="list foods whose descriptions contain all of the given words"
+  )
+  search_parser.set_defaults(func=search)
+  search_parser.add_argument("tokens", nargs="+", metavar="word")
+
 
   args = parser.parse_args()
   args.func(**{k: v for k, v in vars(args).items() if k != "func"})
@@ -1,14 +1,12 @@
 from collections import defaultdict
 import json
-from typing import Dict
+from typing import DefaultDict, Dict, List
 
+from ..auto_indexed_fooddata_food_store import load_all_fooddata_dicts
 from ..category import Category
-from ..categorization import Categorization, Categorizer
+from ..categorization import Categorizer
 from ..food import Food
-from ..fooddata import (
-  load_survey_fooddata_dicts,
-  load_sr_legacy_fooddata_dicts,
-)
+from ..sharded_categorization import categorize_all_sharded
 from ..utils.random import select_n_random
 from ..utils.terminal_ui import print_as_table
 from ..vegattributes_dict import (
@@ -20,37 +18,52 @@ from .default_paths import default_dir_paths
 from .with_default_paths import default_food_and_reference_sample_stores
 
 
-def main():
+def main(jobs: int = 1):
+  """
+  `jobs` is the number of processes to load, index and categorize foods with.
+  """
   print("loading foods from JSON... ", end="")
-  food_ds = (
-    load_survey_fooddata_dicts(default_dir_paths.survey_fooddata_json) +
-    load_sr_legacy_fooddata_dicts(default_dir_paths.sr_legacy_fooddata_json)
+  food_ds = load_all_fooddata_dicts(
+    default_dir_paths.survey_fooddata_json,
+    default_dir_paths.sr_legacy_fooddata_json,
+    jobs=jobs,
   )
-  print("done")
-
   foods = [Food.from_fdc_food_dict(food_d) for food_d in food_ds]
+  print("done")
 
   # go through all foods and assign categories
   print("categorizing foods... ", end="")
-  foods_in_categories = {
+  foods_in_categories: Dict[Category, List[Food]] = {
     category: [] for category in Category
   }
-  fdc_categories_to_foods_in_veg_categories = defaultdict(
+  fdc_categories_to_foods_in_veg_categories: DefaultDict[
+    str, Dict[Category, List[Food]]
+  ] = defaultdict(
     lambda: { veg_category: [] for veg_category in Category }
   )
-  food_categorizations: Dict[Food, Categorization] = {}
-  with default_food_and_reference_sample_stores() as (
+  with default_food_and_reference_sample_stores(jobs=jobs) as (
     food_store, reference_sample_store
   ):
-    categorizer = Categorizer(
-      reference_sample_store=reference_sample_store,
-      food_store=food_store,
-    )
     print("    ", end="")
-    for i, food in enumerate(foods):
-      print(f"\b\b\b\b{i/len(foods)*100:>3.0f}%", end="")
-      categorization = categorizer.categorize(food)
-      food_categorizations[food] = categorization
+    if jobs > 1:
+      # workers open their own stores, which the above made sure exist and
+      # are up to date
+      food_categorizations = categorize_all_sharded(
+        foods,
+        default_dir_paths.compressed_indexed_fooddata_json,
+        default_dir_paths.reference_samples_csv,
+        jobs=jobs,
+        on_progress=_print_progress,
+      )
+    else:
+      categorizer = Categorizer(
+        reference_sample_store=reference_sample_store,
+        food_store=food_store,
+      )
+      food_categorizations = categorizer.categorize_all(
+        foods, on_progress=_print_progress
+      )
+    for food, categorization in food_categorizations.items():
       foods_in_categories[categorization.category].append(food)
       fdc_categories_to_foods_in_veg_categories[
         food.fdc_category_description
@@ -131,3 +144,6 @@ def main():
       for x in y
     ]
   )
+
+def _print_progress(n_done: int, n_total: int):
+  print(f"\b\b\b\b{n_done/n_total*100:>3.0f}%", end="")
@@ -15,6 +15,8 @@ def main(fdc_category_description: str, veg_category: Category):
       reference_sample_store=reference_sample_store,
       food_store=food_store,
     )
-    for food in foods_in_fdc_category:
-      if categorizer.categorize(food).category == veg_category:
+    for food, categorization in categorizer.categorize_all(
+      foods_in_fdc_category
+    ).items():
+      if categorization.category == veg_category:
         print(food)
@@ -0,0 +1,11 @@
+from typing import List
+
+from .with_default_paths import default_food_and_reference_sample_stores
+
+
+def main(tokens: List[str]):
+  with default_food_and_reference_sample_stores() as (food_store, _):
+    for fdc_id, food in food_store.search_by_description_tokens(
+      tokens
+    ).items():
+      print(f"{fdc_id}\t{food.description}")
@@ -9,13 +9,22 @@ from .default_paths import default_dir_paths
 
 
 @contextmanager
-def default_food_and_reference_sample_stores(create_ref_store: bool=False):
+def default_food_and_reference_sample_stores(
+  create_ref_store: bool=False,
+  jobs: int = 1,
+):
+  """
+  `jobs` is the number of processes used if the indexed FoodData file has to
+  be (re)generated.
+  """
   with auto_compressed_indexed_fooddata_food_store(
     compressed_indexed_json_path=(
       default_dir_paths.compressed_indexed_fooddata_json
     ),
     survey_fooddata_json_path=default_dir_paths.survey_fooddata_json,
     sr_legacy_fooddata_json_path=default_dir_paths.sr_legacy_fooddata_json,
+    load_jobs=jobs,
+    build_jobs=jobs,
   ) as food_store, (
     CsvReferenceSampleStore.from_path_and_food_store(
       default_dir_paths.reference_samples_csv,
@@ -1,36 +1,160 @@
 from contextlib import contextmanager
 from logging import getLogger
+import os
 from os import PathLike
-from typing import Callable, Iterable, Union
-from zipfile import BadZipFile
+from typing import Callable, Iterable, Optional, Sequence, Union
 
+from .abstract_indexed_fooddata import FOOD_STUB_PROJECTION
+from .build_manifest import BuildManifest
 from .fooddata import FoodDataDict
 from .compressed_indexed_fooddata import CompressedIndexedFoodDataJson
+from .utils.indexed_jsonable_store import (
+  AbstractIndexedJsonableStore,
+  MALFORMED_STORE_ERRORS,
+  StoreFormat,
+)
 
 
 logger = getLogger(__name__)
 
+# number of secondary index postings kept in memory while generating before
+# they're spilled to temporary files
+BUILD_MAX_POSTINGS_IN_MEMORY = 100_000
+
 @contextmanager
 def auto_compressed_indexed_fooddata_json(
   compressed_indexed_json_path: Union[PathLike, str, bytes],
   load_fooddata_callback: Callable[[], Iterable[FoodDataDict]],
+  format: StoreFormat = StoreFormat.ZIP,
+  build_jobs: int = 1,
+  source_paths: Sequence[Union[PathLike, str, bytes]] = (),
 ):
+  """
+  Opens indexed FoodData JSON file, (re)generating it first if necessary.
+
+  Besides missing or malformed files, this applies to ones whose build
+  manifest (see `BuildManifest`) shows that they were built from different
+  versions of the files at `source_paths` or by an incompatible version of
+  this package. Files without a manifest (built before manifests existed) are
+  only regenerated if they lack indices this version needs. If any of the
+  source files are missing, existing files can't be checked and are used
+  as they are, with a warning, unless they're incompatible with this version
+  of the package, which raises `ValueError`.
+
+  Files are generated under a temporary name and only moved into place once
+  complete, so concurrent readers never see partially written ones.
+
+  `build_jobs` is the number of processes used to encode and compress entries
+  while generating.
+  """
   for attempt in range(2):
     try:
       cifj = CompressedIndexedFoodDataJson.from_path(
-        compressed_indexed_json_path
+        compressed_indexed_json_path, format=format
       )
-      logger.info("indexed JSON archive found")
-      break
-    except (FileNotFoundError, BadZipFile):
+    except (FileNotFoundError, *MALFORMED_STORE_ERRORS):
       if attempt > 0:
         raise
       logger.info("indexed JSON archive missing or malformed, (re)generating")
-      food_ds = load_fooddata_callback()
-      with CompressedIndexedFoodDataJson.from_path(
-        compressed_indexed_json_path, "w"
-      ) as cifj:
-        cifj.write_fooddata_dicts(food_ds)
-      logger.info("done writing indexed JSON, trying to load again")
+    else:
+      try:
+        staleness = _find_staleness(cifj, source_paths)
+      except BaseException:
+        cifj.close()
+        raise
+      if staleness is None or attempt > 0:
+        # sources changing again while generating isn't worth looping over
+        logger.info("indexed JSON archive found")
+        break
+      cifj.close()
+      logger.info(f"indexed JSON archive outdated ({staleness}), regenerating")
+    _generate_atomically(
+      compressed_indexed_json_path,
+      load_fooddata_callback,
+      format=format,
+      build_jobs=build_jobs,
+      source_paths=source_paths,
+    )
+    logger.info("done writing indexed JSON, trying to load again")
   with cifj:
     yield cifj
+
+def _find_staleness(
+  cifj: CompressedIndexedFoodDataJson,
+  source_paths: Sequence[Union[PathLike, str, bytes]],
+) -> Optional[str]:
+  manifest = cifj.get_build_manifest()
+  if manifest is None:
+    incompatibility = (
+      None if _has_food_stubs(cifj)
+      else f"no build manifest and no {FOOD_STUB_PROJECTION!r} index"
+    )
+  else:
+    incompatibility = manifest.find_incompatibility(cifj.indexed_json)
+  missing_source_paths = [p for p in source_paths if not os.path.exists(p)]
+  if incompatibility is not None:
+    if missing_source_paths:
+      raise ValueError(
+        f"indexed JSON archive is incompatible ({incompatibility}) and can't"
+        f" be regenerated as source files are missing"
+        f" ({missing_source_paths!r})"
+      )
+    return incompatibility
+  if missing_source_paths:
+    # regenerating would fail anyway, and the file may well be fine
+    logger.warning(
+      "can't check whether indexed JSON archive is up to date as source"
+      f" files are missing ({missing_source_paths!r}), using it as it is"
+    )
+    return None
+  if manifest is None:
+    logger.warning(
+      "can't check whether indexed JSON archive is up to date as it has no"
+      " build manifest, using it as it is"
+    )
+    return None
+  return manifest.find_staleness(cifj.indexed_json, source_paths)
+
+def _has_food_stubs(cifj: CompressedIndexedFoodDataJson) -> bool:
+  indexed_json = cifj.indexed_json
+  if _is_empty_index(indexed_json, indexed_json.primary_index.name):
+    # nothing to lack
+    return True
+  return not _is_empty_index(indexed_json, FOOD_STUB_PROJECTION)
+
+def _is_empty_index(
+  indexed_json: AbstractIndexedJsonableStore, index_name: str
+) -> bool:
+  try:
+    return next(iter(indexed_json.iter_index(index_name)), None) is None
+  except KeyError:
+    return True
+
+def _generate_atomically(
+  compressed_indexed_json_path: Union[PathLike, str, bytes],
+  load_fooddata_callback: Callable[[], Iterable[FoodDataDict]],
+  format: StoreFormat,
+  build_jobs: int,
+  source_paths: Sequence[Union[PathLike, str, bytes]],
+):
+  path = os.fsdecode(os.fspath(compressed_indexed_json_path))
+  # unique per process so concurrent generators don't write to the same file
+  tmp_path = f"{path}.generating-{os.getpid()}"
+  try:
+    with CompressedIndexedFoodDataJson.from_path(
+      tmp_path,
+      "w",
+      format=format,
+      build_jobs=build_jobs,
+      max_postings_in_memory=BUILD_MAX_POSTINGS_IN_MEMORY,
+    ) as cifj:
+      # fingerprint sources before reading them, so changes made while
+      # generating are noticed next time
+      manifest = BuildManifest.for_sources(cifj.indexed_json, source_paths)
+      cifj.write_fooddata_dicts(load_fooddata_callback())
+      cifj.put_build_manifest(manifest)
+    os.replace(tmp_path, path)
+  finally:
+    for p in [tmp_path, f"{tmp_path}-wal", f"{tmp_path}-shm"]:
+      if os.path.exists(p):
+        os.unlink(p)
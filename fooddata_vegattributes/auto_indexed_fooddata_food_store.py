@@ -1,13 +1,14 @@
 from contextlib import contextmanager
 from functools import partial
 from os import PathLike
-from typing import cast, List, Union
+from typing import Iterator, Union
 
 from .auto_indexed_fooddata import auto_compressed_indexed_fooddata_json
 from .fooddata import (
   FoodDataDict,
-  load_sr_legacy_fooddata_dicts,
-  load_survey_fooddata_dicts,
+  iter_fooddata_dicts_parallel,
+  iter_sr_legacy_fooddata_dicts,
+  iter_survey_fooddata_dicts,
 )
 from .indexed_fooddata_food_store import IndexedFoodDataFoodStore
 
@@ -15,27 +16,46 @@ from .indexed_fooddata_food_store import IndexedFoodDataFoodStore
 def load_all_fooddata_dicts(
   survey_fooddata_json_path: Union[PathLike, str, bytes],
   sr_legacy_fooddata_json_path: Union[PathLike, str, bytes],
-) -> List[FoodDataDict]:
-  l = cast(
-    List[FoodDataDict],
-    load_survey_fooddata_dicts(survey_fooddata_json_path)
-  )
-  l.extend(load_sr_legacy_fooddata_dicts(sr_legacy_fooddata_json_path))
-  return l
+  jobs: int = 1,
+) -> Iterator[FoodDataDict]:
+  """
+  Streams the foods of both datasets, parsing the files incrementally.
+
+  With `jobs > 1`, the files are parsed by that many processes in parallel.
+  """
+  if jobs > 1:
+    yield from iter_fooddata_dicts_parallel(
+      survey_fooddata_json_path, sr_legacy_fooddata_json_path, jobs=jobs
+    )
+    return
+  yield from iter_survey_fooddata_dicts(survey_fooddata_json_path)
+  yield from iter_sr_legacy_fooddata_dicts(sr_legacy_fooddata_json_path)
 
 @contextmanager
 def auto_compressed_indexed_fooddata_food_store(
   compressed_indexed_json_path: Union[PathLike, str, bytes],
   survey_fooddata_json_path: Union[PathLike, str, bytes],
   sr_legacy_fooddata_json_path: Union[PathLike, str, bytes],
+  load_jobs: int = 1,
+  build_jobs: int = 1,
 ):
+  """
+  Opens food store backed by an indexed FoodData file, (re)generating it from
+  the FDC JSON files first if it's missing or outdated.
+
+  `load_jobs` and `build_jobs` are the numbers of processes used to parse the
+  JSON files and to encode entries while generating, respectively.
+  """
   with auto_compressed_indexed_fooddata_json(
     compressed_indexed_json_path=compressed_indexed_json_path,
     load_fooddata_callback=partial(
       load_all_fooddata_dicts,
       survey_fooddata_json_path=survey_fooddata_json_path,
       sr_legacy_fooddata_json_path=sr_legacy_fooddata_json_path,
+      jobs=load_jobs,
     ),
+    build_jobs=build_jobs,
+    source_paths=[survey_fooddata_json_path, sr_legacy_fooddata_json_path],
   ) as cifj:
     with IndexedFoodDataFoodStore(indexed_fooddata_json=cifj) as store:
       yield store
@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+import json
+from os import PathLike
+from typing import List, Optional, Sequence, Union
+
+from .utils.indexed_jsonable_store import AbstractIndexedJsonableStore
+from .utils.source_fingerprint import SourceFingerprint
+
+
+# to be incremented whenever the way FoodData entries are stored changes in a
+# way that isn't reflected in the index names
+ARCHIVE_FORMAT_VERSION = 1
+
+# metadata key under which indexed FoodData files store their build manifest
+BUILD_MANIFEST_METADATA_KEY = "build-manifest"
+
+@dataclass
+class BuildManifest:
+  """
+  Records what an indexed FoodData file was built from and how, so outdated
+  files can be detected.
+  """
+  format_version: int
+  index_names: List[str]
+  sources: List[SourceFingerprint]
+
+  @classmethod
+  def for_sources(
+    cls,
+    indexed_json: AbstractIndexedJsonableStore,
+    source_paths: Sequence[Union[PathLike, str, bytes]],
+  ) -> "BuildManifest":
+    """
+    Makes the manifest for building `indexed_json` from the given files.
+    """
+    return cls(
+      format_version=ARCHIVE_FORMAT_VERSION,
+      index_names=_index_names(indexed_json),
+      sources=[SourceFingerprint.from_path(p) for p in source_paths],
+    )
+
+  @classmethod
+  def from_json_bytes(cls, b: bytes) -> "BuildManifest":
+    d = json.loads(b)
+    return cls(
+      format_version=d["format_version"],
+      index_names=d["index_names"],
+      sources=[SourceFingerprint.from_dict(x) for x in d["sources"]],
+    )
+
+  def to_json_bytes(self) -> bytes:
+    return json.dumps({
+      "format_version": self.format_version,
+      "index_names": self.index_names,
+      "sources": [x.to_dict() for x in self.sources],
+    }).encode("utf-8")
+
+  def find_staleness(
+    self,
+    indexed_json: AbstractIndexedJsonableStore,
+    source_paths: Sequence[Union[PathLike, str, bytes]],
+  ) -> Optional[str]:
+    """
+    Returns why a file with this manifest is outdated compared to what
+    building `indexed_json` from the given files would produce now, or `None`
+    if it isn't.
+    """
+    incompatibility = self.find_incompatibility(indexed_json)
+    if incompatibility is not None:
+      return incompatibility
+    if len(self.sources) != len(source_paths):
+      return "number of source files differs"
+    for fingerprint, path in zip(self.sources, source_paths):
+      if not fingerprint.matches(path):
+        return f"source file {path!r} changed"
+    return None
+
+  def find_incompatibility(
+    self, indexed_json: AbstractIndexedJsonableStore
+  ) -> Optional[str]:
+    """
+    Like `find_staleness`, but only checks whether a file with this manifest
+    can be read as `indexed_json` at all, regardless of its sources.
+    """
+    if self.format_version != ARCHIVE_FORMAT_VERSION:
+      return (
+        f"format version {self.format_version} instead of"
+        f" {ARCHIVE_FORMAT_VERSION}"
+      )
+    if self.index_names != _index_names(indexed_json):
+      return "indices differ"
+    return None
+
+def _index_names(indexed_json: AbstractIndexedJsonableStore) -> List[str]:
+  return [
+    indexed_json.primary_index.name,
+    *(s.name for s in indexed_json.secondary_indices),
+    *(p.name for p in indexed_json.projections),
+  ]
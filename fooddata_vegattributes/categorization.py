@@ -1,6 +1,18 @@
+from collections import deque
 from dataclasses import dataclass, field
 from enum import auto
-from typing import Dict, Mapping, Optional
+from typing import (
+  Callable,
+  Deque,
+  Dict,
+  Iterable,
+  Iterator,
+  List,
+  Mapping,
+  Optional,
+  Set,
+  Tuple,
+)
 
 from . import combined_heuristic
 from .abstract_food_store import AbstractFoodStore
@@ -11,6 +23,9 @@ from .reference_sample import ReferenceSample
 from .utils.enum import AutoStrEnum
 
 
+# called with the number of foods categorized so far and the total number
+ProgressCallback = Callable[[int, int], None]
+
 class CategorizationSource(AutoStrEnum):
   HEURISTIC = auto()
   REFERENCE = auto()
@@ -30,14 +45,151 @@ class Categorizer:
   eventually using a caching wrapper around the reference sample store (which
   would then also have a get_by_fdc_id method - no point right now because it'd
   be horribly inefficient).
+
+  Categorizations are cached by FDC ID for the lifetime of the categorizer, so
+  foods shared by several recipes are only categorized once. The foods a food
+  is made of are categorized before it by an explicit traversal instead of
+  recursion, which raises `ValueError` if a food turns out to (transitively)
+  be made of itself.
   """
   reference_sample_store: AbstractReferenceSampleStore
   food_store: AbstractFoodStore
   _cached_reference_samples_by_fdc_id: Optional[Dict[int, ReferenceSample]] = (
     None
   )
+  _categorizations_by_fdc_id: Dict[int, Categorization] = field(
+    default_factory=dict
+  )
 
   def categorize(self, food: Food) -> Categorization:
+    categorization = self._categorizations_by_fdc_id.get(food.fdc_id)
+    if categorization is not None:
+      return categorization
+    # by the time a food is yielded, all of its input foods are in the cache,
+    # so the heuristics' lookups of them return right away
+    for food_to_categorize in self._iter_uncategorized_in_input_order(food):
+      self._categorizations_by_fdc_id[food_to_categorize.fdc_id] = (
+        self._categorize_uncached(food_to_categorize)
+      )
+    return self._categorizations_by_fdc_id[food.fdc_id]
+
+  def categorize_all(
+    self,
+    foods: Iterable[Food],
+    on_progress: Optional[ProgressCallback] = None,
+  ) -> Dict[Food, Categorization]:
+    """
+    Categorizes many foods at once, returning their categorizations in the
+    order of `foods`.
+
+    Equivalent to calling `categorize` on each food, but builds the graph of
+    the foods and the foods they are (transitively) made of up front and then
+    categorizes them in topological order, so that each input food is looked
+    up and categorized only once.
+
+    `on_progress` is called after each food is categorized; the total includes
+    the input foods that needed categorizing.
+    """
+    foods = list(foods)
+    foods_by_fdc_id: Dict[int, Food] = {}
+    input_foods_by_fdc_id: Dict[int, List[Food]] = {}
+    to_visit = [
+      food for food in foods
+      if food.fdc_id not in self._categorizations_by_fdc_id
+    ]
+    while to_visit:
+      food = to_visit.pop()
+      if food.fdc_id in foods_by_fdc_id:
+        continue
+      foods_by_fdc_id[food.fdc_id] = food
+      input_foods_by_fdc_id[food.fdc_id] = [
+        input_food for input_food in self._iter_input_foods(food)
+        if input_food.fdc_id not in self._categorizations_by_fdc_id
+      ]
+      to_visit.extend(input_foods_by_fdc_id[food.fdc_id])
+
+    # Kahn's algorithm, with edges pointing from input foods to the foods made
+    # of them
+    n_uncategorized_inputs: Dict[int, int] = {}
+    dependent_fdc_ids: Dict[int, List[int]] = {
+      fdc_id: [] for fdc_id in foods_by_fdc_id
+    }
+    for fdc_id, input_foods in input_foods_by_fdc_id.items():
+      input_fdc_ids = {input_food.fdc_id for input_food in input_foods}
+      n_uncategorized_inputs[fdc_id] = len(input_fdc_ids)
+      for input_fdc_id in input_fdc_ids:
+        dependent_fdc_ids[input_fdc_id].append(fdc_id)
+    ready: Deque[int] = deque(
+      fdc_id for fdc_id, n in n_uncategorized_inputs.items() if n == 0
+    )
+    n_categorized = 0
+    while ready:
+      fdc_id = ready.popleft()
+      self._categorizations_by_fdc_id[fdc_id] = self._categorize_uncached(
+        foods_by_fdc_id[fdc_id]
+      )
+      n_categorized += 1
+      if on_progress is not None:
+        on_progress(n_categorized, len(foods_by_fdc_id))
+      for dependent_fdc_id in dependent_fdc_ids[fdc_id]:
+        n_uncategorized_inputs[dependent_fdc_id] -= 1
+        if n_uncategorized_inputs[dependent_fdc_id] == 0:
+          ready.append(dependent_fdc_id)
+
+    for fdc_id, food in foods_by_fdc_id.items():
+      if fdc_id not in self._categorizations_by_fdc_id:
+        # left over because it's part of or made of a cycle, which
+        # categorizing it individually will find and report
+        self.categorize(food)
+        raise AssertionError("cycle expected but not found")
+
+    return {
+      food: self._categorizations_by_fdc_id[food.fdc_id] for food in foods
+    }
+
+  def _iter_uncategorized_in_input_order(self, food: Food) -> Iterator[Food]:
+    """
+    Yields `food` and the not yet categorized foods it is (transitively) made
+    of, each one after its own input foods.
+
+    Assumes that the caller categorizes each yielded food before resuming.
+    """
+    stack: List[Tuple[Food, Iterator[Food]]] = [
+      (food, self._iter_input_foods(food))
+    ]
+    fdc_ids_on_stack: Set[int] = {food.fdc_id}
+    while stack:
+      current_food, input_foods = stack[-1]
+      for input_food in input_foods:
+        if input_food.fdc_id in self._categorizations_by_fdc_id:
+          continue
+        if input_food.fdc_id in fdc_ids_on_stack:
+          path = [f.fdc_id for f, _ in stack]
+          cycle = path[path.index(input_food.fdc_id):] + [input_food.fdc_id]
+          raise ValueError(
+            "cyclic input food relationships between foods with FDC IDs "
+            + " -> ".join(str(fdc_id) for fdc_id in cycle)
+          )
+        stack.append((input_food, self._iter_input_foods(input_food)))
+        fdc_ids_on_stack.add(input_food.fdc_id)
+        break
+      else:
+        stack.pop()
+        fdc_ids_on_stack.remove(current_food.fdc_id)
+        yield current_food
+
+  def _iter_input_foods(self, food: Food) -> Iterator[Food]:
+    for input_food_stub in food.input_food_stubs:
+      try:
+        input_food = self.food_store.get_by_ingredient_code(
+          input_food_stub.ingredient_code
+        )
+      except KeyError:
+        # categorized based on the stub's description by the heuristics
+        continue
+      yield input_food
+
+  def _categorize_uncached(self, food: Food) -> Categorization:
     ref = self._reference_samples_by_fdc_id.get(food.fdc_id)
     heuristic_based_category = combined_heuristic.categorize(
       food, self, self.food_store
@@ -59,7 +211,7 @@ class Categorizer:
 
   @property
   def _reference_samples_by_fdc_id(self):
-    if not self._cached_reference_samples_by_fdc_id:
+    if self._cached_reference_samples_by_fdc_id is None:
       self._cached_reference_samples_by_fdc_id = (
         self.reference_sample_store.get_all_mapped_by_fdc_ids()
       )
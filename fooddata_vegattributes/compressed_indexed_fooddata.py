@@ -1,15 +1,27 @@
 from os import PathLike
-from typing import Union
+from typing import Optional, Union
 
-from .abstract_indexed_fooddata import AbstractIndexedFoodDataJson
-from .fooddata import FoodDataDict
-from .utils.indexed_jsonable_store import IndexedJsonableStore, IndexSpec
+from .abstract_indexed_fooddata import (
+  AbstractIndexedFoodDataJson, FOOD_STUB_PROJECTION,
+)
+from .fooddata import food_stub_dict, FoodDataDict
+from .utils.indexed_jsonable_store import (
+  EntryCodec,
+  IndexedJsonableStore,
+  IndexSpec,
+  ProjectionSpec,
+  StoreFormat,
+)
 from .utils.close_via_stack import CloseViaStack
+from .utils.parsing import tokenize_words
 
 
 class CompressedIndexedFoodDataJson(CloseViaStack, AbstractIndexedFoodDataJson):
   """
   Compressed, indexed (by FDC ID) FoodData JSON entries stored in a file.
+
+  Alongside each entry, a "food stub" containing only the fields needed to
+  construct a `Food` is stored, see `fooddata.food_stub_dict`.
   """
   def __init__(
     self, compressed_indexed_json: IndexedJsonableStore[FoodDataDict]
@@ -18,12 +30,26 @@ class CompressedIndexedFoodDataJson(CloseViaStack, AbstractIndexedFoodDataJson):
 
   @classmethod
   def from_path(
-    cls, path: Union[PathLike, str, bytes], mode="r",
+    cls,
+    path: Union[PathLike, str, bytes],
+    mode="r",
+    format: StoreFormat = StoreFormat.ZIP,
+    build_jobs: int = 1,
+    shared_dictionary: bool = False,
+    codec: Optional[EntryCodec] = None,
+    max_postings_in_memory: Optional[int] = None,
   ) -> "CompressedIndexedFoodDataJson":
     """
     Opens archive for reading or writing depending on the given mode.
 
-    See `CompressedIndexedJson` docs for possible modes.
+    See `CompressedIndexedJson` docs for possible modes and `StoreFormat` for
+    possible formats. `build_jobs` is the number of processes used to encode
+    and compress entries when writing. `shared_dictionary` compresses entries
+    using a dictionary trained on the first ones written, see
+    `ZippedIndexableLinkableJsonableStore.from_path`. `codec` selects how
+    entries of new files are serialized; existing files are read with the codec
+    they were written with. `max_postings_in_memory` bounds the memory used for
+    building secondary indices, see `AutoIndexingJsonableWriter`.
     """
     compressed_indexed_json = IndexedJsonableStore.from_path(
       path,
@@ -40,8 +66,21 @@ class CompressedIndexedFoodDataJson(CloseViaStack, AbstractIndexedFoodDataJson):
             or d.get("foodCategory", {}).get("description")
           ),
         ),
+        IndexSpec(
+          "description-token",
+          lambda d: tokenize_words(d.get("description", "")),
+          multi_valued=True,
+        ),
+      ],
+      projections=[
+        ProjectionSpec(FOOD_STUB_PROJECTION, lambda d: food_stub_dict(d)),
       ],
       mode=mode,
+      format=format,
+      build_jobs=build_jobs,
+      shared_dictionary=shared_dictionary,
+      codec=codec,
+      max_postings_in_memory=max_postings_in_memory,
     )
     obj = cls(compressed_indexed_json=compressed_indexed_json)
     obj.close_stack.enter_context(compressed_indexed_json)
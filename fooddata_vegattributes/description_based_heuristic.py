@@ -4,7 +4,7 @@ from typing import Dict, Set
 
 from .category import Category
 from .utils.enum import AutoStrEnum
-from .utils.parsing import MaxiMunchTokenFinder
+from .utils.parsing import TrieTokenFinder
 
 
 class TokenCategory(AutoStrEnum):
@@ -215,7 +215,7 @@ all_tokens: Set[str] = reduce(
   set()
 )
 
-all_tokens_finder = MaxiMunchTokenFinder(all_tokens)
+all_tokens_finder = TrieTokenFinder(all_tokens)
 
 def categorize(description: str) -> Category:
   names_in_desc = all_tokens_finder.find_all(description.lower())
@@ -1,15 +1,19 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import sys
 from typing import cast, Optional, Tuple
 
 from .fooddata import FoodDataDict, SrLegacyFoodDataDict, SurveyFoodDataDict
+from .utils.slots import add_slots
 
 
+@add_slots
 @dataclass(frozen=True)
 class InputFoodStub:
   fdc_id: int  # FIXME wrong, it's a completely unrelated ID => remove later
   description: str
   ingredient_code: int
 
+@add_slots
 @dataclass(frozen=True)
 class Food:
   description: str
@@ -29,6 +33,23 @@ class Food:
   ndb_number: Optional[int] = None
   "Identifies foods in the SR Legacy dataset"
 
+  _hash: int = field(init=False, repr=False, compare=False)
+
+  def __post_init__(self):
+    # foods are used as dict keys a lot and hashing them involves hashing all
+    # of their input food stubs, so it's only done once
+    object.__setattr__(self, "_hash", hash((
+      self.description,
+      self.fdc_id,
+      self.input_food_stubs,
+      self.fdc_category_description,
+      self.food_code,
+      self.ndb_number,
+    )))
+
+  def __hash__(self) -> int:
+    return self._hash
+
   @property
   def ingredient_code(self) -> int:
     """
@@ -63,7 +84,7 @@ class Food:
     return cls(
       **cls._kwargs_from_fdc_common_food_dict(d),
       food_code=d["foodCode"],
-      fdc_category_description=(
+      fdc_category_description=sys.intern(
         d["wweiaFoodCategory"]["wweiaFoodCategoryDescription"]
       ),
     )
@@ -73,7 +94,7 @@ class Food:
     return cls(
       **cls._kwargs_from_fdc_common_food_dict(d),
       ndb_number=d["ndbNumber"],
-      fdc_category_description=d["foodCategory"]["description"],
+      fdc_category_description=sys.intern(d["foodCategory"]["description"]),
     )
 
   @classmethod
@@ -0,0 +1,65 @@
+from threading import Lock
+from typing import Optional
+
+from .food import Food
+from .utils.bounded_cache import (
+  AbstractBoundedCache,
+  bounded_cache_from_policy,
+  CachePolicy,
+  CacheStats,
+)
+
+
+DEFAULT_FOOD_CACHE_POLICY = CachePolicy(max_entries=20_000)
+
+class FoodIdentityMap:
+  """
+  Bounded map from FDC IDs and ingredient codes to `Food` objects, so that
+  food stores can hand out the same (immutable) object for the same food
+  instead of constructing a new one on every lookup.
+
+  The same object is returned via either key as long as it hasn't been
+  evicted. `stats` counts lookups via both keys; its `evictions` are those of
+  the FDC ID map. Safe to use from several threads at once.
+  """
+  def __init__(self, policy: CachePolicy = DEFAULT_FOOD_CACHE_POLICY):
+    self.stats = CacheStats()
+    self._by_fdc_id: AbstractBoundedCache[int, Food] = (
+      bounded_cache_from_policy(policy)
+    )
+    self._by_ingredient_code: AbstractBoundedCache[int, Food] = (
+      bounded_cache_from_policy(policy)
+    )
+    self._lock = Lock()
+
+  def get_by_fdc_id(self, fdc_id: int) -> Optional[Food]:
+    with self._lock:
+      return self._count(self._by_fdc_id.get(fdc_id))
+
+  def get_by_ingredient_code(self, ingredient_code: int) -> Optional[Food]:
+    with self._lock:
+      return self._count(self._by_ingredient_code.get(ingredient_code))
+
+  def add(self, food: Food) -> Food:
+    """
+    Adds food under both of its keys, returns the object to use for it: an
+    already known equal one if there is one, otherwise `food` itself.
+    """
+    with self._lock:
+      # (the inner caches' own hit statistics aren't exposed, so it doesn't
+      # matter that this counts as one)
+      known = self._by_fdc_id.get(food.fdc_id)
+      if known is not None:
+        food = known
+      else:
+        self._by_fdc_id.put(food.fdc_id, food)
+      self._by_ingredient_code.put(food.ingredient_code, food)
+      self.stats.evictions = self._by_fdc_id.stats.evictions
+      return food
+
+  def _count(self, food: Optional[Food]) -> Optional[Food]:
+    if food is None:
+      self.stats.misses += 1
+    else:
+      self.stats.hits += 1
+    return food
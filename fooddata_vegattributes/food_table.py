@@ -0,0 +1,104 @@
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List
+
+from .food import Food, InputFoodStub
+
+
+# stands in for missing Food Codes and NDB Numbers, which are all positive
+_NO_CODE = -1
+
+class FoodTable:
+  """
+  Columnar container for many foods, for bulk workflows in which one `Food`
+  object per food would take up too much memory.
+
+  Each food is a row across parallel arrays of FDC IDs, codes and FDC
+  category ordinals (indices into `fdc_category_descriptions`). Input foods
+  are stored in flat arrays of their own, with the ones of row `i` found at
+  `input_offsets[i]:input_offsets[i+1]`.
+  """
+  def __init__(self):
+    self.fdc_ids = array("q")
+    self.food_codes = array("q")
+    self.ndb_numbers = array("q")
+    self.fdc_category_ordinals = array("I")
+    self.fdc_category_descriptions: List[str] = []
+    self.descriptions: List[str] = []
+    self.input_offsets = array("q", [0])
+    self.input_fdc_ids = array("q")
+    self.input_ingredient_codes = array("q")
+    self.input_descriptions: List[str] = []
+    self._fdc_category_ordinals_by_description: Dict[str, int] = {}
+
+  @classmethod
+  def from_foods(cls, foods: Iterable[Food]) -> "FoodTable":
+    table = cls()
+    for food in foods:
+      table.append(food)
+    return table
+
+  def append(self, food: Food):
+    self.fdc_ids.append(food.fdc_id)
+    self.food_codes.append(
+      food.food_code if food.food_code is not None else _NO_CODE
+    )
+    self.ndb_numbers.append(
+      food.ndb_number if food.ndb_number is not None else _NO_CODE
+    )
+    ordinal = self._fdc_category_ordinals_by_description.get(
+      food.fdc_category_description
+    )
+    if ordinal is None:
+      ordinal = len(self.fdc_category_descriptions)
+      self.fdc_category_descriptions.append(food.fdc_category_description)
+      self._fdc_category_ordinals_by_description[
+        food.fdc_category_description
+      ] = ordinal
+    self.fdc_category_ordinals.append(ordinal)
+    self.descriptions.append(food.description)
+    for stub in food.input_food_stubs:
+      self.input_fdc_ids.append(stub.fdc_id)
+      self.input_ingredient_codes.append(stub.ingredient_code)
+      self.input_descriptions.append(stub.description)
+    self.input_offsets.append(len(self.input_fdc_ids))
+
+  def __len__(self) -> int:
+    return len(self.fdc_ids)
+
+  def __getitem__(self, i: int) -> Food:
+    """
+    Reconstructs the food in row `i`.
+    """
+    if i < 0:
+      i += len(self)
+    if not 0 <= i < len(self):
+      raise IndexError("food table index out of range")
+    food_code = self.food_codes[i]
+    ndb_number = self.ndb_numbers[i]
+    return Food(
+      description=self.descriptions[i],
+      fdc_id=self.fdc_ids[i],
+      input_food_stubs=tuple(
+        InputFoodStub(
+          self.input_fdc_ids[j],
+          self.input_descriptions[j],
+          self.input_ingredient_codes[j],
+        )
+        for j in range(self.input_offsets[i], self.input_offsets[i + 1])
+      ),
+      fdc_category_description=(
+        self.fdc_category_descriptions[self.fdc_category_ordinals[i]]
+      ),
+      food_code=food_code if food_code != _NO_CODE else None,
+      ndb_number=ndb_number if ndb_number != _NO_CODE else None,
+    )
+
+  def __iter__(self) -> Iterator[Food]:
+    return (self[i] for i in range(len(self)))
+
+  def count_by_fdc_category(self) -> Dict[str, int]:
+    return {
+      self.fdc_category_descriptions[ordinal]: n
+      for ordinal, n in Counter(self.fdc_category_ordinals).items()
+    }
@@ -1,6 +1,11 @@
 import json
 from os import PathLike
-from typing import cast, List, TypedDict, Union
+from typing import cast, Iterator, List, TypedDict, Union
+
+from .utils.json_stream import (
+  iter_json_array_member,
+  iter_json_array_members_parallel,
+)
 
 # NOTE that while the TypedDict PEP (PEP-589) and docs both suggest that extra
 # keys are not allowed, this is actually contentious because it contradicts
@@ -28,6 +33,48 @@ class SrLegacyFoodDataDict(FoodDataDict):
   ndbNumber: int
   foodCategory: dict
 
+def iter_survey_fooddata_dicts(
+  path: Union[PathLike, str, bytes]
+) -> Iterator[SurveyFoodDataDict]:
+  """
+  Like `load_survey_fooddata_dicts`, but parses the file incrementally so only
+  one food is kept in memory at a time.
+  """
+  with open(path) as f:
+    yield from cast(
+      Iterator[SurveyFoodDataDict], iter_json_array_member(f, "SurveyFoods")
+    )
+
+def iter_sr_legacy_fooddata_dicts(
+  path: Union[PathLike, str, bytes]
+) -> Iterator[SrLegacyFoodDataDict]:
+  """
+  Like `load_sr_legacy_fooddata_dicts`, but parses the file incrementally so
+  only one food is kept in memory at a time.
+  """
+  with open(path) as f:
+    yield from cast(
+      Iterator[SrLegacyFoodDataDict],
+      iter_json_array_member(f, "SRLegacyFoods"),
+    )
+
+def iter_fooddata_dicts_parallel(
+  survey_path: Union[PathLike, str, bytes],
+  sr_legacy_path: Union[PathLike, str, bytes],
+  jobs: int,
+) -> Iterator[FoodDataDict]:
+  """
+  Yields the foods of both datasets (survey ones first), parsing the files in
+  chunks using `jobs` processes, see `iter_json_array_members_parallel`.
+  """
+  return cast(
+    Iterator[FoodDataDict],
+    iter_json_array_members_parallel(
+      [(survey_path, "SurveyFoods"), (sr_legacy_path, "SRLegacyFoods")],
+      jobs=jobs,
+    ),
+  )
+
 def load_survey_fooddata_dicts(
   path: Union[PathLike, str, bytes]
 ) -> List[SurveyFoodDataDict]:
@@ -41,3 +88,35 @@ def load_sr_legacy_fooddata_dicts(
   with open(path) as f:
     food_ds = json.load(f)["SRLegacyFoods"]
   return cast(List[SrLegacyFoodDataDict], food_ds)
+
+def food_stub_dict(d: FoodDataDict) -> FoodDataDict:
+  """
+  Reduces a FoodData dict to the fields needed to construct a `Food` from it.
+  """
+  stub = {
+    "fdcId": d["fdcId"],
+    "description": d["description"],
+    "inputFoods": [
+      {
+        "id": x["id"],
+        "foodDescription": x["foodDescription"],
+        "ingredientCode": x["ingredientCode"],
+      }
+      for x in d["inputFoods"]
+    ],
+  }
+  full = cast(dict, d)
+  for key in ["foodCode", "ndbNumber"]:
+    if key in full:
+      stub[key] = full[key]
+  if "wweiaFoodCategory" in full:
+    stub["wweiaFoodCategory"] = {
+      "wweiaFoodCategoryDescription": (
+        full["wweiaFoodCategory"]["wweiaFoodCategoryDescription"]
+      ),
+    }
+  if "foodCategory" in full:
+    stub["foodCategory"] = {
+      "description": full["foodCategory"]["description"],
+    }
+  return cast(FoodDataDict, stub)
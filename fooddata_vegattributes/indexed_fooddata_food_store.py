@@ -1,49 +1,94 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from os import PathLike
-from typing import Iterable, Mapping, Union
+from typing import Dict, Iterable, List, Mapping, Union
 
 from .abstract_food_store import AbstractFoodStore
 from .food import Food
+from .food_identity_map import DEFAULT_FOOD_CACHE_POLICY, FoodIdentityMap
 from .compressed_indexed_fooddata import CompressedIndexedFoodDataJson
+from .fooddata import FoodDataDict
+from .utils.bounded_cache import CachePolicy
 from .utils.close_on_exit import CloseOnExit
 from .utils.close_via_stack import CloseViaStack
 
 
 @dataclass
 class IndexedFoodDataFoodStore(CloseViaStack, AbstractFoodStore, CloseOnExit):
+  """
+  Food store backed by an indexed FoodData file.
+
+  When opened in read mode, lookups may be performed from several threads at
+  once (see `StoreFormat` for which formats support this).
+
+  Foods are constructed from the file's food stubs unless `full_records` is
+  set, in which case the complete FoodData entries are read instead. Lookups
+  by FDC ID or ingredient code go through an identity map bounded by
+  `food_cache_policy`, whose statistics are in `identity_map.stats`.
+  """
   indexed_fooddata_json: CompressedIndexedFoodDataJson
+  full_records: bool = False
+  food_cache_policy: CachePolicy = DEFAULT_FOOD_CACHE_POLICY
+  identity_map: FoodIdentityMap = field(init=False)
+
+  def __post_init__(self):
+    self.identity_map = FoodIdentityMap(self.food_cache_policy)
 
   @classmethod
   def from_path(
-    cls, path: Union[PathLike, str, bytes], mode="r",
+    cls,
+    path: Union[PathLike, str, bytes],
+    mode="r",
+    full_records: bool = False,
+    food_cache_policy: CachePolicy = DEFAULT_FOOD_CACHE_POLICY,
   ) -> "IndexedFoodDataFoodStore":
     indexed_fooddata_json = CompressedIndexedFoodDataJson.from_path(path, mode)
-    obj = cls(indexed_fooddata_json=indexed_fooddata_json)
+    obj = cls(
+      indexed_fooddata_json=indexed_fooddata_json,
+      full_records=full_records,
+      food_cache_policy=food_cache_policy,
+    )
     obj.close_stack.enter_context(indexed_fooddata_json)
     return obj
 
   def get_mapped_by_fdc_ids(
     self, fdc_ids: Iterable[int]
   ) -> Mapping[int, Food]:
-    fdc_ids_to_food_ds = {
-      fdc_id: self.indexed_fooddata_json.get_fooddata_dict_by_fdc_id(fdc_id)
-      for fdc_id in fdc_ids
-    }
-    return {
-     fdc_id: Food.from_fdc_food_dict(food_d)
-     for fdc_id, food_d in fdc_ids_to_food_ds.items()
-    }
+    foods_by_fdc_id: Dict[int, Food] = {}
+    missing: List[int] = []
+    for fdc_id in fdc_ids:
+      food = self.identity_map.get_by_fdc_id(fdc_id)
+      if food is not None:
+        foods_by_fdc_id[fdc_id] = food
+      else:
+        missing.append(fdc_id)
+    if missing:
+      food_ds_by_str_fdc_id = (
+        self.indexed_fooddata_json.get_fooddata_dicts_by_fdc_ids(
+          missing, stubs=not self.full_records
+        )
+      )
+      for fdc_id in missing:
+        foods_by_fdc_id[fdc_id] = self._food_from_dict(
+          food_ds_by_str_fdc_id[str(fdc_id)]
+        )
+    return foods_by_fdc_id
 
   def get_by_fdc_id(self, fdc_id: int) -> Food:
     return self.get_mapped_by_fdc_ids([fdc_id])[fdc_id]
 
   def get_by_ingredient_code(self, ingredient_code: int) -> Food:
-    return Food.from_fdc_food_dict(
+    food = self.identity_map.get_by_ingredient_code(ingredient_code)
+    if food is not None:
+      return food
+    return self._food_from_dict(
       self.indexed_fooddata_json.get_fooddata_dict_by_ingredient_code(
-        ingredient_code
+        ingredient_code, stubs=not self.full_records
       )
     )
 
+  def _food_from_dict(self, d: FoodDataDict) -> Food:
+    return self.identity_map.add(Food.from_fdc_food_dict(d))
+
   def get_all_fdc_ids(self) -> Iterable[int]:
     return self.indexed_fooddata_json.get_all_fdc_ids()
 
@@ -52,9 +97,21 @@ class IndexedFoodDataFoodStore(CloseViaStack, AbstractFoodStore, CloseOnExit):
   ) -> Mapping[int, Food]:
     return {
       food.fdc_id: food for food in [
-        Food.from_fdc_food_dict(d) for d in
+        self._food_from_dict(d) for d in
         self.indexed_fooddata_json.get_fooddata_dicts_by_fdc_category(
-          fdc_category_description
+          fdc_category_description, stubs=not self.full_records
         )
       ]
     }
+
+  def search_by_description_tokens(
+    self, tokens: Iterable[str]
+  ) -> Mapping[int, Food]:
+    return {
+      int(fdc_id): self._food_from_dict(d)
+      for fdc_id, d in (
+        self.indexed_fooddata_json.get_fooddata_dicts_by_description_tokens(
+          tokens, stubs=not self.full_records
+        ).items()
+      )
+    }
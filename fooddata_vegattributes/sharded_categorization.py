@@ -0,0 +1,67 @@
+from concurrent.futures import ProcessPoolExecutor
+from os import PathLike
+from typing import Dict, List, Optional, Sequence, Union
+
+from .categorization import Categorization, Categorizer, ProgressCallback
+from .csv_reference_sample_store import CsvReferenceSampleStore
+from .food import Food
+from .indexed_fooddata_food_store import IndexedFoodDataFoodStore
+
+
+def categorize_all_sharded(
+  foods: Sequence[Food],
+  indexed_fooddata_json_path: Union[PathLike, str, bytes],
+  reference_samples_csv_path: Union[PathLike, str, bytes],
+  jobs: int,
+  shard_size: int = 1000,
+  on_progress: Optional[ProgressCallback] = None,
+) -> Dict[Food, Categorization]:
+  """
+  Like `Categorizer.categorize_all`, but with the foods split into shards of
+  `shard_size` that are categorized by `jobs` processes in parallel.
+
+  Each process opens the (already generated) indexed FoodData file and the
+  reference samples CSV file itself and keeps one categorizer for all of its
+  shards, so input foods shared between shards are only categorized once per
+  process. The result is the same as that of a single categorizer.
+  `on_progress` is called as each shard is done, counting only `foods`.
+  """
+  shards = [
+    list(foods[i:i + shard_size]) for i in range(0, len(foods), shard_size)
+  ]
+  with ProcessPoolExecutor(
+    max_workers=jobs,
+    initializer=_init_worker,
+    initargs=(indexed_fooddata_json_path, reference_samples_csv_path),
+  ) as executor:
+    result: Dict[Food, Categorization] = {}
+    for shard, categorizations in zip(
+      shards, executor.map(_categorize_shard, shards)
+    ):
+      result.update(zip(shard, categorizations))
+      if on_progress is not None:
+        on_progress(len(result), len(foods))
+    return result
+
+# per worker process, set up by _init_worker (the stores it uses are left open
+# until the process exits)
+_worker_categorizer: Optional[Categorizer] = None
+
+def _init_worker(
+  indexed_fooddata_json_path: Union[PathLike, str, bytes],
+  reference_samples_csv_path: Union[PathLike, str, bytes],
+):
+  global _worker_categorizer
+  food_store = IndexedFoodDataFoodStore.from_path(indexed_fooddata_json_path)
+  reference_sample_store = CsvReferenceSampleStore.from_path_and_food_store(
+    reference_samples_csv_path, food_store
+  )
+  _worker_categorizer = Categorizer(
+    reference_sample_store=reference_sample_store,
+    food_store=food_store,
+  )
+
+def _categorize_shard(shard: List[Food]) -> List[Categorization]:
+  assert _worker_categorizer is not None
+  categorizations = _worker_categorizer.categorize_all(shard)
+  return [categorizations[food] for food in shard]
@@ -0,0 +1,244 @@
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import auto
+from typing import (
+  Callable,
+  Dict,
+  Generic,
+  Hashable,
+  List,
+  Optional,
+  TypeVar,
+)
+
+from .enum import AutoStrEnum
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+class Eviction(AutoStrEnum):
+  LRU = auto()
+  CLOCK = auto()
+
+@dataclass(frozen=True)
+class CachePolicy:
+  """
+  Limits for a bounded cache. Limits that are `None` aren't enforced, so the
+  default policy describes an unbounded cache.
+  """
+  max_entries: Optional[int] = None
+  max_bytes: Optional[int] = None
+  eviction: Eviction = Eviction.LRU
+
+  @property
+  def is_bounded(self) -> bool:
+    return self.max_entries is not None or self.max_bytes is not None
+
+@dataclass
+class CacheStats:
+  hits: int = 0
+  misses: int = 0
+  evictions: int = 0
+
+  @property
+  def hit_rate(self) -> float:
+    n_lookups = self.hits + self.misses
+    return self.hits / n_lookups if n_lookups else 0.0
+
+class AbstractBoundedCache(Generic[K, V], metaclass=ABCMeta):
+  """
+  Mapping-like cache that evicts entries once the limits of its policy are
+  exceeded.
+
+  `size_func` determines the size of each value in bytes and is only needed if
+  the policy has a `max_bytes` limit.
+  """
+  def __init__(
+    self,
+    policy: CachePolicy,
+    size_func: Optional[Callable[[V], int]] = None,
+  ):
+    if policy.max_bytes is not None and size_func is None:
+      raise ValueError("max_bytes limit requires a size function")
+    self.policy = policy
+    self.size_func = size_func
+    self.stats = CacheStats()
+    self.n_bytes = 0
+
+  @abstractmethod
+  def get(self, key: K) -> Optional[V]:
+    """
+    Returns cached value or `None` if not cached, counting hits and misses.
+    """
+    ...
+
+  @abstractmethod
+  def put(self, key: K, value: V): ...
+
+  @abstractmethod
+  def discard(self, key: K):
+    """
+    Removes value from the cache if it's there (not counted as an eviction).
+    """
+    ...
+
+  @abstractmethod
+  def __contains__(self, key: K) -> bool: ...
+
+  @abstractmethod
+  def __len__(self) -> int: ...
+
+  def _size(self, value: V) -> int:
+    return self.size_func(value) if self.size_func is not None else 0
+
+  def _is_over_limit(self) -> bool:
+    return (
+      (
+        self.policy.max_entries is not None
+        and len(self) > self.policy.max_entries
+      )
+      or
+      (
+        self.policy.max_bytes is not None
+        and self.n_bytes > self.policy.max_bytes
+      )
+    )
+
+class LruCache(AbstractBoundedCache[K, V]):
+  def __init__(
+    self,
+    policy: CachePolicy,
+    size_func: Optional[Callable[[V], int]] = None,
+  ):
+    super().__init__(policy, size_func)
+    self._entries: "OrderedDict[K, V]" = OrderedDict()
+
+  def get(self, key: K) -> Optional[V]:
+    try:
+      value = self._entries[key]
+    except KeyError:
+      self.stats.misses += 1
+      return None
+    self._entries.move_to_end(key)
+    self.stats.hits += 1
+    return value
+
+  def put(self, key: K, value: V):
+    if key in self._entries:
+      self.n_bytes -= self._size(self._entries.pop(key))
+    self._entries[key] = value
+    self.n_bytes += self._size(value)
+    while self._is_over_limit() and self._entries:
+      _, evicted_value = self._entries.popitem(last=False)
+      self.n_bytes -= self._size(evicted_value)
+      self.stats.evictions += 1
+
+  def discard(self, key: K):
+    if key in self._entries:
+      self.n_bytes -= self._size(self._entries.pop(key))
+
+  def __contains__(self, key: K) -> bool:
+    return key in self._entries
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+class ClockCache(AbstractBoundedCache[K, V]):
+  """
+  CLOCK ("second chance") approximation of LRU: hits only set a reference bit
+  instead of reordering anything, which makes them cheaper.
+  """
+  def __init__(
+    self,
+    policy: CachePolicy,
+    size_func: Optional[Callable[[V], int]] = None,
+  ):
+    super().__init__(policy, size_func)
+    self._slots_by_key: Dict[K, int] = {}
+    self._keys: List[Optional[K]] = []
+    self._values: List[Optional[V]] = []
+    self._referenced: List[bool] = []
+    self._free_slots: List[int] = []
+    self._hand = 0
+
+  def get(self, key: K) -> Optional[V]:
+    slot = self._slots_by_key.get(key)
+    if slot is None:
+      self.stats.misses += 1
+      return None
+    self._referenced[slot] = True
+    self.stats.hits += 1
+    return self._values[slot]
+
+  def put(self, key: K, value: V):
+    slot = self._slots_by_key.get(key)
+    if slot is not None:
+      self.n_bytes -= self._size(self._values[slot])  # type: ignore[arg-type]
+      self._values[slot] = value
+      self._referenced[slot] = True
+    elif self._free_slots:
+      slot = self._free_slots.pop()
+      self._keys[slot] = key
+      self._values[slot] = value
+      self._referenced[slot] = False
+      self._slots_by_key[key] = slot
+    else:
+      slot = len(self._keys)
+      self._keys.append(key)
+      self._values.append(value)
+      self._referenced.append(False)
+      self._slots_by_key[key] = slot
+    self.n_bytes += self._size(value)
+    while self._is_over_limit() and self._slots_by_key:
+      self._evict_one(protected_slot=slot)
+
+  def _evict_one(self, protected_slot: int):
+    n_slots = len(self._keys)
+    while True:
+      self._hand %= n_slots
+      hand = self._hand
+      self._hand += 1
+      key = self._keys[hand]
+      if key is None:
+        continue
+      # the entry that was just inserted shouldn't evict itself unless it's
+      # the only one left
+      if hand == protected_slot and len(self._slots_by_key) > 1:
+        continue
+      if self._referenced[hand]:
+        self._referenced[hand] = False
+        continue
+      self.n_bytes -= self._size(self._values[hand])  # type: ignore[arg-type]
+      del self._slots_by_key[key]
+      self._keys[hand] = None
+      self._values[hand] = None
+      self._free_slots.append(hand)
+      self.stats.evictions += 1
+      return
+
+  def discard(self, key: K):
+    slot = self._slots_by_key.pop(key, None)
+    if slot is None:
+      return
+    self.n_bytes -= self._size(self._values[slot])  # type: ignore[arg-type]
+    self._keys[slot] = None
+    self._values[slot] = None
+    self._free_slots.append(slot)
+
+  def __contains__(self, key: K) -> bool:
+    return key in self._slots_by_key
+
+  def __len__(self) -> int:
+    return len(self._slots_by_key)
+
+def bounded_cache_from_policy(
+  policy: CachePolicy,
+  size_func: Optional[Callable[[V], int]] = None,
+) -> AbstractBoundedCache:
+  if policy.eviction == Eviction.LRU:
+    return LruCache(policy, size_func)
+  elif policy.eviction == Eviction.CLOCK:
+    return ClockCache(policy, size_func)
+  raise ValueError(f"unknown eviction strategy: {policy.eviction!r}")
@@ -0,0 +1,114 @@
+import heapq
+import json
+from tempfile import TemporaryFile
+from typing import Any, IO, Iterable, Iterator, List, Tuple
+
+from .close_on_exit import CloseOnExit
+
+
+Row = Tuple[Any, ...]  # of JSON-serializable values
+
+DEFAULT_MAX_MERGE_FAN_IN = 32
+
+class ExternalSorter(CloseOnExit):
+  """
+  Sorts rows that needn't all fit into memory at once.
+
+  Rows are buffered until there are `max_in_memory` of them, at which point the
+  buffer is sorted and spilled to a temporary file (a "run"). `iter_sorted`
+  then merges all runs, so memory use only depends on `max_in_memory` and the
+  number of runs, not on the total number of rows.
+
+  To bound the number of runs (each an open file), whenever there are
+  `max_merge_fan_in` runs of the same size class, they are merged into one run
+  of the next class. The number of runs thus only grows logarithmically with
+  the number of rows.
+  """
+  def __init__(
+    self,
+    max_in_memory: int,
+    max_merge_fan_in: int = DEFAULT_MAX_MERGE_FAN_IN,
+  ):
+    if max_in_memory < 1:
+      raise ValueError("max_in_memory must be at least 1")
+    if max_merge_fan_in < 2:
+      raise ValueError("max_merge_fan_in must be at least 2")
+    self.max_in_memory = max_in_memory
+    self.max_merge_fan_in = max_merge_fan_in
+    self._buffer: List[Row] = []
+    # ordered by level (how many times their rows have been merged), highest
+    # first
+    self._runs: List[IO[str]] = []
+    self._run_levels: List[int] = []
+
+  def close(self):
+    for run in self._runs:
+      run.close()
+    self._run_levels.clear()
+    self._runs.clear()
+    self._buffer.clear()
+
+  @property
+  def n_runs(self) -> int:
+    return len(self._runs)
+
+  def add(self, row: Row):
+    self._buffer.append(row)
+    if len(self._buffer) >= self.max_in_memory:
+      self._spill()
+
+  def iter_sorted(self) -> Iterator[Row]:
+    """
+    Yields all rows added so far in sorted order, removing them from the
+    sorter.
+    """
+    buffer, self._buffer = self._buffer, []
+    runs, self._runs = self._runs, []
+    self._run_levels = []
+    buffer.sort()
+    try:
+      yield from heapq.merge(buffer, *(_iter_run(run) for run in runs))
+    finally:
+      for run in runs:
+        run.close()
+
+  def _spill(self):
+    self._buffer.sort()
+    self._runs.append(_write_run(self._buffer))
+    self._run_levels.append(0)
+    self._buffer.clear()
+    self._merge_full_levels()
+
+  def _merge_full_levels(self):
+    k = self.max_merge_fan_in
+    while (
+      len(self._runs) >= k
+      and self._run_levels[-k] == self._run_levels[-1]
+    ):
+      runs = self._runs[-k:]
+      level = self._run_levels[-1]
+      try:
+        merged = _write_run(heapq.merge(*(_iter_run(run) for run in runs)))
+      finally:
+        for run in runs:
+          run.close()
+      del self._runs[-k:]
+      del self._run_levels[-k:]
+      self._runs.append(merged)
+      self._run_levels.append(level + 1)
+
+def _write_run(sorted_rows: Iterable[Row]) -> IO[str]:
+  run = TemporaryFile("w+", encoding="utf-8")
+  try:
+    for row in sorted_rows:
+      run.write(json.dumps(row))
+      run.write("\n")
+    run.seek(0)
+  except BaseException:
+    run.close()
+    raise
+  return run
+
+def _iter_run(run: IO[str]) -> Iterator[Row]:
+  for line in run:
+    yield tuple(json.loads(line))
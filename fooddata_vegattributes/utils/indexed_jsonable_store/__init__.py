@@ -1,5 +1,18 @@
-from .abstract import AbstractIndexedJsonableStore, IndexSpec
+from ..bounded_cache import CachePolicy, Eviction
+from .abstract import AbstractIndexedJsonableStore, IndexSpec, ProjectionSpec
+from .entry_codec import EntryCodec
 from .implementation import IndexedJsonableStore
+from .store_format import MALFORMED_STORE_ERRORS, StoreFormat
 
 
-__all__ = ["AbstractIndexedJsonableStore", "IndexedJsonableStore", "IndexSpec"]
+__all__ = [
+  "AbstractIndexedJsonableStore",
+  "CachePolicy",
+  "EntryCodec",
+  "Eviction",
+  "IndexedJsonableStore",
+  "IndexSpec",
+  "MALFORMED_STORE_ERRORS",
+  "ProjectionSpec",
+  "StoreFormat",
+]
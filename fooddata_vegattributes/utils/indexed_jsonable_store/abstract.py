@@ -1,9 +1,13 @@
 from abc import abstractmethod, ABCMeta
 from dataclasses import dataclass
 from typing import (
+  Any,
   Callable,
+  Dict,
   Generic,
   Iterable,
+  List,
+  Optional,
   Sequence,
   TypeVar,
 )
@@ -15,16 +19,43 @@ T = TypeVar("T")  # JSONable
 
 @dataclass
 class IndexSpec(Generic[T]):
+  """
+  How to compute an entry's value(s) in an index.
+
+  `func` returns a single string, or, if `multi_valued` is set, an iterable of
+  strings, in which case the entry can be found via each of them. Primary
+  indices can't be multi-valued.
+  """
   name: str
-  func: Callable[[T], str]
+  func: Callable[[T], Any]
+  multi_valued: bool = False
 
   @classmethod
   def from_dict_key(cls, name):
     return cls(name, lambda x: x[name])
 
+  def iter_values(self, x: T) -> Iterable[str]:
+    if self.multi_valued:
+      # without duplicates, but in a deterministic order
+      return dict.fromkeys(self.func(x)).keys()
+    return (self.func(x),)
+
+@dataclass
+class ProjectionSpec(Generic[T]):
+  """
+  A reduced version of each entry, stored as a separate data index keyed by
+  the entry's primary index value.
+
+  Reading a projection instead of the full entry is worthwhile if only some of
+  its fields are needed, as less has to be decompressed and decoded.
+  """
+  name: str
+  func: Callable[[T], Any]
+
 class AbstractIndexedJsonableStore(Generic[T], CloseOnExit, metaclass=ABCMeta):
   primary_index: IndexSpec
   secondary_indices: Sequence[IndexSpec]
+  projections: Sequence[ProjectionSpec]
 
   @abstractmethod
   def close(self): ...
@@ -32,11 +63,89 @@ class AbstractIndexedJsonableStore(Generic[T], CloseOnExit, metaclass=ABCMeta):
   @abstractmethod
   def put_entries(self, entries: Iterable[T]): ...
 
+  @abstractmethod
+  def upsert_entries(self, entries: Iterable[T]):
+    """
+    Inserts or replaces entries, keeping secondary indices consistent.
+    """
+    ...
+
+  @abstractmethod
+  def delete_entries(self, primary_values: Iterable[str]): ...
+
+  @abstractmethod
+  def put_metadata(self, key: str, value: bytes):
+    """
+    Stores a small piece of store-wide data, e.g. about how it was built.
+    """
+    ...
+
+  @abstractmethod
+  def get_metadata(self, key: str) -> Optional[bytes]: ...
+
   @abstractmethod
   def get_entry(self, index_name: str, index_value: str) -> T: ...
 
+  @abstractmethod
+  def get_entries(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> Dict[str, T]:
+    """
+    Like `get_entry` for many index values at once, but more efficient.
+    """
+    ...
+
   @abstractmethod
   def iter_entries(self, index_name: str, index_value: str) -> Iterable[T]: ...
 
+  @abstractmethod
+  def iter_projected_entries(
+    self, projection_name: str, index_name: str, index_value: str
+  ) -> Iterable[Any]:
+    """
+    Like `iter_entries`, but yields the given projection of each entry.
+    """
+    ...
+
   @abstractmethod
   def iter_index(self, index_name: str) -> Iterable[str]: ...
+
+  @abstractmethod
+  def get_primary_values(
+    self, index_name: str, index_value: str
+  ) -> List[str]:
+    """
+    Returns the primary index values of the entries having the given value in
+    a secondary index, or an empty list if there are none.
+    """
+    ...
+
+  @abstractmethod
+  def intersect(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> List[str]:
+    """
+    Returns the primary index values of the entries having all of the given
+    values in a (typically multi-valued) secondary index.
+    """
+    ...
+
+  @abstractmethod
+  def iter_range(
+    self,
+    index_name: str,
+    lo: Optional[str] = None,
+    hi: Optional[str] = None,
+  ) -> Iterable[str]:
+    """
+    Yields the index values `lo <= v < hi` in sorted order; `None` leaves the
+    range open on that side.
+    """
+    ...
+
+  @abstractmethod
+  def iter_prefix(self, index_name: str, prefix: str) -> Iterable[str]:
+    """
+    Yields the index values starting with `prefix` in sorted order.
+    """
+    ...
@@ -1,7 +1,10 @@
 from abc import ABCMeta, abstractmethod
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 from ..close_on_exit import CloseOnExit
+from .entry_compression import EntryCompression
+from .ordered_index import iter_sorted_range, prefix_range
+from .precompressed_entry import PrecompressedEntry
 
 
 # links are (confusingly) 1-to-n; should probably be named tags or secondary
@@ -9,6 +12,8 @@ from ..close_on_exit import CloseOnExit
 LinkTargets = List[Tuple[str, str]]  # TODO rename
 LinksForSourceIndexName = Dict[str, LinkTargets]
 Links = Dict[str, LinksForSourceIndexName]
+# implementations that can avoid copying entries may return memoryviews
+BytesLike = Union[bytes, memoryview]
 
 class AbstractIndexableLinkableBytesStore(
   CloseOnExit, metaclass=ABCMeta
@@ -19,7 +24,59 @@ class AbstractIndexableLinkableBytesStore(
   @abstractmethod
   def put_entries(
     self, index_name: str, index_values_and_data: Iterable[Tuple[str, bytes]]
-  ): ...
+  ):
+    """
+    Existing entries with the same index values are replaced.
+    """
+    ...
+
+  @abstractmethod
+  def delete_entries(self, index_name: str, index_values: Iterable[str]):
+    """
+    Deletes entries, ignoring index values that don't exist.
+
+    Links pointing to them have to be updated separately.
+    """
+    ...
+
+  @abstractmethod
+  def put_precompressed_entries(
+    self,
+    index_name: str,
+    index_values_and_entries: Iterable[Tuple[str, PrecompressedEntry]],
+  ):
+    """
+    Like `put_entries`, but for entries that were already compressed with the
+    settings returned by `get_compression`.
+    """
+    ...
+
+  @abstractmethod
+  def get_compression(self) -> EntryCompression:
+    """
+    Returns the compression used for entries.
+    """
+    ...
+
+  def train_compression(self, sample_entries: Sequence[bytes]):
+    """
+    Prepares compression based on sample entries if it needs training (see
+    `EntryCompression`); does nothing otherwise.
+
+    Stores that support training do it on their own in `put_entries`, so this
+    only has to be called before putting precompressed entries.
+    """
+    pass
+
+  @abstractmethod
+  def put_metadata(self, key: str, value: bytes):
+    """
+    Stores a small piece of store-wide data, e.g. a compression dictionary.
+    """
+    ...
+
+  @abstractmethod
+  def get_metadata(self, key: str) -> Optional[bytes]: ...
 
   @abstractmethod
   def put_links(
@@ -29,16 +86,78 @@ class AbstractIndexableLinkableBytesStore(
   ):
     """
     Targets have the semantics `(target_index_name, target_index_value)`.
+
+    Existing links with the same index values are replaced.
+    """
+    ...
+
+  def put_sorted_links(
+    self,
+    index_name: str,
+    index_values_and_targets: Iterable[Tuple[str, LinkTargets]],
+  ):
+    """
+    Like `put_links`, but for links sorted by index value, which allows some
+    implementations to write them without holding them all in memory.
+    """
+    self.put_links(index_name, index_values_and_targets)
+
+  @abstractmethod
+  def delete_links(self, index_name: str, index_values: Iterable[str]):
+    """
+    Deletes links, ignoring index values that don't exist.
+    """
+    ...
+
+  @abstractmethod
+  def get_link_targets(
+    self, index_name: str, index_value: str
+  ) -> LinkTargets:
+    """
+    Returns the (unresolved) targets of a link or raises `KeyError`.
     """
     ...
 
   @abstractmethod
-  def get_entry(self, index_name: str, index_value: str) -> bytes: ...
+  def get_entry(self, index_name: str, index_value: str) -> BytesLike: ...
+
+  @abstractmethod
+  def get_entries(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> Dict[str, BytesLike]:
+    """
+    Batched version of `get_entry`, mapping each index value to its entry.
+
+    Implementations should read the entries in an order that is efficient for
+    their storage (e.g. sorted by physical location) rather than the given one.
+    """
+    ...
 
   @abstractmethod
   def iter_entries(
     self, index_name: str, index_value: str
-  ) -> Iterable[bytes]: ...
+  ) -> Iterable[BytesLike]: ...
 
   @abstractmethod
   def iter_index(self, index_name: str) -> Iterable[str]: ...
+
+  def iter_range(
+    self,
+    index_name: str,
+    lo: Optional[str] = None,
+    hi: Optional[str] = None,
+  ) -> Iterable[str]:
+    """
+    Yields the index values `lo <= v < hi` in sorted order; `None` leaves the
+    range open on that side.
+
+    The default implementation sorts the whole index; stores that keep their
+    indices ordered should override it.
+    """
+    return iter_sorted_range(sorted(self.iter_index(index_name)), lo, hi)
+
+  def iter_prefix(self, index_name: str, prefix: str) -> Iterable[str]:
+    """
+    Yields the index values starting with `prefix` in sorted order.
+    """
+    return self.iter_range(index_name, *prefix_range(prefix))
@@ -1,5 +1,5 @@
 from abc import ABCMeta, abstractmethod
-from typing import Generic, Iterable, Tuple, TypeVar
+from typing import Dict, Generic, Iterable, Optional, Tuple, TypeVar
 
 from ..close_on_exit import CloseOnExit
 
@@ -19,7 +19,20 @@ class AbstractIndexableLinkableJsonableStore(
   @abstractmethod
   def put_entries(
     self, index_name: str, index_values_and_data: Iterable[Tuple[str, T]]
-  ): ...
+  ):
+    """
+    Existing entries with the same index values are replaced.
+    """
+    ...
+
+  @abstractmethod
+  def delete_entries(self, index_name: str, index_values: Iterable[str]): ...
+
+  @abstractmethod
+  def put_metadata(self, key: str, value: bytes): ...
+
+  @abstractmethod
+  def get_metadata(self, key: str) -> Optional[bytes]: ...
 
   @abstractmethod
   def put_links(
@@ -32,9 +45,29 @@ class AbstractIndexableLinkableJsonableStore(
     """
     ...
 
+  @abstractmethod
+  def put_sorted_links(
+    self,
+    index_name: str,
+    index_values_and_targets: Iterable[Tuple[str, LinkTargets]],
+  ): ...
+
+  @abstractmethod
+  def delete_links(self, index_name: str, index_values: Iterable[str]): ...
+
+  @abstractmethod
+  def get_link_targets(
+    self, index_name: str, index_value: str
+  ) -> LinkTargets: ...
+
   @abstractmethod
   def get_entry(self, index_name: str, index_value: str) -> T: ...
 
+  @abstractmethod
+  def get_entries(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> Dict[str, T]: ...
+
   @abstractmethod
   def iter_entries(
     self, index_name: str, index_value: str
@@ -42,3 +75,14 @@ class AbstractIndexableLinkableJsonableStore(
 
   @abstractmethod
   def iter_index(self, index_name: str) -> Iterable[str]: ...
+
+  @abstractmethod
+  def iter_range(
+    self,
+    index_name: str,
+    lo: Optional[str] = None,
+    hi: Optional[str] = None,
+  ) -> Iterable[str]: ...
+
+  @abstractmethod
+  def iter_prefix(self, index_name: str, prefix: str) -> Iterable[str]: ...
@@ -0,0 +1,193 @@
+from abc import abstractmethod
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .abstract_indexable_linkable_bytes_store import (
+  AbstractIndexableLinkableBytesStore,
+  BytesLike,
+  LinkTargets,
+  LinksForSourceIndexName,
+)
+from .ordered_index import iter_sorted_range
+
+
+class AbstractLinkResolvingBytesStore(AbstractIndexableLinkableBytesStore):
+  """
+  Bytes store base class that resolves links itself, so that implementations
+  only need to be able to store and look up data entries and whole links
+  mappings per index.
+  """
+  def put_links(
+    self,
+    index_name: str,
+    index_values_and_targets: Iterable[Tuple[str, LinkTargets]]
+  ):
+    try:
+      links_for_index = self._load_links(index_name)
+    except KeyError:
+      links_for_index = {}
+    links_for_index.update(index_values_and_targets)
+    self._put_links(index_name, links_for_index)
+
+  def delete_links(self, index_name: str, index_values: Iterable[str]):
+    try:
+      links_for_index = self._load_links(index_name)
+    except KeyError:
+      return
+    to_delete = set(index_values)
+    self._put_links(
+      index_name,
+      {k: v for k, v in links_for_index.items() if k not in to_delete},
+    )
+
+  def get_link_targets(
+    self, index_name: str, index_value: str
+  ) -> LinkTargets:
+    return self._get_link_targets(index_name, index_value)
+
+  def iter_entries(
+    self, index_name: str, index_value: str
+  ) -> Iterable[BytesLike]:
+    for index_name, index_value in self._resolve(index_name, index_value):
+      yield self._get_entry_no_resolve(index_name, index_value)
+
+  def get_entry(self, index_name: str, index_value: str) -> BytesLike:
+    entries_iter = iter(self.iter_entries(index_name, index_value))
+    try:
+      result = next(entries_iter)
+    except StopIteration as e:
+      raise KeyError(f"no entry found for {index_name}='{index_value}'") from e
+    try:
+      next(entries_iter)
+    except StopIteration:
+      pass
+    else:
+      raise ValueError(
+        f"more than one result for {index_name}='{index_value}'"
+      )
+    return result
+
+  def get_entries(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> Dict[str, BytesLike]:
+    # resolve everything first so the actual reads can be batched per index
+    requested_by_target: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+    for index_value in index_values:
+      targets = list(self._resolve(index_name, index_value))
+      if not targets:
+        raise KeyError(f"no entry found for {index_name}='{index_value}'")
+      elif len(targets) > 1:
+        raise ValueError(
+          f"more than one result for {index_name}='{index_value}'"
+        )
+      requested_by_target[targets[0]].append(index_value)
+    target_values_by_index: Dict[str, List[str]] = defaultdict(list)
+    for target_index_name, target_index_value in requested_by_target:
+      target_values_by_index[target_index_name].append(target_index_value)
+    result: Dict[str, BytesLike] = {}
+    for target_index_name, target_index_values in (
+      target_values_by_index.items()
+    ):
+      entries = self._get_entries_no_resolve(
+        target_index_name, target_index_values
+      )
+      for target_index_value, entry in entries.items():
+        for index_value in requested_by_target[
+          (target_index_name, target_index_value)
+        ]:
+          result[index_value] = entry
+    return result
+
+  def _get_entries_no_resolve(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> Dict[str, BytesLike]:
+    """
+    Batched `_get_entry_no_resolve`; override to read in a better order.
+    """
+    return {
+      index_value: self._get_entry_no_resolve(index_name, index_value)
+      for index_value in index_values
+    }
+
+  def iter_index(self, index_name: str) -> Iterable[str]:
+    if self._is_data_index(index_name):
+      return self._iter_data_index(index_name)
+    else:
+      return self._load_links(index_name).keys()
+
+  def iter_range(
+    self,
+    index_name: str,
+    lo: Optional[str] = None,
+    hi: Optional[str] = None,
+  ) -> Iterable[str]:
+    if self._is_data_index(index_name):
+      return self._iter_data_index_range(index_name, lo, hi)
+    else:
+      return self._iter_link_index_range(index_name, lo, hi)
+
+  def _iter_data_index_range(
+    self, index_name: str, lo: Optional[str], hi: Optional[str]
+  ) -> Iterable[str]:
+    """
+    Override if the index values are available in sorted order.
+    """
+    return iter_sorted_range(
+      sorted(self._iter_data_index(index_name)), lo, hi
+    )
+
+  def _iter_link_index_range(
+    self, index_name: str, lo: Optional[str], hi: Optional[str]
+  ) -> Iterable[str]:
+    """
+    Override if the index values are available in sorted order.
+    """
+    return iter_sorted_range(sorted(self._load_links(index_name)), lo, hi)
+
+  def _resolve(
+    self, index_name: str, index_value: str
+  ) -> Iterable[Tuple[str, str]]:
+    if self._is_data_index(index_name) or not self._is_link_index(index_name):
+      yield (index_name, index_value)
+      return
+    for target in self._get_link_targets(index_name, index_value):
+      for resolved_target in self._resolve(*target):
+        yield resolved_target
+
+  def _get_link_targets(
+    self, index_name: str, index_value: str
+  ) -> LinkTargets:
+    """
+    Looks up the targets of a single link, raising `KeyError` if there is
+    none; override if this can be done without loading all of the index's
+    links.
+    """
+    return self._load_links(index_name)[index_value]
+
+  @abstractmethod
+  def _get_entry_no_resolve(
+    self, index_name: str, index_value: str
+  ) -> BytesLike: ...
+
+  @abstractmethod
+  def _iter_data_index(self, index_name: str) -> Iterable[str]: ...
+
+  @abstractmethod
+  def _is_data_index(self, index_name: str) -> bool: ...
+
+  @abstractmethod
+  def _is_link_index(self, index_name: str) -> bool: ...
+
+  @abstractmethod
+  def _load_links(self, index_name: str) -> LinksForSourceIndexName:
+    """
+    Raises `KeyError` if there are no links for the given index.
+    """
+    ...
+
+  @abstractmethod
+  def _put_links(
+    self,
+    index_name: str,
+    links_for_index: LinksForSourceIndexName,
+  ): ...
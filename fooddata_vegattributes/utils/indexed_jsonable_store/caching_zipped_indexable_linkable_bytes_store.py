@@ -1,97 +1,190 @@
-from collections import defaultdict
-from typing import Dict, Iterable, Set, Tuple
+from dataclasses import replace
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple, TypeVar
 
+from ..bounded_cache import (
+  AbstractBoundedCache,
+  bounded_cache_from_policy,
+  CachePolicy,
+  CacheStats,
+)
 from .abstract_indexable_linkable_bytes_store import (
-  Links,
+  BytesLike,
   LinksForSourceIndexName,
   LinkTargets,
 )
+from .precompressed_entry import PrecompressedEntry
 from .zipped_indexable_linkable_bytes_store import (
   ZipFile,
   ZippedIndexableLinkableBytesStore,
 )
 
 
+E = TypeVar("E")  # entry, compressed or not
+
 class CachingZippedIndexableLinkableBytesStore(
   ZippedIndexableLinkableBytesStore
 ):
-  def __init__(self, zipfile: ZipFile):
-    super().__init__(zipfile)
+  """
+  ZIP-based store that caches entries and links in memory.
+
+  Only entries are subject to the (by default unbounded) cache policy - link
+  shards are comparatively small and needed for nearly every lookup, so they
+  always stay cached once loaded, as do all links of an index merged from
+  them until a new link generation is written for it. Entries are only cached
+  when they're read, not when they're written, so that writing a store
+  doesn't end up keeping all of it in memory.
+
+  The caches may be populated concurrently, so the thread safety guarantees
+  of the parent class for reading hold here as well. Entries are read outside
+  of the cache lock, so two threads missing the same entry at the same time
+  may both read it.
+  """
+  def __init__(
+    self,
+    zipfile: ZipFile,
+    cache_policy: Optional[CachePolicy] = None,
+    shared_dictionary: bool = False,
+  ):
+    super().__init__(zipfile, shared_dictionary=shared_dictionary)
 
     # caches:
-    self._links: Links = defaultdict(lambda: {})
-    self._data: Dict[str, Dict[str, bytes]] = defaultdict(lambda: {})
-    # these are also keys in _data, but as you can load index values without
-    # loading contents, we need a separate cache:
-    self._data_index_values: Dict[str, Set] = defaultdict(lambda: set())
-    self._data_index_values_is_complete: Dict[str, bool] = defaultdict(
-      lambda: False
+    self._legacy_links: Dict[str, LinksForSourceIndexName] = {}
+    self._link_shard_indices: Dict[Tuple[str, int], List[str]] = {}
+    self._link_shards: Dict[Tuple[str, int, int], LinksForSourceIndexName] = {}
+    # merged links of all shards, along with the generation they're from
+    self._stored_links: Dict[
+      str, Tuple[Optional[int], LinksForSourceIndexName]
+    ] = {}
+    self._data: AbstractBoundedCache[Tuple[str, str], BytesLike] = (
+      bounded_cache_from_policy(cache_policy or CachePolicy(), size_func=len)
     )
+    # index names and values needn't be cached here because the parent class
+    # already keeps them in its manifest
+    self._data_lock = Lock()
+    self._links_lock = Lock()
+
+  @property
+  def cache_stats(self) -> CacheStats:
+    with self._data_lock:
+      return replace(self._data.stats)
 
   def put_entries(
     self, index_name: str, index_values_and_data: Iterable[Tuple[str, bytes]]
   ):
-    # iterables don't have to be re-entrant (and in this case actually aren't)
-    # TODO better way?
-    index_values_and_data = list(index_values_and_data)
-    super().put_entries(index_name, index_values_and_data)
-    self._data[index_name].update(index_values_and_data)
-    self._data_index_values[index_name].update(
-      k for k, v in index_values_and_data
+    super().put_entries(
+      index_name, self._uncaching(index_name, index_values_and_data)
     )
 
-  def _get_entry_no_resolve(self, index_name: str, index_value: str) -> bytes:
-    if index_value in self._data[index_name]:
-      return self._data[index_name][index_value]
+  def put_precompressed_entries(
+    self,
+    index_name: str,
+    index_values_and_entries: Iterable[Tuple[str, PrecompressedEntry]],
+  ):
+    super().put_precompressed_entries(
+      index_name, self._uncaching(index_name, index_values_and_entries)
+    )
+
+  def _uncaching(
+    self,
+    index_name: str,
+    index_values_and_entries: Iterable[Tuple[str, E]],
+  ) -> Iterable[Tuple[str, E]]:
+    # replaced entries mustn't stay cached
+    for index_value, entry in index_values_and_entries:
+      with self._data_lock:
+        self._data.discard((index_name, index_value))
+      yield index_value, entry
+
+  def delete_entries(self, index_name: str, index_values: Iterable[str]):
+    index_values = list(index_values)
+    super().delete_entries(index_name, index_values)
+    with self._data_lock:
+      for index_value in index_values:
+        self._data.discard((index_name, index_value))
+
+  def _get_entry_no_resolve(
+    self, index_name: str, index_value: str
+  ) -> BytesLike:
+    with self._data_lock:
+      entry_bytes = self._data.get((index_name, index_value))
+    if entry_bytes is not None:
+      return entry_bytes
     entry_bytes = super()._get_entry_no_resolve(index_name, index_value)
-    self._data[index_name][index_value] = entry_bytes
-    self._data_index_values[index_name].add(index_value)
+    with self._data_lock:
+      self._data.put((index_name, index_value), entry_bytes)
     return entry_bytes
 
-  def _iter_data_index(self, index_name: str) -> Iterable[str]:
-    if self._data_index_values_is_complete[index_name]:
-      for index_value in self._data_index_values[index_name]:
-        yield index_value
-    else:
-      for index_value in super()._iter_data_index(index_name):
-        yield index_value
-        self._data_index_values[index_name].add(index_value)
-      self._data_index_values_is_complete[index_name] = True
-
-  def _is_data_index(self, index_name: str) -> bool:
-    if index_name in self._data or index_name in self._data_index_values:
-      return True
-    elif index_name in self._links:
-      return False
-    result = super()._is_data_index(index_name)
-    if result:
-      if index_name not in self._data:
-        self._data[index_name] = {}
-      if index_name not in self._data_index_values:
-        self._data_index_values[index_name] = set()
+  def _get_entries_no_resolve(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> Dict[str, BytesLike]:
+    result: Dict[str, BytesLike] = {}
+    uncached_index_values: List[str] = []
+    with self._data_lock:
+      for index_value in index_values:
+        entry_bytes = self._data.get((index_name, index_value))
+        if entry_bytes is not None:
+          result[index_value] = entry_bytes
+        else:
+          uncached_index_values.append(index_value)
+    if uncached_index_values:
+      loaded = super()._get_entries_no_resolve(
+        index_name, uncached_index_values
+      )
+      with self._data_lock:
+        for index_value, entry_bytes in loaded.items():
+          self._data.put((index_name, index_value), entry_bytes)
+      result.update(loaded)
     return result
 
-  def _is_link_index(self, index_name: str) -> bool:
-    if index_name in self._links:
-      return True
-    elif index_name in self._data or index_name in self._data_index_values:
-      return False
-    return super()._is_link_index(index_name)
+  def _load_stored_links(self, index_name: str) -> LinksForSourceIndexName:
+    generation = self.manifest.link_generations.get(index_name)
+    with self._links_lock:
+      cached = self._stored_links.get(index_name)
+    if cached is not None and cached[0] == generation:
+      return cached[1]
+    # merged outside of the lock because loading shards acquires it as well
+    links_for_index = super()._load_stored_links(index_name)
+    with self._links_lock:
+      self._stored_links[index_name] = (generation, links_for_index)
+    return links_for_index
 
-  def _load_links(self, index_name: str) -> LinksForSourceIndexName:
-    if index_name not in self._links:
-      self._links[index_name] = super()._load_links(index_name)
-    return self._links[index_name]
-
-  def put_links(
+  def _write_link_generation(
     self,
     index_name: str,
-    index_values_and_targets: Iterable[Tuple[str, LinkTargets]],
+    sorted_index_values_and_targets: Iterable[Tuple[str, LinkTargets]],
   ):
-    """
-    Targets have the semantics `(target_index_name, target_index_value)`.
-    """
-    # see comment above
-    index_values_and_targets = list(index_values_and_targets)
-    super().put_links(index_name, index_values_and_targets)
-    self._links[index_name].update(index_values_and_targets)
+    super()._write_link_generation(
+      index_name, sorted_index_values_and_targets
+    )
+    # superseded by the new generation
+    with self._links_lock:
+      self._stored_links.pop(index_name, None)
+
+  def _load_legacy_links(self, index_name: str) -> LinksForSourceIndexName:
+    with self._links_lock:
+      if index_name not in self._legacy_links:
+        self._legacy_links[index_name] = super()._load_legacy_links(index_name)
+      return self._legacy_links[index_name]
+
+  def _load_link_shard_index(
+    self, index_name: str, generation: int
+  ) -> List[str]:
+    key = (index_name, generation)
+    with self._links_lock:
+      if key not in self._link_shard_indices:
+        self._link_shard_indices[key] = super()._load_link_shard_index(
+          index_name, generation
+        )
+      return self._link_shard_indices[key]
+
+  def _load_link_shard(
+    self, index_name: str, generation: int, shard_no: int
+  ) -> LinksForSourceIndexName:
+    key = (index_name, generation, shard_no)
+    with self._links_lock:
+      if key not in self._link_shards:
+        self._link_shards[key] = super()._load_link_shard(
+          index_name, generation, shard_no
+        )
+      return self._link_shards[key]
@@ -0,0 +1,214 @@
+from abc import ABCMeta, abstractmethod
+from enum import auto
+import json
+import marshal
+import pickle
+import struct
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from ..enum import AutoStrEnum
+
+try:
+  import orjson  # type: ignore[import]
+except ImportError:
+  orjson = None  # type: ignore[assignment]
+
+
+# metadata key under which stores record the codec of their entries
+CODEC_METADATA_KEY = "codec"
+
+class EntryCodec(AutoStrEnum):
+  """
+  Serialization format of the entries in a jsonable store.
+  """
+  JSON = auto()
+  "UTF-8 JSON, using orjson if installed"
+  MARSHAL = auto()
+  "Python's marshal format: fast, but tied to the marshal version"
+  PICKLE = auto()
+  "Python's pickle format: fast, but only for stores from trusted sources"
+  TAGGED_BINARY = auto()
+  "Compact custom binary format that stores repeated strings only once"
+
+class AbstractEntryCodecImpl(metaclass=ABCMeta):
+  @abstractmethod
+  def encode(self, obj: Any) -> bytes: ...
+
+  @abstractmethod
+  def decode(self, data: Union[bytes, memoryview]) -> Any: ...
+
+class JsonCodecImpl(AbstractEntryCodecImpl):
+  """
+  Uses orjson if it's installed and the standard library's json otherwise.
+
+  Both produce plain UTF-8 JSON, so stores written with either can be read
+  with the other.
+  """
+  def encode(self, obj: Any) -> bytes:
+    if orjson is not None:
+      return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+  def decode(self, data: Union[bytes, memoryview]) -> Any:
+    if orjson is not None:
+      return orjson.loads(data)
+    if isinstance(data, memoryview):
+      # json can't parse buffers directly, but decoding them is the copy we'd
+      # have to do anyway
+      return json.loads(str(data, "utf-8"))
+    return json.loads(data)
+
+class MarshalCodecImpl(AbstractEntryCodecImpl):
+  def encode(self, obj: Any) -> bytes:
+    return marshal.dumps(obj)
+
+  def decode(self, data: Union[bytes, memoryview]) -> Any:
+    return marshal.loads(data)
+
+class PickleCodecImpl(AbstractEntryCodecImpl):
+  def encode(self, obj: Any) -> bytes:
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+  def decode(self, data: Union[bytes, memoryview]) -> Any:
+    return pickle.loads(data)
+
+# tags of the tagged binary format
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3  # zigzag-encoded varint
+_FLOAT = 4  # little-endian IEEE 754 double
+_STR = 5  # varint length + UTF-8, appended to the string table
+_STR_REF = 6  # varint index into the string table
+_LIST = 7  # varint length + items
+_DICT = 8  # varint length + (string key, value) pairs
+
+_DOUBLE = struct.Struct("<d")
+
+class TaggedBinaryCodecImpl(AbstractEntryCodecImpl):
+  """
+  MessagePack-like binary format for JSON-compatible values.
+
+  Every value starts with a one-byte tag. Strings (including dict keys) are
+  numbered in the order they first appear, so repeated ones like the keys of
+  FoodData's nutrient lists are written as a small back-reference.
+  """
+  def encode(self, obj: Any) -> bytes:
+    out = bytearray()
+    self._encode(obj, out, {})
+    return bytes(out)
+
+  def _encode(self, obj: Any, out: bytearray, string_table: Dict[str, int]):
+    if obj is None:
+      out.append(_NONE)
+    elif obj is False:
+      out.append(_FALSE)
+    elif obj is True:
+      out.append(_TRUE)
+    elif isinstance(obj, int):
+      out.append(_INT)
+      _write_varint(out, (obj << 1) if obj >= 0 else ((-obj << 1) - 1))
+    elif isinstance(obj, float):
+      out.append(_FLOAT)
+      out += _DOUBLE.pack(obj)
+    elif isinstance(obj, str):
+      ref = string_table.get(obj)
+      if ref is not None:
+        out.append(_STR_REF)
+        _write_varint(out, ref)
+      else:
+        string_table[obj] = len(string_table)
+        encoded = obj.encode("utf-8")
+        out.append(_STR)
+        _write_varint(out, len(encoded))
+        out += encoded
+    elif isinstance(obj, (list, tuple)):
+      out.append(_LIST)
+      _write_varint(out, len(obj))
+      for item in obj:
+        self._encode(item, out, string_table)
+    elif isinstance(obj, dict):
+      out.append(_DICT)
+      _write_varint(out, len(obj))
+      for key, value in obj.items():
+        if not isinstance(key, str):
+          raise TypeError(f"dict keys must be strings, not {type(key)!r}")
+        self._encode(key, out, string_table)
+        self._encode(value, out, string_table)
+    else:
+      raise TypeError(f"can't encode objects of type {type(obj)!r}")
+
+  def decode(self, data: Union[bytes, memoryview]) -> Any:
+    obj, pos = self._decode(bytes(data), 0, [])
+    if pos != len(data):
+      raise ValueError("trailing data after encoded value")
+    return obj
+
+  def _decode(
+    self, data: bytes, pos: int, string_table: List[str]
+  ) -> Tuple[Any, int]:
+    tag = data[pos]
+    pos += 1
+    if tag == _STR_REF:
+      ref, pos = _read_varint(data, pos)
+      return string_table[ref], pos
+    elif tag == _STR:
+      length, pos = _read_varint(data, pos)
+      s = data[pos:pos+length].decode("utf-8")
+      string_table.append(s)
+      return s, pos + length
+    elif tag == _DICT:
+      length, pos = _read_varint(data, pos)
+      d = {}
+      for _ in range(length):
+        key, pos = self._decode(data, pos, string_table)
+        d[key], pos = self._decode(data, pos, string_table)
+      return d, pos
+    elif tag == _LIST:
+      length, pos = _read_varint(data, pos)
+      l = []
+      for _ in range(length):
+        item, pos = self._decode(data, pos, string_table)
+        l.append(item)
+      return l, pos
+    elif tag == _INT:
+      zigzag, pos = _read_varint(data, pos)
+      return (zigzag >> 1) if not zigzag & 1 else -((zigzag + 1) >> 1), pos
+    elif tag == _FLOAT:
+      return _DOUBLE.unpack_from(data, pos)[0], pos + _DOUBLE.size
+    elif tag == _NONE:
+      return None, pos
+    elif tag == _FALSE:
+      return False, pos
+    elif tag == _TRUE:
+      return True, pos
+    raise ValueError(f"unknown tag {tag} at position {pos - 1}")
+
+def _write_varint(out: bytearray, n: int):
+  while n >= 0x80:
+    out.append((n & 0x7f) | 0x80)
+    n >>= 7
+  out.append(n)
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+  n = 0
+  shift = 0
+  while True:
+    b = data[pos]
+    pos += 1
+    n |= (b & 0x7f) << shift
+    if b < 0x80:
+      return n, pos
+    shift += 7
+
+_CODEC_IMPL_FACTORIES: Dict[
+  EntryCodec, Callable[[], AbstractEntryCodecImpl]
+] = {
+  EntryCodec.JSON: JsonCodecImpl,
+  EntryCodec.MARSHAL: MarshalCodecImpl,
+  EntryCodec.PICKLE: PickleCodecImpl,
+  EntryCodec.TAGGED_BINARY: TaggedBinaryCodecImpl,
+}
+
+def get_codec_impl(codec: EntryCodec) -> AbstractEntryCodecImpl:
+  return _CODEC_IMPL_FACTORIES[codec]()
@@ -0,0 +1,116 @@
+from collections import Counter
+from dataclasses import dataclass
+from itertools import chain, islice
+import re
+from typing import (
+  Callable, Iterable, List, Optional, Sequence, Tuple, Union,
+)
+import zlib
+from zipfile import ZIP_DEFLATED, ZIP_STORED
+
+from .raw_deflate import raw_deflate, raw_inflate
+
+
+# deflate can only refer back 32 KiB, so anything beyond that would be unused
+MAX_ZDICT_SIZE = 32 * 1024
+# number of entries written first that the shared dictionary is trained on
+ZDICT_TRAINING_SAMPLE_SIZE = 1000
+# metadata key under which stores keep the shared dictionary
+ZDICT_METADATA_KEY = "zdict"
+
+# fragments of JSON entries up to and including the next structural character,
+# e.g. `"unitName": "G"}` - these are what repeats across FoodData entries
+_FRAGMENT_RE = re.compile(rb'[^,{}\[\]]*[,{}\[\]]')
+
+@dataclass(frozen=True)
+class EntryCompression:
+  """
+  How a store compresses its entries.
+
+  `method` and `level` have the same meaning as for `zipfile`. If
+  `shared_dictionary` is set, entries are deflated using `zdict` as a preset
+  dictionary that is stored only once per store; until it has been trained
+  (see `train_zdict`), `zdict` is `None` and nothing can be compressed yet.
+  """
+  method: int = ZIP_DEFLATED
+  level: Optional[int] = None
+  shared_dictionary: bool = False
+  zdict: Optional[bytes] = None
+
+  def __post_init__(self):
+    if self.method not in (ZIP_STORED, ZIP_DEFLATED):
+      raise ValueError(f"unsupported compression: {self.method!r}")
+    if self.shared_dictionary and self.method != ZIP_DEFLATED:
+      raise ValueError("shared dictionaries require ZIP_DEFLATED")
+
+  @property
+  def needs_training(self) -> bool:
+    return self.shared_dictionary and self.zdict is None
+
+  def compress(self, data: bytes) -> bytes:
+    if self.shared_dictionary:
+      if self.zdict is None:
+        raise ValueError("shared dictionary hasn't been trained yet")
+      compressor = zlib.compressobj(
+        self.level if self.level is not None else zlib.Z_DEFAULT_COMPRESSION,
+        zlib.DEFLATED,
+        -zlib.MAX_WBITS,
+        zdict=self.zdict,
+      )
+      return compressor.compress(data) + compressor.flush()
+    elif self.method == ZIP_DEFLATED:
+      return raw_deflate(data, self.level)
+    return data
+
+  def decompress(self, data: Union[bytes, memoryview]) -> bytes:
+    if self.shared_dictionary:
+      if self.zdict is None:
+        raise ValueError("shared dictionary hasn't been trained yet")
+      decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=self.zdict)
+      return decompressor.decompress(data) + decompressor.flush()
+    elif self.method == ZIP_DEFLATED:
+      return raw_inflate(data)
+    return bytes(data)
+
+def train_zdict(
+  sample_entries: Iterable[bytes], max_size: int = MAX_ZDICT_SIZE
+) -> bytes:
+  """
+  Builds a preset dictionary out of fragments that occur in several samples.
+
+  Fragments are ranked by how many bytes they'd save overall (number of
+  samples containing them times their length). The best ones are placed at the
+  end of the dictionary, as deflate encodes shorter distances more cheaply.
+  """
+  n_samples_by_fragment: Counter = Counter()
+  for entry in sample_entries:
+    n_samples_by_fragment.update(set(_FRAGMENT_RE.findall(entry)))
+  ranked = sorted(
+    (
+      (n * len(fragment), fragment)
+      for fragment, n in n_samples_by_fragment.items()
+      if n > 1 and len(fragment) > 2
+    ),
+    reverse=True,
+  )
+  chosen: List[bytes] = []
+  size = 0
+  for _, fragment in ranked:
+    if size + len(fragment) > max_size:
+      continue
+    chosen.append(fragment)
+    size += len(fragment)
+  return b"".join(reversed(chosen))
+
+def train_on_first_entries(
+  index_values_and_entries: Iterable[Tuple[str, bytes]],
+  train: Callable[[Sequence[bytes]], None],
+) -> Iterable[Tuple[str, bytes]]:
+  """
+  Calls `train` with the first entries of the given iterable and returns an
+  iterable equivalent to the original one.
+  """
+  it = iter(index_values_and_entries)
+  sample = list(islice(it, ZDICT_TRAINING_SAMPLE_SIZE))
+  train([entry for _, entry in sample])
+  return chain(sample, it)
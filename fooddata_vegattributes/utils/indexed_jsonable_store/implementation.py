@@ -1,25 +1,40 @@
 from collections import defaultdict
+from itertools import count, groupby
+from operator import itemgetter
 from os import PathLike
 from typing import (
+  Any,
+  Dict,
   Generator,
   Generic,
   Iterable,
+  List,
   Mapping,
+  MutableMapping,
   MutableSequence,
+  Optional,
   Sequence,
+  Set,
   Tuple,
   TypeVar,
   Union,
 )
 
+from ..bounded_cache import CachePolicy
+from ..close_on_exit import CloseOnExit
 from ..close_via_stack import CloseViaStack
+from ..external_sort import ExternalSorter
 from .abstract import (
   AbstractIndexedJsonableStore,
   IndexSpec,
+  ProjectionSpec,
 )
 from .abstract_indexable_linkable_jsonable_store import (
   AbstractIndexableLinkableJsonableStore,
+  LinkTargets,
 )
+from .entry_codec import EntryCodec
+from .store_format import compact_bytes_store, StoreFormat
 from .zipped_indexable_linkable_jsonable_store import (
   ZippedIndexableLinkableJsonableStore,
   ZIP_DEFLATED,
@@ -28,48 +43,264 @@ from .zipped_indexable_linkable_jsonable_store import (
 
 T = TypeVar("T")
 
-class AutoIndexingJsonableWriter(Generic[T]):
+class AutoIndexingJsonableWriter(CloseOnExit, Generic[T]):
+  """
+  Writes entries by their primary index and maintains links for their
+  secondary indices.
+
+  By default, the secondary index values of all entries written are collected
+  in `secondary_maps`. If `max_postings_in_memory` is given, they're instead
+  collected as (value, primary) "postings" in an `ExternalSorter` per index,
+  which spills them to temporary files once there are more than that, and
+  written as sorted links at the end of each `put_entries` call. This keeps
+  memory use flat no matter how many entries are written, but leaves
+  `secondary_maps` empty. Either way, the links written are merged with those
+  already in the store, e.g. from an earlier session.
+
+  Entries' `projections` are written after the entries themselves, so they're
+  buffered in the same way (in memory or, if `max_postings_in_memory` is
+  given, in an `ExternalSorter`) until the end of each `put_entries` call.
+  """
   def __init__(
     self,
     jsonable_store: AbstractIndexableLinkableJsonableStore,
     primary_index: IndexSpec,
     secondary_indices: Sequence[IndexSpec],
+    max_postings_in_memory: Optional[int] = None,
+    projections: Sequence[ProjectionSpec] = (),
   ):
+    if primary_index.multi_valued:
+      raise ValueError("primary index can't be multi-valued")
     self.jsonable_store = jsonable_store
     self.primary_index = primary_index
     self.secondary_indices = secondary_indices
+    self.projections = projections
     # note that this is explicitly part of the public interface:
-    self.secondary_maps: Mapping[str, Mapping[str, MutableSequence[str]]] = {
-      s.name: defaultdict(lambda: []) for s in self.secondary_indices
+    self.secondary_maps: Mapping[
+      str, MutableMapping[str, MutableSequence[str]]
+    ] = {s.name: defaultdict(lambda: []) for s in self.secondary_indices}
+    self._postings_sorters: Dict[str, ExternalSorter] = (
+      {
+        s.name: ExternalSorter(max_postings_in_memory)
+        for s in self.secondary_indices
+      }
+      if max_postings_in_memory is not None
+      else {}
+    )
+    self._projection_buffers: Dict[str, List[Tuple[str, Any]]] = {
+      p.name: [] for p in self.projections
     }
+    self._projection_sorters: Dict[str, ExternalSorter] = (
+      {
+        p.name: ExternalSorter(max_postings_in_memory)
+        for p in self.projections
+      }
+      if max_postings_in_memory is not None
+      else {}
+    )
+    # keeps postings of the same value in the order they were written
+    self._posting_counter = count()
+
+  def close(self):
+    for sorter in self._postings_sorters.values():
+      sorter.close()
+    for sorter in self._projection_sorters.values():
+      sorter.close()
 
   def put_entries(self, jsonables: Iterable[T]):
     self.jsonable_store.put_entries(
       self.primary_index.name, self._iter_primary_indexed_jsonables(jsonables)
     )
+    self._write_projections()
     self._write_secondary_indices()
 
+  def upsert_entries(self, jsonables: Iterable[T]):
+    """
+    Like `put_entries`, but also removes replaced entries from the secondary
+    index values they had before, which requires reading them first.
+    """
+    jsonables_by_primary = {
+      self.primary_index.func(jsonable): jsonable for jsonable in jsonables
+    }
+    old_jsonables_by_primary = self._get_existing(jsonables_by_primary)
+    self.jsonable_store.put_entries(
+      self.primary_index.name, jsonables_by_primary.items()
+    )
+    for projection in self.projections:
+      self.jsonable_store.put_entries(
+        projection.name,
+        (
+          (primary, projection.func(jsonable))
+          for primary, jsonable in jsonables_by_primary.items()
+        ),
+      )
+    self._update_secondary_indices(
+      old_jsonables_by_primary, jsonables_by_primary
+    )
+
+  def delete_entries(self, primary_values: Iterable[str]):
+    """
+    Deletes entries along with their secondary index links, ignoring primary
+    index values that don't exist.
+    """
+    old_jsonables_by_primary = self._get_existing(primary_values)
+    self.jsonable_store.delete_entries(
+      self.primary_index.name, old_jsonables_by_primary.keys()
+    )
+    for projection in self.projections:
+      self.jsonable_store.delete_entries(
+        projection.name, old_jsonables_by_primary.keys()
+      )
+    self._update_secondary_indices(old_jsonables_by_primary, {})
+
+  def _get_existing(self, primary_values: Iterable[str]) -> Dict[str, T]:
+    result: Dict[str, T] = {}
+    for primary in primary_values:
+      try:
+        result[primary] = self.jsonable_store.get_entry(
+          self.primary_index.name, primary
+        )
+      except KeyError:
+        pass
+    return result
+
+  def _update_secondary_indices(
+    self,
+    old_jsonables_by_primary: Mapping[str, T],
+    new_jsonables_by_primary: Mapping[str, T],
+  ):
+    for secondary in self.secondary_indices:
+      removed: Dict[str, Set[str]] = defaultdict(set)
+      for primary, jsonable in old_jsonables_by_primary.items():
+        for value in secondary.iter_values(jsonable):
+          removed[value].add(primary)
+      added: Dict[str, List[str]] = defaultdict(list)
+      for primary, jsonable in new_jsonables_by_primary.items():
+        for value in secondary.iter_values(jsonable):
+          added[value].append(primary)
+      secondary_map = self.secondary_maps[secondary.name]
+      updated: Dict[str, List[str]] = {}
+      emptied: List[str] = []
+      for value in removed.keys() | added.keys():
+        try:
+          targets = self.jsonable_store.get_link_targets(
+            secondary.name, value
+          )
+        except KeyError:
+          targets = []
+        # entries that keep their value also keep their position
+        stale = removed[value] - set(added[value])
+        primaries = [p for _, p in targets if p not in stale]
+        known = set(primaries)
+        primaries.extend(p for p in added[value] if p not in known)
+        if primaries:
+          updated[value] = primaries
+          secondary_map[value] = list(primaries)
+        else:
+          emptied.append(value)
+          secondary_map.pop(value, None)
+      self.jsonable_store.put_links(
+        secondary.name,
+        (
+          (value, [(self.primary_index.name, p) for p in primaries])
+          for value, primaries in updated.items()
+        ),
+      )
+      self.jsonable_store.delete_links(secondary.name, emptied)
+
   def _iter_primary_indexed_jsonables(
     self, jsonables: Iterable[T]
   ) -> Generator[Tuple[str, T], None, None]:
     for jsonable in jsonables:
       primary = self.primary_index.func(jsonable)
       for secondary in self.secondary_indices:
-        self.secondary_maps[secondary.name][secondary.func(jsonable)].append(
-          primary
-        )
+        sorter = self._postings_sorters.get(secondary.name)
+        for value in secondary.iter_values(jsonable):
+          if sorter is not None:
+            sorter.add((value, next(self._posting_counter), primary))
+          else:
+            self.secondary_maps[secondary.name][value].append(primary)
+      for projection in self.projections:
+        projected = projection.func(jsonable)
+        sorter = self._projection_sorters.get(projection.name)
+        if sorter is not None:
+          sorter.add((primary, next(self._posting_counter), projected))
+        else:
+          self._projection_buffers[projection.name].append(
+            (primary, projected)
+          )
       yield primary, jsonable
 
+  def _write_projections(self):
+    for projection in self.projections:
+      sorter = self._projection_sorters.get(projection.name)
+      if sorter is not None:
+        # a primary value written twice sorts in write order, so the last
+        # projection wins just like the last entry does
+        self.jsonable_store.put_entries(
+          projection.name,
+          (
+            (primary, projected)
+            for primary, _, projected in sorter.iter_sorted()
+          ),
+        )
+      else:
+        buffer = self._projection_buffers[projection.name]
+        self.jsonable_store.put_entries(projection.name, buffer)
+        buffer.clear()
+
   def _write_secondary_indices(self):
+    if self._postings_sorters:
+      self._write_sorted_secondary_indices()
+      return
     for name, map in self.secondary_maps.items():
       self.jsonable_store.put_links(
         name,
         (
-          (k, [(self.primary_index.name, target) for target in targets])
+          (k, self._merge_with_existing_targets(name, k, targets))
           for k, targets in map.items()
         ),
       )
 
+  def _write_sorted_secondary_indices(self):
+    for name, sorter in self._postings_sorters.items():
+      self.jsonable_store.put_sorted_links(
+        name,
+        (
+          (
+            value,
+            self._merge_with_existing_targets(
+              name, value, (primary for _, _, primary in postings)
+            ),
+          )
+          for value, postings in groupby(
+            sorter.iter_sorted(), key=itemgetter(0)
+          )
+        ),
+      )
+
+  def _merge_with_existing_targets(
+    self, index_name: str, index_value: str, primaries: Iterable[str]
+  ) -> LinkTargets:
+    # links are replaced as a whole, so those from earlier calls (or sessions)
+    # have to be carried over
+    try:
+      targets = [
+        (target_index_name, target_index_value)
+        for target_index_name, target_index_value in (
+          self.jsonable_store.get_link_targets(index_name, index_value)
+        )
+      ]
+    except KeyError:
+      targets = []
+    known = set(targets)
+    for primary in primaries:
+      target = (self.primary_index.name, primary)
+      if target not in known:
+        targets.append(target)
+        known.add(target)
+    return targets
+
 
 class IndexedJsonableStore(
   CloseViaStack, AbstractIndexedJsonableStore, Generic[T],
@@ -78,16 +309,24 @@ class IndexedJsonableStore(
     self,
     indexable_jsonable_store: AbstractIndexableLinkableJsonableStore[T],
     primary_index: IndexSpec,
-    secondary_indices: Sequence[IndexSpec]
+    secondary_indices: Sequence[IndexSpec],
+    max_postings_in_memory: Optional[int] = None,
+    projections: Sequence[ProjectionSpec] = (),
   ):
     self.indexable_jsonable_store = indexable_jsonable_store
+    self.primary_index = primary_index
+    self.secondary_indices = secondary_indices
+    self.projections = projections
     self.auto_indexing_writer: AutoIndexingJsonableWriter[T] = (
       AutoIndexingJsonableWriter(
         indexable_jsonable_store,
         primary_index,
         secondary_indices,
+        max_postings_in_memory=max_postings_in_memory,
+        projections=projections,
       )
     )
+    self.close_stack.enter_context(self.auto_indexing_writer)
 
   @classmethod
   def from_path(
@@ -99,28 +338,139 @@ class IndexedJsonableStore(
     compression=ZIP_DEFLATED,
     compresslevel=None,
     caching=True,
+    cache_policy: Optional[CachePolicy] = None,
+    format: StoreFormat = StoreFormat.ZIP,
+    build_jobs: int = 1,
+    shared_dictionary=False,
+    codec: Optional[EntryCodec] = None,
+    max_postings_in_memory: Optional[int] = None,
+    projections: Sequence[ProjectionSpec[T]] = (),
   ):
+    """
+    Opens store for reading or writing depending on the given mode.
+
+    See `ZippedIndexableLinkableJsonableStore.from_path` for most arguments
+    and `AutoIndexingJsonableWriter` for `max_postings_in_memory`.
+    `projections` can be read via `get_entries` (using the projection's name
+    as the index name) or `iter_projected_entries`.
+    """
     indexable_store = ZippedIndexableLinkableJsonableStore.from_path(
       path=path,
       mode=mode,
       compression=compression,
       compresslevel=compresslevel,
       caching=caching,
+      cache_policy=cache_policy,
+      format=format,
+      build_jobs=build_jobs,
+      shared_dictionary=shared_dictionary,
+      codec=codec,
+    )
+    obj = cls(
+      indexable_store,
+      primary_index,
+      secondary_indices,
+      max_postings_in_memory=max_postings_in_memory,
+      projections=projections,
     )
-    obj = cls(indexable_store, primary_index, secondary_indices)
     obj.close_stack.enter_context(indexable_store)
     return obj
 
+  @classmethod
+  def compact(
+    cls,
+    path: Union[PathLike, str, bytes],
+    format: StoreFormat = StoreFormat.ZIP,
+  ):
+    """
+    Frees the space left behind by `upsert_entries` and `delete_entries` in
+    a store that isn't currently open.
+    """
+    compact_bytes_store(path, format=format)
+
   def put_entries(self, entries: Iterable[T]):
     self.auto_indexing_writer.put_entries(entries)
 
+  def upsert_entries(self, entries: Iterable[T]):
+    self.auto_indexing_writer.upsert_entries(entries)
+
+  def delete_entries(self, primary_values: Iterable[str]):
+    self.auto_indexing_writer.delete_entries(primary_values)
+
+  def put_metadata(self, key: str, value: bytes):
+    self.indexable_jsonable_store.put_metadata(key, value)
+
+  def get_metadata(self, key: str) -> Optional[bytes]:
+    return self.indexable_jsonable_store.get_metadata(key)
+
   def get_entry(self, index_name: str, index_value: str) -> T:
     return self.indexable_jsonable_store.get_entry(index_name, index_value)
 
+  def get_entries(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> Dict[str, T]:
+    return self.indexable_jsonable_store.get_entries(index_name, index_values)
+
   def iter_entries(
     self, index_name: str, index_value: str
   ) -> Iterable[bytes]:
     return self.indexable_jsonable_store.iter_entries(index_name, index_value)
 
+  def iter_projected_entries(
+    self, projection_name: str, index_name: str, index_value: str
+  ) -> Iterable[Any]:
+    if index_name == self.primary_index.name:
+      primary_values = [index_value]
+    else:
+      primary_values = self.get_primary_values(index_name, index_value)
+    projected_by_primary = self.indexable_jsonable_store.get_entries(
+      projection_name, primary_values
+    )
+    return (projected_by_primary[primary] for primary in primary_values)
+
   def iter_index(self, index_name: str) -> Iterable[str]:
     return self.indexable_jsonable_store.iter_index(index_name)
+
+  def get_primary_values(
+    self, index_name: str, index_value: str
+  ) -> List[str]:
+    try:
+      targets = self.indexable_jsonable_store.get_link_targets(
+        index_name, index_value
+      )
+    except KeyError:
+      return []
+    return [target_index_value for _, target_index_value in targets]
+
+  def intersect(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> List[str]:
+    # starting with the shortest posting list means that long ones (common
+    # values) are only checked against few candidates
+    posting_lists = sorted(
+      (
+        self.get_primary_values(index_name, index_value)
+        for index_value in set(index_values)
+      ),
+      key=len,
+    )
+    if not posting_lists:
+      return []
+    result = list(dict.fromkeys(posting_lists[0]))
+    for posting_list in posting_lists[1:]:
+      if not result:
+        break
+      postings = set(posting_list)
+      result = [primary for primary in result if primary in postings]
+    return result
+
+  def iter_range(
+    self,
+    index_name: str,
+    lo: Optional[str] = None,
+    hi: Optional[str] = None,
+  ) -> Iterable[str]:
+    return self.indexable_jsonable_store.iter_range(index_name, lo, hi)
+
+  def iter_prefix(self, index_name: str, prefix: str) -> Iterable[str]:
+    return self.indexable_jsonable_store.iter_prefix(index_name, prefix)
@@ -0,0 +1,31 @@
+from bisect import bisect_left
+import sys
+from typing import Iterator, Optional, Sequence, Tuple
+
+
+def iter_sorted_range(
+  sorted_values: Sequence[str], lo: Optional[str], hi: Optional[str]
+) -> Iterator[str]:
+  """
+  Yields the values `lo <= v < hi` of a sorted sequence, found via bisection.
+
+  `None` means the range is unbounded on that side.
+  """
+  start = bisect_left(sorted_values, lo) if lo is not None else 0
+  stop = (
+    bisect_left(sorted_values, hi, lo=start) if hi is not None
+    else len(sorted_values)
+  )
+  return (sorted_values[i] for i in range(start, stop))
+
+def prefix_range(prefix: str) -> Tuple[str, Optional[str]]:
+  """
+  Returns `(lo, hi)` such that `lo <= v < hi` holds for exactly those strings
+  `v` that start with `prefix`.
+
+  `hi` is `None` if there is no upper bound, e.g. for the empty prefix.
+  """
+  stripped = prefix.rstrip(chr(sys.maxunicode))
+  if not stripped:
+    return prefix, None
+  return prefix, stripped[:-1] + chr(ord(stripped[-1]) + 1)
@@ -0,0 +1,463 @@
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, replace
+import json
+import mmap
+import os
+from os import PathLike
+import struct
+import sys
+from typing import (
+  BinaryIO, Dict, Iterable, List, Optional, Sequence, Tuple, Union,
+)
+from zipfile import ZIP_DEFLATED, ZIP_STORED
+
+from .abstract_indexable_linkable_bytes_store import (
+  BytesLike,
+  LinksForSourceIndexName,
+)
+from .abstract_link_resolving_bytes_store import (
+  AbstractLinkResolvingBytesStore,
+)
+from ..close_via_stack import CloseViaStack
+from .entry_compression import (
+  EntryCompression,
+  train_on_first_entries,
+  train_zdict,
+  ZDICT_METADATA_KEY,
+)
+from .ordered_index import iter_sorted_range
+from .precompressed_entry import precompress_entry, PrecompressedEntry
+
+
+MAGIC = b"FDVAPACK"
+FORMAT_VERSION = 1
+# footer: offset and length of the table of contents, followed by MAGIC again
+FOOTER_STRUCT = struct.Struct("<QQ8s")
+
+@dataclass
+class DataIndexTable:
+  """
+  Sorted offset/length table of one data index.
+  """
+  index_values: List[str]
+  offsets: "array[int]"
+  lengths: "array[int]"
+
+  def find(self, index_value: str) -> Optional[Tuple[int, int]]:
+    i = bisect_left(self.index_values, index_value)
+    if i < len(self.index_values) and self.index_values[i] == index_value:
+      return self.offsets[i], self.lengths[i]
+    return None
+
+class PackedIndexableLinkableBytesStore(
+  CloseViaStack, AbstractLinkResolvingBytesStore,
+):
+  """
+  Indexed bytes stored back-to-back in a single file, followed by one sorted
+  offset/length table per index and a table of contents.
+
+  Entries are read from a memory map. If the store was written without
+  compression, entries are returned as `memoryview` slices of the map without
+  copying them. Such views must be released before the store can release the
+  map; views still alive on close keep it around until they're gone.
+
+  Only complete rewrites (mode `"w"`) and reading (mode `"r"`) are supported,
+  as the tables are written once on close. Entries replaced or deleted while
+  writing still take up space until the file is rewritten using `compact`.
+
+  With `shared_dictionary`, entries are deflated using a preset dictionary
+  trained on the first entries written (see `EntryCompression`). Whether a
+  file uses one is detected automatically when reading.
+
+  Thread safety: In read mode, reads may happen from several threads at once,
+  as they only slice the memory map. Writing is not thread-safe.
+  """
+  def __init__(
+    self,
+    file: BinaryIO,
+    mode: str = "r",
+    compression: int = ZIP_DEFLATED,
+    compresslevel: Optional[int] = None,
+    shared_dictionary: bool = False,
+  ):
+    self.file = file
+    self.mode = mode
+    self.entry_compression = EntryCompression(
+      compression, compresslevel, shared_dictionary=shared_dictionary
+    )
+    self._mmap: Optional[mmap.mmap] = None
+    self._tables: Dict[str, DataIndexTable] = {}
+    self._links: Dict[str, LinksForSourceIndexName] = {}
+    self._link_regions: Dict[str, Tuple[int, int]] = {}
+    self._sorted_link_values: Dict[str, List[str]] = {}
+    self._metadata: Dict[str, bytes] = {}
+    self._metadata_regions: Dict[str, Tuple[int, int]] = {}
+    # only used while writing:
+    self._pending_positions: Dict[str, Dict[str, Tuple[int, int]]] = {}
+    if mode == "r":
+      self._open_for_reading()
+    elif mode == "w":
+      self.file.write(MAGIC)
+    else:
+      raise ValueError(f"unsupported mode for packed store: {mode!r}")
+
+  @classmethod
+  def from_path(
+    cls,
+    path: Union[PathLike, str, bytes],
+    mode="r",
+    compression=ZIP_DEFLATED,
+    compresslevel=None,
+    shared_dictionary=False,
+  ) -> "PackedIndexableLinkableBytesStore":
+    """
+    Opens packed store for reading or writing depending on the given mode.
+
+    `compression` must be `zipfile.ZIP_STORED` or `zipfile.ZIP_DEFLATED`; on
+    reading, the settings found in the file are used instead.
+    """
+    if compression not in (ZIP_STORED, ZIP_DEFLATED):
+      raise ValueError(f"unsupported compression: {compression!r}")
+    file = open(path, "rb" if mode == "r" else "w+b")
+    try:
+      obj = cls(
+        file=file,
+        mode=mode,
+        compression=compression,
+        compresslevel=compresslevel,
+        shared_dictionary=shared_dictionary,
+      )
+    except BaseException:
+      file.close()
+      raise
+    obj.close_stack.enter_context(file)
+    obj.close_stack.callback(obj._finish)
+    return obj
+
+  @classmethod
+  def compact(cls, path: Union[PathLike, str, bytes]):
+    """
+    Rewrites the file at the given path without the space taken up by
+    replaced or deleted entries.
+
+    Entries are copied as they are, without decompressing and recompressing
+    them. The compacted file only replaces the original once it's complete.
+    """
+    path = os.fsdecode(os.fspath(path))
+    tmp_path = f"{path}.compacting"
+    try:
+      with cls.from_path(path, mode="r") as store:
+        with cls.from_path(
+          tmp_path, mode="w", compression=store.entry_compression.method
+        ) as compacted:
+          store._copy_to(compacted)
+      os.replace(tmp_path, path)
+    except BaseException:
+      if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+      raise
+
+  def _copy_to(self, target: "PackedIndexableLinkableBytesStore"):
+    # includes the compression dictionary, if any, which is all it takes for
+    # the copied entries to be readable
+    for key in self._metadata_regions:
+      target.put_metadata(key, self._read_bytes(*self._metadata_regions[key]))
+    for index_name, table in self._tables.items():
+      positions = target._pending_positions.setdefault(index_name, {})
+      for index_value, offset, length in zip(
+        table.index_values, table.offsets, table.lengths
+      ):
+        positions[index_value] = target._append(
+          self._read_bytes(offset, length)
+        )
+    for index_name in self._link_regions:
+      target._put_links(index_name, self._load_links(index_name))
+
+  def _open_for_reading(self):
+    try:
+      self._mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError as e:  # empty file
+      raise BadPackedFile("file is empty") from e
+    try:
+      self._read_toc()
+    except BaseException:
+      self._close_mmap()
+      raise
+
+  def _read_toc(self):
+    assert self._mmap is not None
+    file_size = len(self._mmap)
+    if file_size < len(MAGIC) + FOOTER_STRUCT.size:
+      raise BadPackedFile("file is too short to be a packed store file")
+    if self._mmap[:len(MAGIC)] != MAGIC:
+      raise BadPackedFile("not a packed store file")
+    toc_offset, toc_length, footer_magic = FOOTER_STRUCT.unpack(
+      self._mmap[-FOOTER_STRUCT.size:]
+    )
+    if footer_magic != MAGIC:
+      raise BadPackedFile("packed store file is truncated")
+    if (
+      toc_offset < len(MAGIC)
+      or toc_offset + toc_length > file_size - FOOTER_STRUCT.size
+    ):
+      raise BadPackedFile("table of contents is out of bounds")
+    # anything wrong with the table of contents that makes it unusable should
+    # be reported like the other signs of a malformed file
+    try:
+      toc = json.loads(self._read_bytes(toc_offset, toc_length))
+      if toc["version"] != FORMAT_VERSION:
+        raise BadPackedFile(f"unsupported format version: {toc['version']}")
+      self._metadata_regions = {
+        key: (offset, length)
+        for key, (offset, length) in toc.get("metadata", {}).items()
+      }
+      zdict = self.get_metadata(ZDICT_METADATA_KEY)
+      self.entry_compression = EntryCompression(
+        toc["compression"], shared_dictionary=zdict is not None, zdict=zdict
+      )
+      for index_name, d in toc["data_indices"].items():
+        table = DataIndexTable(
+          index_values=json.loads(self._read_bytes(*d["index_values"])),
+          offsets=_unpack_uint64_array(self._read_raw(*d["offsets"])),
+          lengths=_unpack_uint64_array(self._read_raw(*d["lengths"])),
+        )
+        if not (
+          len(table.index_values) == len(table.offsets) == len(table.lengths)
+        ):
+          raise BadPackedFile(f"table of index {index_name!r} is truncated")
+        self._tables[index_name] = table
+      self._link_regions = {
+        index_name: (offset, length)
+        for index_name, (offset, length) in toc["link_indices"].items()
+      }
+    except (ValueError, KeyError, TypeError) as e:
+      raise BadPackedFile("malformed table of contents") from e
+
+  def _finish(self):
+    if self.mode == "w":
+      self._write_tables()
+    self._close_mmap()
+
+  def _close_mmap(self):
+    if self._mmap is not None:
+      try:
+        self._mmap.close()
+      except BufferError:
+        # there are still views of entries around, which keep the map alive
+        # until they are garbage collected
+        pass
+
+  def put_entries(
+    self,
+    index_name: str,
+    index_values_and_entries: Iterable[Tuple[str, bytes]],
+  ):
+    if self.entry_compression.needs_training:
+      index_values_and_entries = train_on_first_entries(
+        index_values_and_entries, self.train_compression
+      )
+    self.put_precompressed_entries(
+      index_name,
+      (
+        (index_value, precompress_entry(entry, self.entry_compression))
+        for index_value, entry in index_values_and_entries
+      ),
+    )
+
+  def put_precompressed_entries(
+    self,
+    index_name: str,
+    index_values_and_entries: Iterable[Tuple[str, PrecompressedEntry]],
+  ):
+    if self.entry_compression.needs_training:
+      raise ValueError("compression must be trained first")
+    positions = self._pending_positions.setdefault(index_name, {})
+    for index_value, entry in index_values_and_entries:
+      positions[index_value] = self._append(entry.data)
+
+  def delete_entries(self, index_name: str, index_values: Iterable[str]):
+    if self.mode != "w":
+      raise ValueError("packed stores can only be modified while writing")
+    positions = self._pending_positions.get(index_name, {})
+    for index_value in index_values:
+      positions.pop(index_value, None)
+
+  def get_compression(self) -> EntryCompression:
+    return self.entry_compression
+
+  def train_compression(self, sample_entries: Sequence[bytes]):
+    if not self.entry_compression.needs_training:
+      return
+    zdict = train_zdict(sample_entries)
+    self.put_metadata(ZDICT_METADATA_KEY, zdict)
+    self.entry_compression = replace(self.entry_compression, zdict=zdict)
+
+  def put_metadata(self, key: str, value: bytes):
+    # written out on close like the links
+    self._metadata[key] = value
+
+  def get_metadata(self, key: str) -> Optional[bytes]:
+    if key not in self._metadata and key in self._metadata_regions:
+      self._metadata[key] = self._read_bytes(*self._metadata_regions[key])
+    return self._metadata.get(key)
+
+  def _get_entry_no_resolve(
+    self, index_name: str, index_value: str
+  ) -> BytesLike:
+    position = self._find(index_name, index_value)
+    if position is None:
+      raise KeyError(
+        f"Entry for {index_name}={index_value} not in indexed JSON file"
+      )
+    return self._decompress(self._read_raw(*position))
+
+  def _get_entries_no_resolve(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> Dict[str, BytesLike]:
+    positions_and_values: List[Tuple[Tuple[int, int], str]] = []
+    for index_value in index_values:
+      position = self._find(index_name, index_value)
+      if position is None:
+        raise KeyError(
+          f"Entry for {index_name}={index_value} not in indexed JSON file"
+        )
+      positions_and_values.append((position, index_value))
+    positions_and_values.sort()
+    result: Dict[str, BytesLike] = {}
+    for position, index_value in positions_and_values:
+      result[index_value] = self._decompress(self._read_raw(*position))
+    return result
+
+  def _find(
+    self, index_name: str, index_value: str
+  ) -> Optional[Tuple[int, int]]:
+    if self.mode == "w":
+      return self._pending_positions.get(index_name, {}).get(index_value)
+    table = self._tables.get(index_name)
+    return table.find(index_value) if table is not None else None
+
+  def _iter_data_index(self, index_name: str) -> Iterable[str]:
+    if self.mode == "w":
+      return iter(self._pending_positions.get(index_name, {}))
+    return iter(self._tables[index_name].index_values)
+
+  def _iter_data_index_range(
+    self, index_name: str, lo: Optional[str], hi: Optional[str]
+  ) -> Iterable[str]:
+    if self.mode == "w":
+      return super()._iter_data_index_range(index_name, lo, hi)
+    # tables are sorted already
+    return iter_sorted_range(self._tables[index_name].index_values, lo, hi)
+
+  def _iter_link_index_range(
+    self, index_name: str, lo: Optional[str], hi: Optional[str]
+  ) -> Iterable[str]:
+    if self.mode == "w":
+      return super()._iter_link_index_range(index_name, lo, hi)
+    sorted_values = self._sorted_link_values.get(index_name)
+    if sorted_values is None:
+      sorted_values = self._sorted_link_values.setdefault(
+        index_name, sorted(self._load_links(index_name))
+      )
+    return iter_sorted_range(sorted_values, lo, hi)
+
+  def _is_data_index(self, index_name: str) -> bool:
+    if self.mode == "w":
+      return index_name in self._pending_positions
+    return index_name in self._tables
+
+  def _is_link_index(self, index_name: str) -> bool:
+    if self.mode == "w":
+      return index_name in self._links
+    return index_name in self._links or index_name in self._link_regions
+
+  def _load_links(self, index_name: str) -> LinksForSourceIndexName:
+    links_for_index = self._links.get(index_name)
+    if links_for_index is None:
+      if self.mode == "w":
+        raise KeyError(f"no links for index {index_name!r}")
+      # threads racing to load the same links all end up with the same dict
+      links_for_index = self._links.setdefault(
+        index_name,
+        json.loads(self._read_bytes(*self._link_regions[index_name])),
+      )
+    return links_for_index
+
+  def _put_links(
+    self,
+    index_name: str,
+    links_for_index: LinksForSourceIndexName,
+  ):
+    # written out on close, so just remember them
+    self._links[index_name] = links_for_index
+
+  def _decompress(self, raw: BytesLike) -> BytesLike:
+    if self.entry_compression.method == ZIP_STORED:
+      # no copy necessary
+      return raw
+    return self.entry_compression.decompress(raw)
+
+  def _append(self, data: bytes) -> Tuple[int, int]:
+    offset = self.file.seek(0, os.SEEK_END)
+    self.file.write(data)
+    return offset, len(data)
+
+  def _read_raw(self, offset: int, length: int) -> BytesLike:
+    if self._mmap is not None:
+      return memoryview(self._mmap)[offset:offset+length]
+    # still writing, so there is no map yet
+    return self._read_bytes(offset, length)
+
+  def _read_bytes(self, offset: int, length: int) -> bytes:
+    if self._mmap is not None:
+      return self._mmap[offset:offset+length]
+    self.file.flush()
+    return os.pread(self.file.fileno(), length, offset)
+
+  def _write_tables(self):
+    data_indices = {}
+    for index_name, positions in self._pending_positions.items():
+      index_values = sorted(positions)
+      offsets = array("Q", (positions[v][0] for v in index_values))
+      lengths = array("Q", (positions[v][1] for v in index_values))
+      data_indices[index_name] = {
+        "index_values": self._append(
+          json.dumps(index_values).encode("utf-8")
+        ),
+        "offsets": self._append(_pack_uint64_array(offsets)),
+        "lengths": self._append(_pack_uint64_array(lengths)),
+      }
+    link_indices = {
+      index_name: self._append(json.dumps(links).encode("utf-8"))
+      for index_name, links in self._links.items()
+    }
+    metadata = {
+      key: self._append(value) for key, value in self._metadata.items()
+    }
+    toc = {
+      "version": FORMAT_VERSION,
+      "compression": self.entry_compression.method,
+      "data_indices": data_indices,
+      "link_indices": link_indices,
+      "metadata": metadata,
+    }
+    toc_offset, toc_length = self._append(json.dumps(toc).encode("utf-8"))
+    self.file.write(FOOTER_STRUCT.pack(toc_offset, toc_length, MAGIC))
+    self.file.flush()
+
+class BadPackedFile(Exception):
+  pass
+
+def _pack_uint64_array(a: "array[int]") -> bytes:
+  if sys.byteorder != "little":
+    a = array("Q", a)
+    a.byteswap()
+  return a.tobytes()
+
+def _unpack_uint64_array(b: BytesLike) -> "array[int]":
+  a = array("Q")
+  a.frombytes(b)
+  if sys.byteorder != "little":
+    a.byteswap()
+  return a
@@ -0,0 +1,59 @@
+import os
+import struct
+import zlib
+from zipfile import BadZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
+
+from .raw_deflate import raw_inflate
+
+
+# local file header as defined in the ZIP spec (APPNOTE.TXT 4.3.7)
+LOCAL_HEADER_STRUCT = struct.Struct("<4s2B4HL2L2H")
+LOCAL_HEADER_MAGIC = b"PK\003\004"
+# indices of the name and extra field lengths within the unpacked header
+_NAME_LENGTH = 10
+_EXTRA_LENGTH = 11
+
+SUPPORTED_COMPRESSION = (ZIP_STORED, ZIP_DEFLATED)
+
+def can_pread_zip_member(info: ZipInfo) -> bool:
+  # encrypted members are left to zipfile
+  return info.compress_type in SUPPORTED_COMPRESSION and not info.flag_bits & 1
+
+def pread_zip_member(fd: int, info: ZipInfo) -> bytes:
+  """
+  Reads and decompresses a ZIP member using positional reads only.
+
+  Unlike `ZipFile.open`, this never touches the file's seek position, so it
+  can be called from several threads on the same file descriptor at once.
+  Only members for which `can_pread_zip_member` is true are supported.
+  """
+  if not can_pread_zip_member(info):
+    raise ValueError(
+      f"can't read {info.filename!r} (compression method"
+      f" {info.compress_type}, flags {info.flag_bits:#x}) using pread"
+    )
+  raw = pread_raw_zip_member(fd, info)
+  data = raw_inflate(raw) if info.compress_type == ZIP_DEFLATED else raw
+  if zlib.crc32(data) != info.CRC:
+    raise BadZipFile(f"bad CRC-32 for {info.filename!r}")
+  return data
+
+def pread_raw_zip_member(fd: int, info: ZipInfo) -> bytes:
+  """
+  Like `pread_zip_member`, but returns the member's data as stored, i.e.
+  without decompressing or checking it.
+  """
+  header = os.pread(fd, LOCAL_HEADER_STRUCT.size, info.header_offset)
+  if len(header) != LOCAL_HEADER_STRUCT.size:
+    raise BadZipFile(f"truncated local header for {info.filename!r}")
+  fields = LOCAL_HEADER_STRUCT.unpack(header)
+  if fields[0] != LOCAL_HEADER_MAGIC:
+    raise BadZipFile(f"bad magic number for {info.filename!r}")
+  data_offset = (
+    info.header_offset + LOCAL_HEADER_STRUCT.size
+    + fields[_NAME_LENGTH] + fields[_EXTRA_LENGTH]
+  )
+  raw = os.pread(fd, info.compress_size, data_offset)
+  if len(raw) != info.compress_size:
+    raise BadZipFile(f"truncated data for {info.filename!r}")
+  return raw
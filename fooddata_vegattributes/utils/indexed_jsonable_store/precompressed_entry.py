@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+import zlib
+
+from .entry_compression import EntryCompression
+
+
+@dataclass(frozen=True)
+class PrecompressedEntry:
+  """
+  Entry compressed ahead of time (e.g. in another process), along with the
+  metadata stores need to write it without touching its contents again.
+  """
+  data: bytes
+  crc: int
+  size: int
+
+def precompress_entry(
+  entry: bytes, compression: EntryCompression
+) -> PrecompressedEntry:
+  """
+  Compresses entry exactly like a store using the given compression would.
+  """
+  return PrecompressedEntry(
+    data=compression.compress(entry), crc=zlib.crc32(entry), size=len(entry)
+  )
@@ -0,0 +1,18 @@
+from typing import Optional, Union
+import zlib
+
+
+def raw_deflate(data: bytes, compresslevel: Optional[int] = None) -> bytes:
+  """
+  Compresses data into a raw deflate stream (no zlib header or checksum), the
+  same way `zipfile` does for `ZIP_DEFLATED` members.
+  """
+  compressor = zlib.compressobj(
+    compresslevel if compresslevel is not None else zlib.Z_DEFAULT_COMPRESSION,
+    zlib.DEFLATED,
+    -zlib.MAX_WBITS,
+  )
+  return compressor.compress(data) + compressor.flush()
+
+def raw_inflate(data: Union[bytes, memoryview]) -> bytes:
+  return zlib.decompress(data, wbits=-zlib.MAX_WBITS)
@@ -0,0 +1,53 @@
+import time
+from typing import Optional
+from zipfile import ZipFile, ZipInfo, ZIP64_LIMIT
+
+from .precompressed_entry import PrecompressedEntry
+
+
+def write_raw_zip_member(
+  zipfile: ZipFile,
+  name: str,
+  entry: PrecompressedEntry,
+  compress_type: Optional[int] = None,
+):
+  """
+  Writes an already compressed member into an archive opened for writing.
+
+  The result is the same as writing the uncompressed data via
+  `zipfile.open(name, "w")`, provided the entry was compressed with the
+  archive's compression settings, but the data isn't compressed again.
+  `compress_type` overrides the compression method recorded for the member.
+
+  `zipfile` has no public API for this, so this mirrors what
+  `ZipFile._open_to_write` and `_ZipWriteFile.close` do. As CRC and sizes are
+  known up front, the local header is correct from the start and never has to
+  be rewritten.
+  """
+  if zipfile._writing:  # type: ignore[attr-defined]
+    raise ValueError(
+      "Can't write to the ZIP file while there is another write handle open "
+      "on it."
+    )
+  zinfo = ZipInfo(name, date_time=time.localtime(time.time())[:6])
+  zinfo.compress_type = (
+    compress_type if compress_type is not None else zipfile.compression
+  )
+  zinfo._compresslevel = zipfile.compresslevel  # type: ignore[attr-defined]
+  zinfo.external_attr = 0o600 << 16  # permissions: ?rw-------
+  zinfo.file_size = entry.size
+  zinfo.compress_size = len(entry.data)
+  zinfo.CRC = entry.crc
+  zip64 = zinfo.file_size * 1.05 > ZIP64_LIMIT
+  fp = zipfile.fp
+  assert fp is not None
+  if zipfile._seekable:  # type: ignore[attr-defined]
+    fp.seek(zipfile.start_dir)  # type: ignore[attr-defined]
+  zinfo.header_offset = fp.tell()
+  zipfile._writecheck(zinfo)  # type: ignore[attr-defined]
+  zipfile._didModify = True  # type: ignore[attr-defined]
+  fp.write(zinfo.FileHeader(zip64))
+  fp.write(entry.data)
+  zipfile.start_dir = fp.tell()  # type: ignore[attr-defined]
+  zipfile.filelist.append(zinfo)
+  zipfile.NameToInfo[zinfo.filename] = zinfo  # type: ignore[attr-defined]
@@ -0,0 +1,398 @@
+import os
+from os import fspath, PathLike
+from pathlib import Path
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+from zipfile import ZIP_DEFLATED, ZIP_STORED
+
+from .abstract_indexable_linkable_bytes_store import (
+  BytesLike,
+  LinkTargets,
+  LinksForSourceIndexName,
+)
+from .abstract_link_resolving_bytes_store import (
+  AbstractLinkResolvingBytesStore,
+)
+from ..close_via_stack import CloseViaStack
+from .entry_compression import EntryCompression
+from .precompressed_entry import PrecompressedEntry
+from .raw_deflate import raw_deflate, raw_inflate
+
+
+# stays below SQLite's default limit on the number of query parameters
+MAX_VALUES_PER_QUERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+  index_name TEXT NOT NULL,
+  index_value TEXT NOT NULL,
+  data BLOB NOT NULL,
+  PRIMARY KEY (index_name, index_value)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS links (
+  index_name TEXT NOT NULL,
+  index_value TEXT NOT NULL,
+  position INTEGER NOT NULL,
+  target_index_name TEXT NOT NULL,
+  target_index_value TEXT NOT NULL,
+  PRIMARY KEY (index_name, index_value, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS settings (
+  key TEXT PRIMARY KEY,
+  value
+);
+CREATE TABLE IF NOT EXISTS metadata (
+  key TEXT PRIMARY KEY,
+  value BLOB NOT NULL
+);
+"""
+
+class SqliteIndexableLinkableBytesStore(
+  CloseViaStack, AbstractLinkResolvingBytesStore,
+):
+  """
+  Indexed bytes stored in an SQLite database.
+
+  Data entries and links live in B-tree tables keyed by index name and value,
+  so looking up a single link doesn't require loading the whole index. Writes
+  are committed after each `put_*` call and the database uses write-ahead
+  logging, so other processes can keep reading while it's being updated.
+
+  Not thread-safe: like any `sqlite3` connection, the store may only be used
+  from the thread that opened it.
+  """
+  def __init__(
+    self,
+    connection: sqlite3.Connection,
+    compression: int = ZIP_DEFLATED,
+    compresslevel: Optional[int] = None,
+  ):
+    self.connection = connection
+    self.compresslevel = compresslevel
+    # only positive results are cached as indices can appear while writing
+    self._known_data_indices: Set[str] = set()
+    self._known_link_indices: Set[str] = set()
+    stored_compression = self._get_setting("compression")
+    if stored_compression is None:
+      self._set_setting("compression", compression)
+      self.connection.commit()
+      self.compression = compression
+    else:
+      self.compression = stored_compression
+
+  @classmethod
+  def from_path(
+    cls,
+    path: Union[PathLike, str, bytes],
+    mode="r",
+    compression=ZIP_DEFLATED,
+    compresslevel=None,
+  ) -> "SqliteIndexableLinkableBytesStore":
+    """
+    Opens database for reading or writing depending on the given mode.
+
+    Modes have the same meaning as for `zipfile.ZipFile`: `"r"` is read-only,
+    `"w"` replaces any existing database and `"a"` updates it in place.
+    `compression` must be `zipfile.ZIP_STORED` or `zipfile.ZIP_DEFLATED` and
+    is only used when creating a new database.
+    """
+    if compression not in (ZIP_STORED, ZIP_DEFLATED):
+      raise ValueError(f"unsupported compression: {compression!r}")
+    path = Path(os.fsdecode(fspath(path)))
+    if mode == "r":
+      if not path.exists():
+        raise FileNotFoundError(f"no such database: {str(path)!r}")
+      connection = sqlite3.connect(
+        f"{path.absolute().as_uri()}?mode=ro", uri=True
+      )
+    elif mode in ("w", "a"):
+      if mode == "w":
+        for p in [path, *(Path(f"{path}{s}") for s in ["-wal", "-shm"])]:
+          if p.exists():
+            p.unlink()
+      connection = sqlite3.connect(str(path))
+    else:
+      raise ValueError(f"unsupported mode for SQLite store: {mode!r}")
+    try:
+      if mode != "r":
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+      obj = cls(
+        connection=connection,
+        compression=compression,
+        compresslevel=compresslevel,
+      )
+    except BaseException:
+      connection.close()
+      raise
+    obj.close_stack.callback(connection.close)
+    obj.close_stack.callback(connection.commit)
+    return obj
+
+  @classmethod
+  def compact(cls, path: Union[PathLike, str, bytes]):
+    """
+    Frees the space taken up by replaced or deleted entries (SQLite `VACUUM`).
+    """
+    with cls.from_path(path, mode="a") as store:
+      store.connection.execute("VACUUM")
+
+  def put_entries(
+    self,
+    index_name: str,
+    index_values_and_entries: Iterable[Tuple[str, bytes]],
+  ):
+    with self.connection:
+      self.connection.executemany(
+        "INSERT OR REPLACE INTO entries (index_name, index_value, data) "
+        "VALUES (?, ?, ?)",
+        (
+          (index_name, index_value, self._compress(entry))
+          for index_value, entry in index_values_and_entries
+        ),
+      )
+
+  def put_precompressed_entries(
+    self,
+    index_name: str,
+    index_values_and_entries: Iterable[Tuple[str, PrecompressedEntry]],
+  ):
+    with self.connection:
+      self.connection.executemany(
+        "INSERT OR REPLACE INTO entries (index_name, index_value, data) "
+        "VALUES (?, ?, ?)",
+        (
+          (index_name, index_value, entry.data)
+          for index_value, entry in index_values_and_entries
+        ),
+      )
+
+  def delete_entries(self, index_name: str, index_values: Iterable[str]):
+    with self.connection:
+      self.connection.executemany(
+        "DELETE FROM entries WHERE index_name = ? AND index_value = ?",
+        ((index_name, index_value) for index_value in index_values),
+      )
+
+  def get_compression(self) -> EntryCompression:
+    return EntryCompression(self.compression, self.compresslevel)
+
+  def put_metadata(self, key: str, value: bytes):
+    with self.connection:
+      self.connection.execute(
+        "INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
+        (key, value),
+      )
+
+  def get_metadata(self, key: str) -> Optional[bytes]:
+    try:
+      row = self.connection.execute(
+        "SELECT value FROM metadata WHERE key = ?", (key,)
+      ).fetchone()
+    except sqlite3.OperationalError:
+      # databases created before there was metadata don't have the table
+      return None
+    return row[0] if row is not None else None
+
+  def put_links(
+    self,
+    index_name: str,
+    index_values_and_targets: Iterable[Tuple[str, LinkTargets]],
+  ):
+    with self.connection:
+      self._replace_links(index_name, index_values_and_targets)
+
+  def _replace_links(
+    self,
+    index_name: str,
+    index_values_and_targets: Iterable[Tuple[str, LinkTargets]],
+  ):
+    for index_value, targets in index_values_and_targets:
+      self.connection.execute(
+        "DELETE FROM links WHERE index_name = ? AND index_value = ?",
+        (index_name, index_value),
+      )
+      self.connection.executemany(
+        "INSERT INTO links (index_name, index_value, position,"
+        " target_index_name, target_index_value) VALUES (?, ?, ?, ?, ?)",
+        (
+          (index_name, index_value, position, *target)
+          for position, target in enumerate(targets)
+        ),
+      )
+
+  def delete_links(self, index_name: str, index_values: Iterable[str]):
+    with self.connection:
+      self.connection.executemany(
+        "DELETE FROM links WHERE index_name = ? AND index_value = ?",
+        ((index_name, index_value) for index_value in index_values),
+      )
+
+  def iter_index(self, index_name: str) -> Iterable[str]:
+    if self._is_data_index(index_name):
+      query = "SELECT index_value FROM entries WHERE index_name = ?"
+    else:
+      query = "SELECT DISTINCT index_value FROM links WHERE index_name = ?"
+    return [
+      index_value
+      for index_value, in self.connection.execute(query, (index_name,))
+    ]
+
+  def _iter_data_index(self, index_name: str) -> Iterable[str]:
+    return [
+      index_value for index_value, in self.connection.execute(
+        "SELECT index_value FROM entries WHERE index_name = ?", (index_name,)
+      )
+    ]
+
+  def _iter_data_index_range(
+    self, index_name: str, lo: Optional[str], hi: Optional[str]
+  ) -> Iterable[str]:
+    return self._iter_table_range(
+      "SELECT index_value FROM entries WHERE index_name = ?",
+      index_name, lo, hi,
+    )
+
+  def _iter_link_index_range(
+    self, index_name: str, lo: Optional[str], hi: Optional[str]
+  ) -> Iterable[str]:
+    return self._iter_table_range(
+      "SELECT DISTINCT index_value FROM links WHERE index_name = ?",
+      index_name, lo, hi,
+    )
+
+  def _iter_table_range(
+    self,
+    query: str,
+    index_name: str,
+    lo: Optional[str],
+    hi: Optional[str],
+  ) -> List[str]:
+    # both tables' primary keys start with (index_name, index_value), so this
+    # is a range scan over their B-trees
+    params: List[str] = [index_name]
+    if lo is not None:
+      query += " AND index_value >= ?"
+      params.append(lo)
+    if hi is not None:
+      query += " AND index_value < ?"
+      params.append(hi)
+    query += " ORDER BY index_value"
+    return [
+      index_value for index_value, in self.connection.execute(query, params)
+    ]
+
+  def _get_entry_no_resolve(self, index_name: str, index_value: str) -> bytes:
+    row = self.connection.execute(
+      "SELECT data FROM entries WHERE index_name = ? AND index_value = ?",
+      (index_name, index_value),
+    ).fetchone()
+    if row is None:
+      raise KeyError(
+        f"Entry for {index_name}={index_value} not in indexed JSON file"
+      )
+    return self._decompress(row[0])
+
+  def _get_entries_no_resolve(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> Dict[str, BytesLike]:
+    index_values_list: List[str] = list(index_values)
+    result: Dict[str, BytesLike] = {}
+    for i in range(0, len(index_values_list), MAX_VALUES_PER_QUERY):
+      chunk = index_values_list[i:i+MAX_VALUES_PER_QUERY]
+      rows = self.connection.execute(
+        "SELECT index_value, data FROM entries WHERE index_name = ?"
+        f" AND index_value IN ({', '.join('?' for _ in chunk)})",
+        (index_name, *chunk),
+      )
+      for index_value, data in rows:
+        result[index_value] = self._decompress(data)
+    for index_value in index_values_list:
+      if index_value not in result:
+        raise KeyError(
+          f"Entry for {index_name}={index_value} not in indexed JSON file"
+        )
+    return result
+
+  def _get_link_targets(
+    self, index_name: str, index_value: str
+  ) -> LinkTargets:
+    targets = self.connection.execute(
+      "SELECT target_index_name, target_index_value FROM links"
+      " WHERE index_name = ? AND index_value = ? ORDER BY position",
+      (index_name, index_value),
+    ).fetchall()
+    if not targets:
+      raise KeyError(f"no links for {index_name}='{index_value}'")
+    return targets
+
+  def _load_links(self, index_name: str) -> LinksForSourceIndexName:
+    links_for_index: LinksForSourceIndexName = {}
+    for index_value, target_index_name, target_index_value in (
+      self.connection.execute(
+        "SELECT index_value, target_index_name, target_index_value FROM links"
+        " WHERE index_name = ? ORDER BY index_value, position",
+        (index_name,),
+      )
+    ):
+      links_for_index.setdefault(index_value, []).append(
+        (target_index_name, target_index_value)
+      )
+    if not links_for_index:
+      raise KeyError(f"no links for index {index_name!r}")
+    return links_for_index
+
+  def _put_links(
+    self,
+    index_name: str,
+    links_for_index: LinksForSourceIndexName,
+  ):
+    # (unused as put_links and delete_links change individual rows instead)
+    with self.connection:
+      self.connection.execute(
+        "DELETE FROM links WHERE index_name = ?", (index_name,)
+      )
+      self._replace_links(index_name, links_for_index.items())
+
+  def _is_data_index(self, index_name: str) -> bool:
+    if index_name in self._known_data_indices:
+      return True
+    if self._has_rows("entries", index_name):
+      self._known_data_indices.add(index_name)
+      return True
+    return False
+
+  def _is_link_index(self, index_name: str) -> bool:
+    if index_name in self._known_link_indices:
+      return True
+    if self._has_rows("links", index_name):
+      self._known_link_indices.add(index_name)
+      return True
+    return False
+
+  def _has_rows(self, table: str, index_name: str) -> bool:
+    return self.connection.execute(
+      f"SELECT 1 FROM {table} WHERE index_name = ? LIMIT 1", (index_name,)
+    ).fetchone() is not None
+
+  def _get_setting(self, key: str):
+    row = self.connection.execute(
+      "SELECT value FROM settings WHERE key = ?", (key,)
+    ).fetchone()
+    return row[0] if row is not None else None
+
+  def _set_setting(self, key: str, value):
+    self.connection.execute(
+      "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+      (key, value),
+    )
+
+  def _compress(self, data: bytes) -> bytes:
+    if self.compression == ZIP_DEFLATED:
+      return raw_deflate(data, self.compresslevel)
+    return data
+
+  def _decompress(self, data: bytes) -> bytes:
+    if self.compression == ZIP_DEFLATED:
+      return raw_inflate(data)
+    return data
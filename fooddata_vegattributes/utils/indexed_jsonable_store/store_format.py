@@ -0,0 +1,113 @@
+from enum import auto
+from os import PathLike
+import sqlite3
+from typing import Optional, Union
+from zipfile import BadZipFile, ZIP_DEFLATED
+
+from ..bounded_cache import CachePolicy
+from ..enum import AutoStrEnum
+from .abstract_indexable_linkable_bytes_store import (
+  AbstractIndexableLinkableBytesStore,
+)
+from .caching_zipped_indexable_linkable_bytes_store import (
+  CachingZippedIndexableLinkableBytesStore,
+)
+from .packed_indexable_linkable_bytes_store import (
+  BadPackedFile,
+  PackedIndexableLinkableBytesStore,
+)
+from .sqlite_indexable_linkable_bytes_store import (
+  SqliteIndexableLinkableBytesStore,
+)
+from .zipped_indexable_linkable_bytes_store import (
+  ZippedIndexableLinkableBytesStore,
+)
+
+
+class StoreFormat(AutoStrEnum):
+  """
+  On-disk format of a bytes store.
+
+  Stores opened for reading in the ZIP or PACKED format support concurrent
+  reads from several threads; SQLite stores may only be used from the thread
+  that opened them.
+  """
+  ZIP = auto()
+  "One ZIP member per entry and one per links mapping"
+  PACKED = auto()
+  "All entries in one blob with sorted offset tables, read via mmap"
+  SQLITE = auto()
+  "Entries and links in SQLite tables, allowing in-place updates"
+
+# errors signifying that a file exists but isn't a valid store of its format
+MALFORMED_STORE_ERRORS = (BadZipFile, BadPackedFile, sqlite3.DatabaseError)
+
+def open_bytes_store(
+  path: Union[PathLike, str, bytes],
+  format: StoreFormat = StoreFormat.ZIP,
+  mode="r",
+  compression=ZIP_DEFLATED,
+  compresslevel=None,
+  caching=True,
+  cache_policy: Optional[CachePolicy] = None,
+  shared_dictionary=False,
+) -> AbstractIndexableLinkableBytesStore:
+  """
+  Opens a bytes store of the given format.
+
+  `caching` and `cache_policy` only apply to the ZIP format; the other formats
+  rely on the OS's page cache and SQLite's own cache instead.
+  `shared_dictionary` is only supported by the ZIP and PACKED formats.
+  """
+  if format == StoreFormat.ZIP:
+    if caching:
+      return CachingZippedIndexableLinkableBytesStore.from_path(
+        path,
+        mode=mode,
+        compression=compression,
+        compresslevel=compresslevel,
+        cache_policy=cache_policy,
+        shared_dictionary=shared_dictionary,
+      )
+    return ZippedIndexableLinkableBytesStore.from_path(
+      path,
+      mode=mode,
+      compression=compression,
+      compresslevel=compresslevel,
+      shared_dictionary=shared_dictionary,
+    )
+  elif format == StoreFormat.PACKED:
+    return PackedIndexableLinkableBytesStore.from_path(
+      path,
+      mode=mode,
+      compression=compression,
+      compresslevel=compresslevel,
+      shared_dictionary=shared_dictionary,
+    )
+  elif format == StoreFormat.SQLITE:
+    if shared_dictionary:
+      raise ValueError("SQLite stores don't support shared dictionaries")
+    return SqliteIndexableLinkableBytesStore.from_path(
+      path,
+      mode=mode,
+      compression=compression,
+      compresslevel=compresslevel,
+    )
+  raise ValueError(f"unknown store format: {format!r}")
+
+def compact_bytes_store(
+  path: Union[PathLike, str, bytes],
+  format: StoreFormat = StoreFormat.ZIP,
+):
+  """
+  Frees the space taken up by replaced or deleted entries of a store that
+  isn't currently open.
+  """
+  if format == StoreFormat.ZIP:
+    ZippedIndexableLinkableBytesStore.compact(path)
+  elif format == StoreFormat.PACKED:
+    PackedIndexableLinkableBytesStore.compact(path)
+  elif format == StoreFormat.SQLITE:
+    SqliteIndexableLinkableBytesStore.compact(path)
+  else:
+    raise ValueError(f"unknown store format: {format!r}")
@@ -0,0 +1,111 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+@dataclass
+class ZipManifest:
+  """
+  In-memory overview of which indices and index values a ZIP archive contains.
+
+  Built once from the archive's member names so that existence checks don't
+  have to scan the whole member list each time.
+  """
+  # values are dicts (with values of `None`) rather than sets to preserve the
+  # order entries were written in, like the archive's member list does
+  data_index_values: Dict[str, Dict[str, None]] = field(
+    default_factory=lambda: defaultdict(dict)
+  )
+  link_index_names: Set[str] = field(default_factory=set)
+  # latest generation of sharded links per index; indices that only have a
+  # legacy `links.json` member aren't in here
+  link_generations: Dict[str, int] = field(default_factory=dict)
+  # sorted lazily, see `sorted_data_index_values`
+  _sorted_data_index_values: Dict[str, List[str]] = field(
+    default_factory=dict, repr=False
+  )
+
+  @classmethod
+  def from_member_names(cls, names: Iterable[str]) -> "ZipManifest":
+    obj = cls()
+    for name in names:
+      obj.add_member_name(name)
+    return obj
+
+  def add_member_name(self, name: str):
+    parsed = parse_member_name(name)
+    if parsed is None:
+      return
+    index_name, kind, index_value = parsed
+    if kind in ("data", "deleted"):
+      self._sorted_data_index_values.pop(index_name, None)
+    if kind == "data":
+      assert index_value is not None
+      self.data_index_values[index_name][index_value] = None
+    elif kind == "deleted":
+      assert index_value is not None
+      # members are listed in the order they were written, so this undoes
+      # earlier data members but not later ones
+      self.data_index_values[index_name].pop(index_value, None)
+    elif kind == "links":
+      self.link_index_names.add(index_name)
+      if index_value is not None:
+        self.link_generations[index_name] = max(
+          int(index_value), self.link_generations.get(index_name, -1)
+        )
+
+  def is_data_index(self, index_name: str) -> bool:
+    return bool(self.data_index_values.get(index_name))
+
+  def is_link_index(self, index_name: str) -> bool:
+    return index_name in self.link_index_names
+
+  def has_data_entry(self, index_name: str, index_value: str) -> bool:
+    return index_value in self.data_index_values.get(index_name, ())
+
+  def iter_data_index(self, index_name: str) -> Iterable[str]:
+    return iter(self.data_index_values.get(index_name, ()))
+
+  def sorted_data_index_values(self, index_name: str) -> List[str]:
+    """
+    Returns the index's values in sorted order, sorting them only once unless
+    the index changes.
+    """
+    sorted_values = self._sorted_data_index_values.get(index_name)
+    if sorted_values is None:
+      sorted_values = sorted(self.data_index_values.get(index_name, ()))
+      self._sorted_data_index_values[index_name] = sorted_values
+    return sorted_values
+
+def parse_member_name(
+  name: str
+) -> Optional[Tuple[str, str, Optional[str]]]:
+  """
+  Splits a member name into `(index_name, kind, index_value)`.
+
+  `kind` is either `"data"` or `"deleted"` (a tombstone for a deleted entry),
+  both with `index_value` set, or `"links"`. For the
+  shard index of sharded links (`by-<index>/links/<generation>/index.json`),
+  `index_value` is the generation; for legacy `links.json` members, it's
+  `None`. Returns `None` for unrelated members, including link shards.
+  """
+  if not name.startswith("by-"):
+    return None
+  index_name, sep, rest = name[len("by-"):].partition("/")
+  if not sep:
+    return None
+  if rest.startswith("data/"):
+    index_value = rest[len("data/"):]
+    if index_value:
+      return (index_name, "data", index_value)
+  elif rest.startswith("deleted/"):
+    index_value = rest[len("deleted/"):]
+    if index_value:
+      return (index_name, "deleted", index_value)
+  elif rest == "links.json":
+    return (index_name, "links", None)
+  elif rest.startswith("links/") and rest.endswith("/index.json"):
+    generation = rest[len("links/"):-len("/index.json")]
+    if generation.isdigit():
+      return (index_name, "links", generation)
+  return None
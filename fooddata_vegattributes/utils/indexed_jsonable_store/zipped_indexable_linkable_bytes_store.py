@@ -1,25 +1,110 @@
+from bisect import bisect_right
+from contextlib import contextmanager
+from dataclasses import replace
+from itertools import islice
 import json
+import os
 from os import fspath, PathLike
-from pathlib import Path
-from typing import Iterable, Tuple, Union
-from zipfile import ZipFile, ZIP_DEFLATED
+from typing import (
+  Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union,
+)
+import warnings
+import zlib
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
 
 from .abstract_indexable_linkable_bytes_store import (
-  AbstractIndexableLinkableBytesStore,
-  LinkTargets,
+  BytesLike,
   LinksForSourceIndexName,
+  LinkTargets,
+)
+from .abstract_link_resolving_bytes_store import (
+  AbstractLinkResolvingBytesStore,
 )
 from ..close_via_stack import CloseViaStack
+from .entry_compression import (
+  EntryCompression,
+  train_on_first_entries,
+  train_zdict,
+  ZDICT_METADATA_KEY,
+)
+from .ordered_index import iter_sorted_range
+from .precompressed_entry import precompress_entry, PrecompressedEntry
+from .pread_zip_member import (
+  can_pread_zip_member,
+  pread_raw_zip_member,
+  pread_zip_member,
+)
+from .raw_zip_member_writer import write_raw_zip_member
+from .zip_manifest import ZipManifest
+
 
+# number of link index values per shard member
+LINKS_PER_SHARD = 256
+
+# link index values mapped to their new targets or to `None` if deleted
+PendingLinks = Dict[str, Optional[LinkTargets]]
 
 class ZippedIndexableLinkableBytesStore(
-  CloseViaStack, AbstractIndexableLinkableBytesStore,
+  CloseViaStack, AbstractLinkResolvingBytesStore,
 ):
   """
   Compressed, indexed bytes stored in a ZIP file.
+
+  Thread safety: In read mode, `get_entry`, `get_entries`, `iter_entries` and
+  `iter_index` may be called from several threads at once. Members are then
+  read with positional reads (`os.pread`) on the archive's file descriptor
+  instead of via `ZipFile.open`, so threads neither share a seek position nor
+  have to wait for each other. Writing is not thread-safe.
+
+  With `shared_dictionary`, entries are deflated using a preset dictionary
+  trained on the first entries written (see `EntryCompression`), which is
+  stored in the archive's metadata. As `zipfile` can't decompress such
+  entries, their members are stored without (further) ZIP compression.
+  Archives containing a dictionary are detected automatically when opened.
+
+  Links of each index are stored sorted and split into shards of
+  `LINKS_PER_SHARD` values, plus a small shard index listing the first value
+  of each shard, so looking up one value only requires reading one shard.
+
+  Updates (mode `"a"`) never modify existing members: replaced entries are
+  shadowed by later members of the same name, deleted ones by tombstone
+  members (`by-<index>/deleted/<value>`) and links by a new generation. The
+  resulting garbage can be removed using `compact`.
   """
-  def __init__(self, zipfile: ZipFile):
+  def __init__(self, zipfile: ZipFile, shared_dictionary: bool = False):
     self.zipfile = zipfile
+    # built once here and kept up to date on writes so that lookups don't have
+    # to scan the archive's entire member list
+    self.manifest = ZipManifest.from_member_names(zipfile.namelist())
+    self._pread_fd = self._get_pread_fd(zipfile)
+    self._pending_links: Dict[str, PendingLinks] = {}
+    zdict = self.get_metadata(ZDICT_METADATA_KEY)
+    if zdict is None and shared_dictionary and self.manifest.data_index_values:
+      raise ValueError(
+        "can't add entries compressed using a shared dictionary to an archive "
+        "with regular entries"
+      )
+    if zdict is not None or shared_dictionary:
+      self.entry_compression = EntryCompression(
+        ZIP_DEFLATED,
+        zipfile.compresslevel,
+        shared_dictionary=True,
+        zdict=zdict,
+      )
+    else:
+      self.entry_compression = EntryCompression(
+        zipfile.compression, zipfile.compresslevel
+      )
+
+  @staticmethod
+  def _get_pread_fd(zipfile: ZipFile) -> Optional[int]:
+    if zipfile.mode != "r" or not hasattr(os, "pread"):
+      return None
+    try:
+      return zipfile.fp.fileno()  # type: ignore[union-attr]
+    except (AttributeError, OSError, ValueError):
+      # e.g. in-memory archives
+      return None
 
   @classmethod
   def from_path(
@@ -28,9 +113,12 @@ class ZippedIndexableLinkableBytesStore(
     mode="r",
     compression=ZIP_DEFLATED,
     compresslevel=None,
+    **kwargs,
   ) -> "ZippedIndexableLinkableBytesStore":
     """
     Opens archive for reading or writing depending on the given mode.
+
+    Remaining keyword arguments are passed on to the constructor.
     """
     zipfile = ZipFile(
       str(fspath(path)),
@@ -38,108 +126,415 @@ class ZippedIndexableLinkableBytesStore(
       compression=compression,
       compresslevel=compresslevel,
     )
-    obj = cls(zipfile=zipfile)
+    obj = cls(zipfile=zipfile, **kwargs)
     obj.close_stack.enter_context(zipfile)
+    obj.close_stack.callback(obj._flush_links)
     return obj
 
+  @classmethod
+  def compact(cls, path: Union[PathLike, str, bytes]):
+    """
+    Rewrites the archive at the given path without replaced or deleted
+    entries, tombstones and superseded link generations.
+
+    Members are copied as they are, without decompressing and recompressing
+    them. The compacted archive only replaces the original once it's complete.
+    """
+    path = os.fsdecode(fspath(path))
+    tmp_path = f"{path}.compacting"
+    try:
+      with cls.from_path(path, mode="r") as store, ZipFile(
+        tmp_path, mode="w"
+      ) as compacted:
+        store._copy_live_members(compacted)
+      os.replace(tmp_path, path)
+    except BaseException:
+      if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+      raise
+
+  def _copy_live_members(self, target: ZipFile):
+    for info in self.zipfile.infolist():
+      if (
+        # shadowed by a later member of the same name
+        self.zipfile.getinfo(info.filename) is not info
+        or not self._is_live_member(info.filename)
+      ):
+        continue
+      if self._pread_fd is not None and can_pread_zip_member(info):
+        write_raw_zip_member(
+          target,
+          info.filename,
+          PrecompressedEntry(
+            data=pread_raw_zip_member(self._pread_fd, info),
+            crc=info.CRC,
+            size=info.file_size,
+          ),
+          compress_type=info.compress_type,
+        )
+      else:
+        target.writestr(
+          info.filename,
+          self.zipfile.read(info),
+          compress_type=info.compress_type,
+        )
+
+  def _is_live_member(self, name: str) -> bool:
+    if not name.startswith("by-"):
+      return True
+    index_name, _, rest = name[len("by-"):].partition("/")
+    kind, _, rest = rest.partition("/")
+    if kind == "data":
+      return self.manifest.has_data_entry(index_name, rest)
+    elif kind == "deleted":
+      return False
+    elif kind == "links.json":
+      return index_name not in self.manifest.link_generations
+    elif kind == "links":
+      generation = rest.partition("/")[0]
+      return generation == str(self.manifest.link_generations.get(index_name))
+    return True
+
   def put_entries(
     self,
     index_name: str,
     index_values_and_entries: Iterable[Tuple[str, bytes]],
   ):
-    for index_value, entry in index_values_and_entries:
-      path_in_zip = f"by-{index_name}/data/{index_value}"
-      with self.zipfile.open(path_in_zip, "w") as file_in_zip:
-        file_in_zip.write(entry)
+    if self.entry_compression.shared_dictionary:
+      if self.entry_compression.needs_training:
+        index_values_and_entries = train_on_first_entries(
+          index_values_and_entries, self.train_compression
+        )
+      self.put_precompressed_entries(
+        index_name,
+        (
+          (index_value, precompress_entry(entry, self.entry_compression))
+          for index_value, entry in index_values_and_entries
+        ),
+      )
+      return
+    with _member_replacement_allowed():
+      for index_value, entry in index_values_and_entries:
+        path_in_zip = f"by-{index_name}/data/{index_value}"
+        with self.zipfile.open(path_in_zip, "w") as file_in_zip:
+          file_in_zip.write(entry)
+        self.manifest.add_member_name(path_in_zip)
 
-  def put_links(
+  def put_precompressed_entries(
     self,
     index_name: str,
-    index_values_and_targets: Iterable[Tuple[str, LinkTargets]]
+    index_values_and_entries: Iterable[Tuple[str, PrecompressedEntry]],
   ):
+    if self.entry_compression.needs_training:
+      raise ValueError("compression must be trained first")
+    with _member_replacement_allowed():
+      for index_value, entry in index_values_and_entries:
+        path_in_zip = f"by-{index_name}/data/{index_value}"
+        if self.entry_compression.shared_dictionary:
+          # already compressed in a way zipfile doesn't know about, so the
+          # member itself is stored as-is
+          write_raw_zip_member(
+            self.zipfile,
+            path_in_zip,
+            PrecompressedEntry(
+              data=entry.data,
+              crc=zlib.crc32(entry.data),
+              size=len(entry.data),
+            ),
+            compress_type=ZIP_STORED,
+          )
+        else:
+          write_raw_zip_member(self.zipfile, path_in_zip, entry)
+        self.manifest.add_member_name(path_in_zip)
+
+  def delete_entries(self, index_name: str, index_values: Iterable[str]):
+    with _member_replacement_allowed():
+      for index_value in index_values:
+        if not self.manifest.has_data_entry(index_name, index_value):
+          continue
+        path_in_zip = f"by-{index_name}/deleted/{index_value}"
+        self.zipfile.writestr(path_in_zip, b"", compress_type=ZIP_STORED)
+        self.manifest.add_member_name(path_in_zip)
+
+  def get_compression(self) -> EntryCompression:
+    return self.entry_compression
+
+  def train_compression(self, sample_entries: Sequence[bytes]):
+    if not self.entry_compression.needs_training:
+      return
+    zdict = train_zdict(sample_entries)
+    self.put_metadata(ZDICT_METADATA_KEY, zdict)
+    self.entry_compression = replace(self.entry_compression, zdict=zdict)
+
+  def put_metadata(self, key: str, value: bytes):
+    with _member_replacement_allowed():
+      with self.zipfile.open(f"meta/{key}", "w") as file_in_zip:
+        file_in_zip.write(value)
+
+  def get_metadata(self, key: str) -> Optional[bytes]:
     try:
-      links_for_index = self._load_links(index_name)
+      info = self.zipfile.getinfo(f"meta/{key}")
     except KeyError:
-      links_for_index = {}
-    links_for_index.update(index_values_and_targets)
-    self._put_links(index_name, links_for_index)
+      return None
+    return self._read_member(info)
 
-  def iter_entries(
+  def _get_entry_no_resolve(
     self, index_name: str, index_value: str
-  ) -> Iterable[bytes]:
-    for index_name, index_value in self._resolve(index_name, index_value):
-      yield self._get_entry_no_resolve(index_name, index_value)
+  ) -> BytesLike:
+    return self._read_entry_member(
+      self._get_data_member_info(index_name, index_value)
+    )
 
-  def get_entry(self, index_name: str, index_value: str) -> bytes:
-    entries_iter = iter(self.iter_entries(index_name, index_value))
-    try:
-      result = next(entries_iter)
-    except StopIteration as e:
-      raise KeyError(f"no entry found for {index_name}='{index_value}'") from e
-    try:
-      next(entries_iter)
-    except StopIteration:
-      pass
-    else:
-      raise ValueError(
-        f"more than one result for {index_name}='{index_value}'"
+  def _get_data_member_info(
+    self, index_name: str, index_value: str
+  ) -> ZipInfo:
+    # the manifest also knows about deletions, which the archive itself
+    # doesn't
+    if not self.manifest.has_data_entry(index_name, index_value):
+      raise KeyError(
+        f"Entry for {index_name}={index_value} not in indexed JSON file"
+      )
+    return self.zipfile.getinfo(f"by-{index_name}/data/{index_value}")
+
+  def _get_entries_no_resolve(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> Dict[str, BytesLike]:
+    # read members in the order in which they're stored in the archive, which
+    # turns many random reads into one sequential sweep
+    infos_and_values: List[Tuple[ZipInfo, str]] = []
+    for index_value in index_values:
+      infos_and_values.append(
+        (self._get_data_member_info(index_name, index_value), index_value)
       )
+    infos_and_values.sort(key=lambda x: x[0].header_offset)
+    result: Dict[str, BytesLike] = {}
+    for info, index_value in infos_and_values:
+      result[index_value] = self._read_entry_member(info)
     return result
 
-  def _get_entry_no_resolve(self, index_name: str, index_value: str) -> bytes:
-    try:
-      path_in_zip = f"by-{index_name}/data/{index_value}"
-      with self.zipfile.open(path_in_zip) as file_in_zip:
-        return file_in_zip.read()
-    except KeyError as e:
-      raise KeyError(
-        f"Entry for {index_name}={index_value} not in indexed JSON file"
-      ) from e
+  def _read_entry_member(self, info: ZipInfo) -> bytes:
+    if self.entry_compression.shared_dictionary:
+      return self.entry_compression.decompress(self._read_member(info))
+    return self._read_member(info)
 
-  def iter_index(self, index_name: str) -> Iterable[str]:
-    if self._is_data_index(index_name):
-      return self._iter_data_index(index_name)
-    else:
-      return self._load_links(index_name).keys()
+  def _read_member(self, info: ZipInfo) -> bytes:
+    if self._pread_fd is not None and can_pread_zip_member(info):
+      return pread_zip_member(self._pread_fd, info)
+    with self.zipfile.open(info) as file_in_zip:
+      return file_in_zip.read()
 
   def _iter_data_index(self, index_name: str) -> Iterable[str]:
-    return (
-      Path(x).name for x in self.zipfile.namelist()
-      if x.startswith(f"by-{index_name}/data/")
+    return self.manifest.iter_data_index(index_name)
+
+  def _iter_data_index_range(
+    self, index_name: str, lo: Optional[str], hi: Optional[str]
+  ) -> Iterable[str]:
+    return iter_sorted_range(
+      self.manifest.sorted_data_index_values(index_name), lo, hi
     )
 
+  def _iter_link_index_range(
+    self, index_name: str, lo: Optional[str], hi: Optional[str]
+  ) -> Iterable[str]:
+    generation = self.manifest.link_generations.get(index_name)
+    if generation is None or index_name in self._pending_links:
+      return super()._iter_link_index_range(index_name, lo, hi)
+    return self._iter_sharded_link_range(index_name, generation, lo, hi)
+
+  def _iter_sharded_link_range(
+    self,
+    index_name: str,
+    generation: int,
+    lo: Optional[str],
+    hi: Optional[str],
+  ) -> Iterator[str]:
+    # only the shards overlapping the range have to be loaded
+    first_values = self._load_link_shard_index(index_name, generation)
+    start = max(bisect_right(first_values, lo) - 1, 0) if lo is not None else 0
+    for shard_no in range(start, len(first_values)):
+      if hi is not None and first_values[shard_no] >= hi:
+        return
+      # shards are written in sorted order, which JSON objects preserve
+      shard_values = list(
+        self._load_link_shard(index_name, generation, shard_no)
+      )
+      yield from iter_sorted_range(shard_values, lo, hi)
+
   def _is_data_index(self, index_name: str) -> bool:
-    return any(
-      x.startswith(f"by-{index_name}/data/")
-      for x in self.zipfile.namelist()
-    )
+    return self.manifest.is_data_index(index_name)
 
   def _is_link_index(self, index_name: str) -> bool:
-    return any(
-      x.startswith(f"by-{index_name}/links.json")
-      for x in self.zipfile.namelist()
+    return self.manifest.is_link_index(index_name)
+
+  def put_links(
+    self,
+    index_name: str,
+    index_values_and_targets: Iterable[Tuple[str, LinkTargets]],
+  ):
+    """
+    Targets have the semantics `(target_index_name, target_index_value)`.
+
+    Links are collected in memory and only written on close, so that putting
+    links for the same index several times doesn't result in several copies.
+    """
+    self._pending_links.setdefault(index_name, {}).update(
+      index_values_and_targets
+    )
+    self.manifest.link_index_names.add(index_name)
+
+  def put_sorted_links(
+    self,
+    index_name: str,
+    index_values_and_targets: Iterable[Tuple[str, LinkTargets]],
+  ):
+    """
+    Unlike `put_links`, this writes links right away and, provided there are
+    no links for the index yet, shard by shard without collecting them first.
+    """
+    if self._is_link_index(index_name):
+      # have to be merged with the existing ones, which are in memory anyway
+      self.put_links(index_name, index_values_and_targets)
+      return
+    self._write_link_generation(index_name, index_values_and_targets)
+
+  def delete_links(self, index_name: str, index_values: Iterable[str]):
+    if not self._is_link_index(index_name):
+      return
+    self._pending_links.setdefault(index_name, {}).update(
+      (index_value, None) for index_value in index_values
     )
 
+  def _flush_links(self):
+    for index_name in self._pending_links:
+      try:
+        links_for_index = self._load_links(index_name)
+      except KeyError:
+        links_for_index = {}
+      self._put_links(index_name, links_for_index)
+    self._pending_links.clear()
+
+  def _get_link_targets(
+    self, index_name: str, index_value: str
+  ) -> LinkTargets:
+    pending = self._pending_links.get(index_name, {})
+    if index_value in pending:
+      targets = pending[index_value]
+      if targets is None:
+        raise KeyError(index_value)
+      return targets
+    generation = self.manifest.link_generations.get(index_name)
+    if generation is None:
+      return self._load_legacy_links(index_name)[index_value]
+    first_values = self._load_link_shard_index(index_name, generation)
+    shard_no = bisect_right(first_values, index_value) - 1
+    if shard_no < 0:
+      raise KeyError(index_value)
+    return self._load_link_shard(index_name, generation, shard_no)[index_value]
+
   def _load_links(self, index_name: str) -> LinksForSourceIndexName:
-    with self.zipfile.open(f"by-{index_name}/links.json") as links_file:
-      return json.load(links_file)
+    pending = self._pending_links.get(index_name)
+    try:
+      links_for_index = self._load_stored_links(index_name)
+    except KeyError:
+      if pending is None:
+        raise
+      links_for_index = {}
+    if pending is None:
+      return links_for_index
+    links_for_index = dict(links_for_index)
+    for index_value, targets in pending.items():
+      if targets is None:
+        links_for_index.pop(index_value, None)
+      else:
+        links_for_index[index_value] = targets
+    return links_for_index
+
+  def _load_stored_links(self, index_name: str) -> LinksForSourceIndexName:
+    generation = self.manifest.link_generations.get(index_name)
+    if generation is None:
+      return self._load_legacy_links(index_name)
+    links_for_index: LinksForSourceIndexName = {}
+    n_shards = len(self._load_link_shard_index(index_name, generation))
+    for shard_no in range(n_shards):
+      links_for_index.update(
+        self._load_link_shard(index_name, generation, shard_no)
+      )
+    return links_for_index
+
+  def _load_legacy_links(self, index_name: str) -> LinksForSourceIndexName:
+    # single links.json per index, as written by earlier versions
+    return json.loads(
+      self._read_member(self.zipfile.getinfo(f"by-{index_name}/links.json"))
+    )
+
+  def _load_link_shard_index(
+    self, index_name: str, generation: int
+  ) -> List[str]:
+    """
+    Returns the first index value of each shard.
+    """
+    info = self.zipfile.getinfo(
+      f"by-{index_name}/links/{generation}/index.json"
+    )
+    return json.loads(self._read_member(info))["first_values"]
+
+  def _load_link_shard(
+    self, index_name: str, generation: int, shard_no: int
+  ) -> LinksForSourceIndexName:
+    info = self.zipfile.getinfo(
+      f"by-{index_name}/links/{generation}/{shard_no}.json"
+    )
+    return json.loads(self._read_member(info))
 
   def _put_links(
     self,
     index_name: str,
     links_for_index: LinksForSourceIndexName,
   ):
-    json_bytes = json.dumps(links_for_index).encode("utf-8")
-    with self.zipfile.open(f"by-{index_name}/links.json", "w") as links_file:
-      links_file.write(json_bytes)
+    self._write_link_generation(
+      index_name,
+      ((v, links_for_index[v]) for v in sorted(links_for_index)),
+    )
 
-  def _resolve(
-    self, index_name: str, index_value: str
-  ) -> Iterable[Tuple[str, str]]:
-    if self._is_data_index(index_name) or not self._is_link_index(index_name):
-      yield (index_name, index_value)
-      return
-    links_for_index = self._load_links(index_name)
-    for target in links_for_index[index_value]:
-      for resolved_target in self._resolve(*target):
-        yield resolved_target
+  def _write_link_generation(
+    self,
+    index_name: str,
+    sorted_index_values_and_targets: Iterable[Tuple[str, LinkTargets]],
+  ):
+    # ZIP members can't be replaced, so each write goes into a new generation
+    # that supersedes the previous ones
+    generation = self.manifest.link_generations.get(index_name, -1) + 1
+    prefix = f"by-{index_name}/links/{generation}"
+    it = iter(sorted_index_values_and_targets)
+    first_values: List[str] = []
+    last_value: Optional[str] = None
+    while True:
+      shard_items = list(islice(it, LINKS_PER_SHARD))
+      if not shard_items:
+        break
+      shard_values = [index_value for index_value, _ in shard_items]
+      if (
+        (last_value is not None and shard_values[0] <= last_value)
+        or any(a >= b for a, b in zip(shard_values, shard_values[1:]))
+      ):
+        raise ValueError("links must be sorted by unique index values")
+      last_value = shard_values[-1]
+      first_values.append(shard_values[0])
+      shard_no = len(first_values) - 1
+      with self.zipfile.open(f"{prefix}/{shard_no}.json", "w") as shard_file:
+        shard_file.write(json.dumps(dict(shard_items)).encode("utf-8"))
+    # written last so that incomplete generations are never picked up
+    path_in_zip = f"{prefix}/index.json"
+    with self.zipfile.open(path_in_zip, "w") as index_file:
+      index_file.write(
+        json.dumps({"first_values": first_values}).encode("utf-8")
+      )
+    self.manifest.add_member_name(path_in_zip)
+
+@contextmanager
+def _member_replacement_allowed() -> Iterator[None]:
+  # later members shadow earlier ones of the same name, which is how entries
+  # are replaced, so there is no need for zipfile to warn about it
+  with warnings.catch_warnings():
+    warnings.filterwarnings("ignore", "Duplicate name", UserWarning)
+    yield
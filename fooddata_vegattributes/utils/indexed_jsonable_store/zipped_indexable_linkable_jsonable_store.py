@@ -1,28 +1,56 @@
-import json
+from functools import partial
+from itertools import chain, islice
 from os import PathLike
-from typing import Iterable, Generic, Tuple, Union
+from typing import Any, Dict, Iterable, Generic, Optional, Tuple, Union
 
+from ..bounded_cache import CachePolicy
 from ..close_via_stack import CloseViaStack
+from ..parallel_map import ordered_parallel_map
 
 from .abstract_indexable_linkable_bytes_store import (
-  AbstractIndexableLinkableBytesStore
+  AbstractIndexableLinkableBytesStore,
 )
 from .abstract_indexable_linkable_jsonable_store import (
   AbstractIndexableLinkableJsonableStore, LinkTargets, T
 )
-from .caching_zipped_indexable_linkable_bytes_store import (
-  CachingZippedIndexableLinkableBytesStore
-)
-from .zipped_indexable_linkable_bytes_store import (
-  ZippedIndexableLinkableBytesStore, ZIP_DEFLATED
+from .entry_codec import CODEC_METADATA_KEY, EntryCodec, get_codec_impl
+from .entry_compression import (
+  EntryCompression,
+  ZDICT_TRAINING_SAMPLE_SIZE,
 )
+from .precompressed_entry import precompress_entry, PrecompressedEntry
+from .store_format import open_bytes_store, StoreFormat, ZIP_DEFLATED
 
 
 class ZippedIndexableLinkableJsonableStore(
   CloseViaStack, AbstractIndexableLinkableJsonableStore, Generic[T]
 ):
-  def __init__(self, bytes_store: AbstractIndexableLinkableBytesStore):
+  """
+  Jsonable store serializing entries with one of the codecs in `EntryCodec`.
+
+  The codec is recorded in the store's metadata when the first entries are
+  written and picked up from there when reading. Stores without a recorded
+  codec are JSON.
+  """
+  def __init__(
+    self,
+    bytes_store: AbstractIndexableLinkableBytesStore,
+    build_jobs: int = 1,
+    codec: Optional[EntryCodec] = None,
+  ):
     self.bytes_store = bytes_store
+    self.build_jobs = build_jobs
+    stored_codec_name = bytes_store.get_metadata(CODEC_METADATA_KEY)
+    if stored_codec_name is not None:
+      stored_codec = EntryCodec(stored_codec_name.decode("utf-8"))
+      if codec is not None and codec != stored_codec:
+        raise ValueError(
+          f"store uses codec {stored_codec.value}, not {codec.value}"
+        )
+      codec = stored_codec
+    self._codec_recorded = stored_codec_name is not None
+    self.codec = codec if codec is not None else EntryCodec.JSON
+    self._codec_impl = get_codec_impl(self.codec)
 
   @classmethod
   def from_path(
@@ -32,35 +60,96 @@ class ZippedIndexableLinkableJsonableStore(
     compression=ZIP_DEFLATED,
     compresslevel=None,
     caching=True,
+    cache_policy: Optional[CachePolicy] = None,
+    format: StoreFormat = StoreFormat.ZIP,
+    build_jobs: int = 1,
+    shared_dictionary=False,
+    codec: Optional[EntryCodec] = None,
   ) -> "ZippedIndexableLinkableJsonableStore":
     """
     Opens store for reading or writing depending on the given mode.
+
+    `cache_policy` limits the entry cache and is only meaningful if `caching`
+    is enabled; by default, the cache is unbounded.
+
+    Despite this class's name, the underlying bytes store can have any of the
+    formats in `StoreFormat`.
+
+    With `build_jobs > 1`, entries are encoded and compressed by that many
+    worker processes when writing, while a single writer stores the results.
+
+    `shared_dictionary` makes the store compress entries using a dictionary
+    trained on the first ones written (ZIP and PACKED formats only).
+
+    `codec` only needs to be given for new stores (default: JSON); existing
+    ones are read with the codec they were written with.
     """
-    bytes_store_cls = (
-      CachingZippedIndexableLinkableBytesStore if caching
-      else ZippedIndexableLinkableBytesStore
-    )
-    bytes_store = bytes_store_cls.from_path(
+    bytes_store = open_bytes_store(
       path,
+      format=format,
       mode=mode,
       compression=compression,
       compresslevel=compresslevel,
+      caching=caching,
+      cache_policy=cache_policy,
+      shared_dictionary=shared_dictionary,
     )
-    obj = cls(bytes_store=bytes_store)
+    try:
+      obj = cls(bytes_store=bytes_store, build_jobs=build_jobs, codec=codec)
+    except BaseException:
+      bytes_store.close()
+      raise
     obj.close_stack.enter_context(bytes_store)
     return obj
 
   def put_entries(
     self, index_name: str, index_values_and_data: Iterable[Tuple[str, T]]
   ):
+    if not self._codec_recorded:
+      self.bytes_store.put_metadata(
+        CODEC_METADATA_KEY, self.codec.value.encode("utf-8")
+      )
+      self._codec_recorded = True
+    if self.build_jobs > 1:
+      if self.bytes_store.get_compression().needs_training:
+        index_values_and_data = iter(index_values_and_data)
+        sample = list(
+          islice(index_values_and_data, ZDICT_TRAINING_SAMPLE_SIZE)
+        )
+        self.bytes_store.train_compression(
+          [self._codec_impl.encode(jsonable) for _, jsonable in sample]
+        )
+        index_values_and_data = chain(sample, index_values_and_data)
+      self.bytes_store.put_precompressed_entries(
+        index_name,
+        ordered_parallel_map(
+          partial(
+            _encode_and_precompress,
+            codec=self.codec,
+            compression=self.bytes_store.get_compression(),
+          ),
+          index_values_and_data,
+          jobs=self.build_jobs,
+        ),
+      )
+      return
     self.bytes_store.put_entries(
       index_name,
       (
-        (index_value, json.dumps(jsonable).encode("utf-8"))
+        (index_value, self._codec_impl.encode(jsonable))
         for index_value, jsonable in index_values_and_data
       )
     )
 
+  def delete_entries(self, index_name: str, index_values: Iterable[str]):
+    self.bytes_store.delete_entries(index_name, index_values)
+
+  def put_metadata(self, key: str, value: bytes):
+    self.bytes_store.put_metadata(key, value)
+
+  def get_metadata(self, key: str) -> Optional[bytes]:
+    return self.bytes_store.get_metadata(key)
+
   def put_links(
     self,
     index_name: str,
@@ -71,17 +160,62 @@ class ZippedIndexableLinkableJsonableStore(
     """
     self.bytes_store.put_links(index_name, index_values_and_targets)
 
+  def put_sorted_links(
+    self,
+    index_name: str,
+    index_values_and_targets: Iterable[Tuple[str, LinkTargets]],
+  ):
+    self.bytes_store.put_sorted_links(index_name, index_values_and_targets)
+
+  def delete_links(self, index_name: str, index_values: Iterable[str]):
+    self.bytes_store.delete_links(index_name, index_values)
+
+  def get_link_targets(
+    self, index_name: str, index_value: str
+  ) -> LinkTargets:
+    return self.bytes_store.get_link_targets(index_name, index_value)
+
   def get_entry(self, index_name: str, index_value: str) -> T:
     entry_bytes = self.bytes_store.get_entry(index_name, index_value)
-    return json.loads(entry_bytes)
+    return self._codec_impl.decode(entry_bytes)
+
+  def get_entries(
+    self, index_name: str, index_values: Iterable[str]
+  ) -> Dict[str, T]:
+    entries_bytes = self.bytes_store.get_entries(index_name, index_values)
+    return {
+      index_value: self._codec_impl.decode(entry_bytes)
+      for index_value, entry_bytes in entries_bytes.items()
+    }
 
   def iter_entries(
     self, index_name: str, index_value: str
   ) -> Iterable[bytes]:
     return (
-      json.loads(entry_bytes)
+      self._codec_impl.decode(entry_bytes)
       for entry_bytes in self.bytes_store.iter_entries(index_name, index_value)
     )
 
   def iter_index(self, index_name: str) -> Iterable[str]:
     return self.bytes_store.iter_index(index_name)
+
+  def iter_range(
+    self,
+    index_name: str,
+    lo: Optional[str] = None,
+    hi: Optional[str] = None,
+  ) -> Iterable[str]:
+    return self.bytes_store.iter_range(index_name, lo, hi)
+
+  def iter_prefix(self, index_name: str, prefix: str) -> Iterable[str]:
+    return self.bytes_store.iter_prefix(index_name, prefix)
+
+def _encode_and_precompress(
+  index_value_and_jsonable: Tuple[str, Any],
+  codec: EntryCodec,
+  compression: EntryCompression,
+) -> Tuple[str, PrecompressedEntry]:
+  index_value, jsonable = index_value_and_jsonable
+  return index_value, precompress_entry(
+    get_codec_impl(codec).encode(jsonable), compression
+  )
@@ -0,0 +1,250 @@
+import io
+import json
+import os
+from os import PathLike
+import re
+from typing import (
+  Any, Iterator, List, Optional, Sequence, TextIO, Tuple, Union,
+)
+
+from .parallel_map import ordered_parallel_map
+
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "+-.0123456789eE"
+
+class _JsonStreamReader:
+  """
+  Decodes JSON values one at a time from a text stream, only keeping the
+  unconsumed part of what has been read so far in memory.
+
+  `byte_pos` is the UTF-8 byte offset of the next unconsumed character,
+  counted from `start_byte_pos` (where `f` was positioned initially).
+  """
+  def __init__(self, f: TextIO, chunk_size: int, start_byte_pos: int = 0):
+    self.f = f
+    self.chunk_size = chunk_size
+    self.byte_pos = start_byte_pos
+    self._decoder = json.JSONDecoder()
+    self._buf = ""
+    self._pos = 0
+    self._eof = False
+
+  def _read_more(self) -> bool:
+    if self._eof:
+      return False
+    if self._pos:
+      self._buf = self._buf[self._pos:]
+      self._pos = 0
+    # growing reads with the buffer keep re-decoding values that are larger
+    # than a chunk from becoming quadratic
+    chunk = self.f.read(max(self.chunk_size, len(self._buf)))
+    if not chunk:
+      self._eof = True
+      return False
+    self._buf += chunk
+    return True
+
+  def peek_char(self) -> str:
+    """
+    Skips whitespace and returns the next character, or "" at the end.
+    """
+    while True:
+      while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+        self._pos += 1
+        self.byte_pos += 1
+      if self._pos < len(self._buf):
+        return self._buf[self._pos]
+      if not self._read_more():
+        return ""
+
+  def expect_char(self, chars: str) -> str:
+    c = self.peek_char()
+    if not c or c not in chars:
+      raise ValueError(
+        f"expected one of {chars!r} in JSON stream, got {c or 'EOF'!r}"
+      )
+    self._pos += 1
+    self.byte_pos += 1
+    return c
+
+  def decode_value(self) -> Any:
+    c = self.peek_char()
+    if c and c in _NUMBER_CHARS:
+      # unlike other values, a number cut off at the end of the buffer still
+      # decodes successfully, so make sure all of it has been read
+      self._read_past_number()
+    while True:
+      try:
+        value, end = self._decoder.raw_decode(self._buf, self._pos)
+      except json.JSONDecodeError:
+        if not self._read_more():
+          raise
+        continue
+      self.byte_pos += len(self._buf[self._pos:end].encode("utf-8"))
+      self._pos = end
+      return value
+
+  def _read_past_number(self):
+    length = 0
+    while True:
+      end = self._pos + length
+      while end < len(self._buf) and self._buf[end] in _NUMBER_CHARS:
+        end += 1
+      length = end - self._pos
+      if end < len(self._buf) or not self._read_more():
+        return
+
+def _enter_array_member(reader: _JsonStreamReader, key: str):
+  """
+  Advances `reader`, positioned at the start of a JSON object, to right after
+  the opening bracket of the array that is the value of `key`.
+  """
+  reader.expect_char("{")
+  if reader.peek_char() == "}":
+    raise KeyError(key)
+  while True:
+    member_key = reader.decode_value()
+    if not isinstance(member_key, str):
+      raise ValueError("expected string key in JSON object")
+    reader.expect_char(":")
+    if member_key == key:
+      break
+    # skip other members
+    reader.decode_value()
+    if reader.expect_char(",}") == "}":
+      raise KeyError(key)
+  reader.expect_char("[")
+
+def iter_json_array_member(
+  f: TextIO, key: str, chunk_size: int = 1 << 16
+) -> Iterator[Any]:
+  """
+  Yields the items of the array that is the value of `key` in the top-level
+  JSON object read from `f`, one by one.
+
+  Unlike `json.load(f)[key]`, this never holds more than one item (plus
+  whatever other members precede `key`) in memory. Raises `KeyError` if the
+  object has no such member and `ValueError` if the document is malformed.
+  """
+  reader = _JsonStreamReader(f, chunk_size)
+  _enter_array_member(reader, key)
+  if reader.peek_char() == "]":
+    return
+  while True:
+    yield reader.decode_value()
+    if reader.expect_char(",]") == "]":
+      return
+
+# (path, key, start byte offset, end byte offset)
+_ChunkSpec = Tuple[Union[PathLike, str, bytes], str, int, int]
+
+# (byte offset of the chunk's first item, items, byte offset of the first item
+# after the chunk or None if the array ended within it)
+_ChunkResult = Tuple[Optional[int], List[Any], Optional[int]]
+
+def iter_json_array_members_parallel(
+  sources: Sequence[Tuple[Union[PathLike, str, bytes], str]],
+  jobs: int,
+  chunk_bytes: int = 1 << 22,
+) -> Iterator[Any]:
+  """
+  Like `iter_json_array_member` for each `(path, key)` source in turn, but
+  with the files parsed by `jobs` processes in parallel.
+
+  Files are split into chunks of `chunk_bytes` that are parsed independently.
+  Item boundaries are only really known after parsing everything before them,
+  so each chunk but a file's first starts at a guessed one: an object after a
+  comma whose first key is that of the array's first item. This is checked
+  against where the previous chunk actually ended, and chunks whose guess was
+  wrong (e.g. because it was a nested object or inside a string) are parsed
+  again in this process, starting from the correct boundary.
+
+  The arrays' items should be objects that start with the same key, as
+  otherwise most guesses will be wrong and parsing is effectively serial.
+  Memory use depends on `chunk_bytes` times `jobs`, as that many chunks' worth
+  of items are in flight at once.
+  """
+  specs: List[_ChunkSpec] = [
+    (path, key, start, min(start + chunk_bytes, size))
+    for path, key in sources
+    for size in [os.path.getsize(path)]
+    for start in range(0, max(size, 1), chunk_bytes)
+  ]
+  results = ordered_parallel_map(_parse_chunk, specs, jobs=jobs, chunk_size=1)
+  next_item_pos: Optional[int] = None
+  for (path, _, start, end), (item_pos, items, end_pos) in zip(specs, results):
+    if start > 0:
+      if next_item_pos is None:
+        # array already ended in an earlier chunk
+        continue
+      if item_pos != next_item_pos:
+        item_pos, items, end_pos = _parse_chunk_at(path, next_item_pos, end)
+    yield from items
+    next_item_pos = end_pos
+
+def _parse_chunk(spec: _ChunkSpec) -> _ChunkResult:
+  path, key, start, end = spec
+  if start == 0:
+    with open(path, encoding="utf-8") as f:
+      reader = _JsonStreamReader(f, chunk_size=1 << 16)
+      _enter_array_member(reader, key)
+      return _parse_items(reader, end)
+  item_pos = _find_item_start_candidate(path, key, start, end)
+  if item_pos is None:
+    return None, [], None
+  try:
+    return _parse_chunk_at(path, item_pos, end)
+  except ValueError:
+    # wrong guess, which the caller will notice
+    return None, [], None
+
+def _find_item_start_candidate(
+  path: Union[PathLike, str, bytes], key: str, start: int, end: int
+) -> Optional[int]:
+  with open(path, encoding="utf-8") as f:
+    reader = _JsonStreamReader(f, chunk_size=1 << 16)
+    _enter_array_member(reader, key)
+    if reader.peek_char() == "]":
+      return None
+    first_item = reader.decode_value()
+  if not isinstance(first_item, dict) or not first_item:
+    return None
+  first_key = json.dumps(next(iter(first_item)), ensure_ascii=False)
+  candidate_re = re.compile(
+    rb"[\[,][ \t\n\r]*(\{)[ \t\n\r]*"
+    + re.escape(first_key.encode("utf-8"))
+    + rb"[ \t\n\r]*:"
+  )
+  with open(path, "rb") as f:
+    # include the byte before the chunk in case it's a comma
+    f.seek(start - 1)
+    data = f.read(end - start + 1)
+  match = candidate_re.search(data)
+  if match is None:
+    return None
+  return start - 1 + match.start(1)
+
+def _parse_chunk_at(
+  path: Union[PathLike, str, bytes], item_pos: int, end: int
+) -> _ChunkResult:
+  with open(path, "rb") as raw_f:
+    raw_f.seek(item_pos)
+    f = io.TextIOWrapper(raw_f, encoding="utf-8")
+    reader = _JsonStreamReader(f, chunk_size=1 << 16, start_byte_pos=item_pos)
+    return _parse_items(reader, end)
+
+def _parse_items(reader: _JsonStreamReader, end: int) -> _ChunkResult:
+  """
+  Parses the array items starting before byte offset `end`.
+  """
+  items: List[Any] = []
+  if reader.peek_char() == "]":
+    return reader.byte_pos, items, None
+  item_pos = reader.byte_pos
+  while reader.byte_pos < end:
+    items.append(reader.decode_value())
+    if reader.expect_char(",]") == "]":
+      return item_pos, items, None
+    reader.peek_char()
+  return item_pos, items, reader.byte_pos
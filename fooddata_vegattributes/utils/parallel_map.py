@@ -0,0 +1,41 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Deque, Iterable, Iterator, List, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+def ordered_parallel_map(
+  func: Callable[[T], R],
+  iterable: Iterable[T],
+  jobs: int,
+  chunk_size: int = 256,
+) -> Iterator[R]:
+  """
+  Like `map`, but runs `func` in a pool of `jobs` processes.
+
+  Items are sent to the workers in chunks of `chunk_size` and results are
+  yielded in input order. At most `2 * jobs` chunks are in flight at any time,
+  so `iterable` is consumed lazily instead of being read into memory at once.
+  `func` and the items must be picklable. For `jobs <= 1`, this is just `map`.
+  """
+  if jobs <= 1:
+    yield from map(func, iterable)
+    return
+  it = iter(iterable)
+  with ProcessPoolExecutor(max_workers=jobs) as executor:
+    pending: Deque["Future[List[R]]"] = deque()
+    while True:
+      while len(pending) < 2 * jobs:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+          break
+        pending.append(executor.submit(_map_chunk, func, chunk))
+      if not pending:
+        return
+      yield from pending.popleft().result()
+
+def _map_chunk(func: Callable[[T], R], chunk: List[T]) -> List[R]:
+  return [func(x) for x in chunk]
@@ -1,4 +1,14 @@
 import re
+from typing import Any, Dict, Iterable, List, Optional
+
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+def tokenize_words(s: str) -> List[str]:
+  """
+  Splits string into lowercase words, dropping punctuation and whitespace.
+  """
+  return _WORD_RE.findall(s.lower())
 
 class MaxiMunchTokenFinder:
   def __init__(self, tokens):
@@ -14,3 +24,48 @@ class MaxiMunchTokenFinder:
 
   def find_all(self, s: str):
     return self.regex.findall(s)
+
+# key under which trie nodes store the token ending there (never a character)
+_TOKEN_KEY = ""
+
+class TrieTokenFinder:
+  """
+  Finds the same tokens as `MaxiMunchTokenFinder`, i.e. scanning from left to
+  right, the longest token that starts at the current position, but without
+  regular expressions: tokens are stored in a trie that is walked from each
+  position, so the cost per position depends on the length of the tokens that
+  start there rather than on their number.
+  """
+  def __init__(self, tokens: Iterable[str]):
+    self._root: Dict[str, Any] = {}
+    for token in tokens:
+      if not token:
+        raise ValueError("tokens must be non-empty")
+      node = self._root
+      for c in token:
+        node = node.setdefault(c, {})
+      node[_TOKEN_KEY] = token
+
+  def find_all(self, s: str) -> List[str]:
+    found = []
+    root = self._root
+    n = len(s)
+    i = 0
+    while i < n:
+      node = root.get(s[i])
+      longest: Optional[str] = None
+      j = i + 1
+      while node is not None:
+        token = node.get(_TOKEN_KEY)
+        if token is not None:
+          longest = token
+        if j == n:
+          break
+        node = node.get(s[j])
+        j += 1
+      if longest is None:
+        i += 1
+      else:
+        found.append(longest)
+        i += len(longest)
+    return found
@@ -0,0 +1,54 @@
+from dataclasses import fields, is_dataclass
+from typing import Any, cast, Dict, Tuple, TypeVar
+
+
+C = TypeVar("C", bound=type)
+
+def add_slots(cls: C) -> C:
+  """
+  Class decorator that recreates a dataclass with `__slots__` for its fields,
+  so its instances have no per-instance `__dict__`.
+
+  Equivalent to `dataclass(slots=True)`, which needs Python 3.10. Must be
+  applied on top of (i.e. after) `dataclass`. Frozen instances are pickled
+  by their `__init__` fields, with `__post_init__` run again on unpickling.
+  """
+  if not is_dataclass(cls):
+    raise TypeError(f"{cls.__name__} is not a dataclass")
+  if "__slots__" in cls.__dict__:
+    raise TypeError(f"{cls.__name__} already has __slots__")
+  field_names = tuple(f.name for f in fields(cls))
+  cls_dict: Dict[str, Any] = dict(cls.__dict__)
+  cls_dict["__slots__"] = field_names
+  for name in field_names:
+    # defaults are stored in the generated __init__ anyway and would conflict
+    # with the slots' descriptors
+    cls_dict.pop(name, None)
+  cls_dict.pop("__dict__", None)
+  cls_dict.pop("__weakref__", None)
+  if cls.__dataclass_params__.frozen:  # type: ignore[attr-defined]
+    # pickle's default for slotted objects uses setattr, which frozen
+    # dataclasses forbid
+    init_field_names = tuple(f.name for f in fields(cls) if f.init)
+    cls_dict["__getstate__"] = _make_getstate(init_field_names)
+    cls_dict["__setstate__"] = _make_setstate(init_field_names)
+  metaclass: type = type(cls)
+  new_cls = metaclass(cls.__name__, cls.__bases__, cls_dict)
+  new_cls.__qualname__ = cls.__qualname__
+  return cast(C, new_cls)
+
+def _make_getstate(init_field_names: Tuple[str, ...]):
+  def __getstate__(self) -> tuple:
+    return tuple(getattr(self, name) for name in init_field_names)
+  return __getstate__
+
+def _make_setstate(init_field_names: Tuple[str, ...]):
+  def __setstate__(self, state: tuple):
+    for name, value in zip(init_field_names, state):
+      object.__setattr__(self, name, value)
+    # fields not passed to __init__ are derived from the others, possibly in
+    # a way that differs between processes (like hashes of strings)
+    post_init = getattr(self, "__post_init__", None)
+    if post_init is not None:
+      post_init()
+  return __setstate__
@@ -0,0 +1,38 @@
+from dataclasses import asdict, dataclass
+import os
+from os import PathLike
+from typing import Any, Dict, Union
+
+
+@dataclass(frozen=True)
+class SourceFingerprint:
+  """
+  Identifies the version of a file that something was derived from.
+
+  Files are assumed to be unchanged as long as their size and modification
+  time are, so checking whether a file still `matches` its fingerprint never
+  requires reading it. Files that were merely touched don't match anymore.
+  """
+  size: int
+  mtime_ns: int
+
+  @classmethod
+  def from_path(
+    cls, path: Union[PathLike, str, bytes]
+  ) -> "SourceFingerprint":
+    stat = os.stat(path)
+    return cls(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+  @classmethod
+  def from_dict(cls, d: Dict[str, Any]) -> "SourceFingerprint":
+    return cls(size=d["size"], mtime_ns=d["mtime_ns"])
+
+  def to_dict(self) -> Dict[str, Any]:
+    return asdict(self)
+
+  def matches(self, path: Union[PathLike, str, bytes]) -> bool:
+    try:
+      stat = os.stat(path)
+    except FileNotFoundError:
+      return False
+    return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
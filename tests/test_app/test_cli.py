@@ -1,4 +1,6 @@
 import pytest
+import subprocess
+import sys
 from unittest.mock import patch
 
 from fooddata_vegattributes.app.cli import main
@@ -13,18 +15,59 @@ def test_cli_help_doesnt_crash():
       main()
     assert exc_info.value.args[0] == 0
 
-@pytest.mark.parametrize("command", ["generate", "annotate-ref", "input-ref"])
-def test_cli_dispatch(command):
+@pytest.mark.parametrize(
+  "command,module",
+  [
+    ("generate", "generate"),
+    ("annotate-ref", "annotate_reference_samples"),
+    ("input-ref", "input_reference_samples"),
+  ],
+)
+def test_cli_dispatch(command, module):
   """
   Test that dispatching to handler functions works.
   """
   with patch(
     "sys.argv", ["fooddata-vegattributes", command]
   ), patch(
-    f"fooddata_vegattributes.app.cli.{command.replace('-', '_')}_main",
+    f"fooddata_vegattributes.app.{module}.main",
     autospec=True
   ) as mock_command_handler:
     with pytest.raises(SystemExit) as exc_info:
       main()
     mock_command_handler.assert_called_once()
     assert exc_info.value.args[0] == 0
+
+def test_cli_search_dispatch():
+  with patch(
+    "sys.argv", ["fooddata-vegattributes", "search", "cheddar", "cheese"]
+  ), patch(
+    "fooddata_vegattributes.app.search.main", autospec=True
+  ) as mock_search_main:
+    with pytest.raises(SystemExit) as exc_info:
+      main()
+    mock_search_main.assert_called_once_with(["cheddar", "cheese"])
+    assert exc_info.value.args[0] == 0
+
+def test_cli_import_is_lazy():
+  """
+  Test that importing the CLI doesn't import subcommands' heavy dependencies.
+  """
+  # in a new interpreter, as other tests will have imported them already
+  loaded = subprocess.run(
+    [
+      sys.executable, "-c",
+      "import sys, fooddata_vegattributes.app.cli;"
+      "print('\\n'.join(sys.modules))",
+    ],
+    check=True,
+    capture_output=True,
+    text=True,
+  ).stdout.splitlines()
+  for module in [
+    "fooddata_vegattributes.description_based_heuristic",
+    "fooddata_vegattributes.utils.indexed_jsonable_store",
+    "fooddata_vegattributes.app.generate",
+    "fooddata_vegattributes.app.search",
+  ]:
+    assert module not in loaded
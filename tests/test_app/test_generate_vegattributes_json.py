@@ -1,3 +1,4 @@
+from concurrent.futures import ProcessPoolExecutor
 import json
 from pathlib import Path
 import pytest
@@ -44,10 +45,12 @@ def fake_reference_sample_dicts():
     ),
   ]
 
+@pytest.mark.parametrize("jobs", [1, 2])
 def test_generate_vegattributes_json(
   fake_fooddata_jsons: FakeFoodDataJsons,
   fake_reference_samples_csv: FakeReferenceSampleCsv,
   tmp_path: Path,
+  jobs: int,
 ):
   # shortcuts
   survey_json_path = fake_fooddata_jsons.survey.path
@@ -74,9 +77,19 @@ def test_generate_vegattributes_json(
     "fooddata_vegattributes.app.default_paths.default_dir_paths"
     ".generated_vegattributes_json",
     tmp_path/"generated_vegattributes.json",
-  ) as generated_vegattributes_json_path:
+  ) as generated_vegattributes_json_path, patch(
+    "fooddata_vegattributes.utils.parallel_map.ProcessPoolExecutor",
+    wraps=ProcessPoolExecutor,
+  ) as parallel_map_pool, patch(
+    "fooddata_vegattributes.sharded_categorization.ProcessPoolExecutor",
+    wraps=ProcessPoolExecutor,
+  ) as sharded_categorization_pool, patch("os.cpu_count", return_value=4):
     # run generate app
-    main()
+    main(jobs=jobs)
+
+  # no process pools are started for a single job, regardless of CPU count
+  pools = [parallel_map_pool, sharded_categorization_pool]
+  assert any(pool.called for pool in pools) == (jobs > 1)
 
   # read results (generated VegAttributes JSON file)
   with generated_vegattributes_json_path.open() as f:
@@ -0,0 +1,73 @@
+from pathlib import Path
+import pytest
+from typing import List
+from unittest.mock import patch
+
+from fooddata_vegattributes.app.search import main
+from fooddata_vegattributes.fooddata import FoodDataDict
+
+from .conftest import FakeFoodDataJsons, FakeReferenceSampleCsv
+
+
+@pytest.fixture
+def fake_food_data() -> List[FoodDataDict]:
+  return [
+    {
+      "fdcId": 123456,
+      "description": "Cheese, cheddar, unsalted",
+      "inputFoods": [],
+      "foodCode": 3000,
+      "wweiaFoodCategory": {
+        "wweiaFoodCategoryDescription": "Cheese",
+      },
+    },
+    {
+      "fdcId": 654321,
+      "description": "Cheese sandwich, salted",
+      "inputFoods": [],
+      "foodCode": 9000,
+      "wweiaFoodCategory": {
+        "wweiaFoodCategoryDescription": "Sandwiches",
+      },
+    },
+  ]
+
+@pytest.fixture
+def fake_reference_sample_dicts():
+  return []
+
+def test_search(
+  fake_fooddata_jsons: FakeFoodDataJsons,
+  fake_reference_samples_csv: FakeReferenceSampleCsv,
+  tmp_path: Path,
+  capsys: pytest.CaptureFixture,
+):
+  with patch(
+    "fooddata_vegattributes.app.default_paths.default_dir_paths"
+    ".survey_fooddata_json",
+    fake_fooddata_jsons.survey.path,
+  ), patch(
+    "fooddata_vegattributes.app.default_paths.default_dir_paths"
+    ".sr_legacy_fooddata_json",
+    fake_fooddata_jsons.sr_legacy.path,
+  ), patch(
+    "fooddata_vegattributes.app.default_paths.default_dir_paths"
+    ".compressed_indexed_fooddata_json",
+    tmp_path/"compressed_indexed_fooddata.jsons.zip",
+  ), patch(
+    "fooddata_vegattributes.app.default_paths.default_dir_paths"
+    ".reference_samples_csv",
+    fake_reference_samples_csv.path,
+  ):
+    main(["CHEESE"])
+    assert capsys.readouterr().out.splitlines() == [
+      "123456\tCheese, cheddar, unsalted",
+      "654321\tCheese sandwich, salted",
+    ]
+    # all words must match, in any order and regardless of punctuation
+    main(["salted", "cheese,"])
+    assert capsys.readouterr().out.splitlines() == [
+      "654321\tCheese sandwich, salted",
+    ]
+    main(["cheese", "pizza"])
+    assert capsys.readouterr().out == ""
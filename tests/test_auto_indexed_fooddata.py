@@ -0,0 +1,180 @@
+import json
+import os
+from pathlib import Path
+from typing import cast, List
+from unittest.mock import patch
+
+import pytest
+
+from fooddata_vegattributes import build_manifest
+from fooddata_vegattributes.auto_indexed_fooddata import (
+  auto_compressed_indexed_fooddata_json,
+)
+from fooddata_vegattributes.compressed_indexed_fooddata import (
+  CompressedIndexedFoodDataJson,
+)
+from fooddata_vegattributes.fooddata import FoodDataDict
+from fooddata_vegattributes.utils.indexed_jsonable_store import (
+  IndexedJsonableStore,
+  IndexSpec,
+  StoreFormat,
+)
+
+
+def make_food_d(fdc_id: int, description: str) -> FoodDataDict:
+  return cast(FoodDataDict, {
+    "fdcId": fdc_id,
+    "description": description,
+    "inputFoods": [],
+    "foodCode": fdc_id,
+    "wweiaFoodCategory": {"wweiaFoodCategoryDescription": "Miscellany"},
+  })
+
+@pytest.mark.parametrize("format", list(StoreFormat))
+def test_regenerates_outdated(
+  tmp_path: Path, format: StoreFormat, monkeypatch: pytest.MonkeyPatch
+):
+  source_path = tmp_path/"source.json"
+  archive_path = tmp_path/"archive"
+  loads: List[int] = []
+
+  def load():
+    loads.append(1)
+    return json.loads(source_path.read_text())
+
+  def get_description(fdc_id: int) -> str:
+    with auto_compressed_indexed_fooddata_json(
+      archive_path,
+      load,
+      format=format,
+      build_jobs=1,
+      source_paths=[source_path],
+    ) as cifj:
+      return cifj.get_fooddata_dict_by_fdc_id(fdc_id)["description"]
+
+  # built from scratch, then reused
+  source_path.write_text(json.dumps([make_food_d(1, "Tea")]))
+  assert get_description(1) == "Tea"
+  assert get_description(1) == "Tea"
+  assert len(loads) == 1
+
+  # touched sources trigger a rebuild, but only once, as they're then
+  # recorded with their new modification time
+  mtime_ns = source_path.stat().st_mtime_ns
+  os.utime(source_path, ns=(mtime_ns, mtime_ns + 10**9))
+  assert get_description(1) == "Tea"
+  assert get_description(1) == "Tea"
+  assert len(loads) == 2
+
+  # changed sources do as well
+  source_path.write_text(json.dumps([make_food_d(1, "Coffee")]))
+  os.utime(source_path, ns=(mtime_ns, mtime_ns + 2 * 10**9))
+  assert get_description(1) == "Coffee"
+  assert len(loads) == 3
+
+  # as do format changes
+  monkeypatch.setattr(build_manifest, "ARCHIVE_FORMAT_VERSION", 1000)
+  assert get_description(1) == "Coffee"
+  assert len(loads) == 4
+
+  # only the archive (and nothing temporary) is left, apart from files SQLite
+  # keeps next to it while reading
+  assert sorted(
+    p.name for p in tmp_path.iterdir()
+    if p.name not in ["archive-wal", "archive-shm"]
+  ) == ["archive", "source.json"]
+
+@pytest.mark.parametrize("truncated_size", [0, 12, 100])
+def test_regenerates_truncated_packed(tmp_path: Path, truncated_size: int):
+  archive_path = tmp_path/"archive"
+  def get_description(description: str) -> str:
+    with auto_compressed_indexed_fooddata_json(
+      archive_path,
+      lambda: [make_food_d(1, description)],
+      format=StoreFormat.PACKED,
+      build_jobs=1,
+    ) as cifj:
+      return cifj.get_fooddata_dict_by_fdc_id(1)["description"]
+  assert get_description("Old") == "Old"
+  with open(archive_path, "r+b") as f:
+    f.truncate(truncated_size)
+  assert get_description("New") == "New"
+
+def test_reuses_without_manifest(tmp_path: Path):
+  archive_path = tmp_path/"archive.zip"
+  with CompressedIndexedFoodDataJson.from_path(archive_path, "w") as cifj:
+    cifj.write_fooddata_dicts([make_food_d(1, "Old")])
+  with auto_compressed_indexed_fooddata_json(
+    archive_path, lambda: [make_food_d(1, "New")], build_jobs=1
+  ) as cifj:
+    assert cifj.get_fooddata_dict_by_fdc_id(1)["description"] == "Old"
+    assert cifj.get_build_manifest() is None
+
+def test_regenerates_without_manifest_and_food_stubs(tmp_path: Path):
+  archive_path = tmp_path/"archive.zip"
+  # like files written before food stubs and build manifests existed
+  with IndexedJsonableStore.from_path(
+    archive_path,
+    primary_index=IndexSpec("fdc-id", lambda d: str(d["fdcId"])),
+    secondary_indices=[],
+    mode="w",
+  ) as store:
+    store.put_entries([make_food_d(1, "Old")])
+  with auto_compressed_indexed_fooddata_json(
+    archive_path, lambda: [make_food_d(1, "New")], build_jobs=1
+  ) as cifj:
+    assert cifj.get_fooddata_dict_by_fdc_id(1)["description"] == "New"
+    manifest = cifj.get_build_manifest()
+    assert manifest is not None
+    assert manifest.sources == []
+
+def test_reuses_if_sources_missing(tmp_path: Path):
+  source_path = tmp_path/"source.json"
+  archive_path = tmp_path/"archive.zip"
+  source_path.write_text(json.dumps([make_food_d(1, "Tea")]))
+
+  def get_description(fdc_id: int) -> str:
+    with auto_compressed_indexed_fooddata_json(
+      archive_path,
+      lambda: json.loads(source_path.read_text()),
+      build_jobs=1,
+      source_paths=[source_path],
+    ) as cifj:
+      return cifj.get_fooddata_dict_by_fdc_id(fdc_id)["description"]
+
+  assert get_description(1) == "Tea"
+  # the archive must remain usable without the (large) source files
+  source_path.unlink()
+  assert get_description(1) == "Tea"
+
+def test_raises_if_incompatible_and_sources_missing(
+  tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+  source_path = tmp_path/"source.json"
+  archive_path = tmp_path/"archive.zip"
+  source_path.write_text(json.dumps([make_food_d(1, "Tea")]))
+
+  def open_archive():
+    with auto_compressed_indexed_fooddata_json(
+      archive_path,
+      lambda: json.loads(source_path.read_text()),
+      build_jobs=1,
+      source_paths=[source_path],
+    ):
+      pass
+
+  open_archive()
+  source_path.unlink()
+  monkeypatch.setattr(build_manifest, "ARCHIVE_FORMAT_VERSION", 1000)
+  with pytest.raises(ValueError, match="incompatible"):
+    open_archive()
+
+def test_builds_in_one_process_by_default(tmp_path: Path):
+  with patch(
+    "fooddata_vegattributes.utils.parallel_map.ProcessPoolExecutor"
+  ) as pool, patch("os.cpu_count", return_value=4):
+    with auto_compressed_indexed_fooddata_json(
+      tmp_path/"archive.zip", lambda: [make_food_d(1, "Tea")]
+    ) as cifj:
+      assert cifj.get_fooddata_dict_by_fdc_id(1)["description"] == "Tea"
+  assert not pool.called
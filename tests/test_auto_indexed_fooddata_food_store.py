@@ -0,0 +1,28 @@
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+from fooddata_vegattributes.auto_indexed_fooddata_food_store import (
+  auto_compressed_indexed_fooddata_food_store,
+)
+
+
+def test_loads_in_one_process_by_default(tmp_path: Path):
+  survey_path = tmp_path/"survey.json"
+  survey_path.write_text(json.dumps({"SurveyFoods": [{
+    "fdcId": 1,
+    "description": "Tea",
+    "inputFoods": [],
+    "foodCode": 1000,
+    "wweiaFoodCategory": {"wweiaFoodCategoryDescription": "Tea"},
+  }]}))
+  sr_legacy_path = tmp_path/"sr_legacy.json"
+  sr_legacy_path.write_text(json.dumps({"SRLegacyFoods": []}))
+  with patch(
+    "fooddata_vegattributes.utils.parallel_map.ProcessPoolExecutor"
+  ) as pool, patch("os.cpu_count", return_value=4):
+    with auto_compressed_indexed_fooddata_food_store(
+      tmp_path/"archive.zip", survey_path, sr_legacy_path
+    ) as food_store:
+      assert food_store.get_by_fdc_id(1).description == "Tea"
+  assert not pool.called
@@ -0,0 +1,154 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import pytest
+
+from fooddata_vegattributes.abstract_food_store import AbstractFoodStore
+from fooddata_vegattributes.abstract_reference_sample_store import (
+  AbstractReferenceSampleStore,
+)
+from fooddata_vegattributes.categorization import (
+  CategorizationSource,
+  Categorizer,
+)
+from fooddata_vegattributes.category import Category
+from fooddata_vegattributes.food import Food, InputFoodStub
+from fooddata_vegattributes.reference_sample import ReferenceSample
+from fooddata_vegattributes.utils.close_on_exit import CloseOnExit
+
+
+class FakeFoodStore(AbstractFoodStore, CloseOnExit):
+  def __init__(self, foods: Iterable[Food]):
+    self.foods_by_ingredient_code = {
+      food.ingredient_code: food for food in foods
+    }
+    self.lookups: Counter = Counter()
+
+  def get_by_ingredient_code(self, ingredient_code: int) -> Food:
+    self.lookups[ingredient_code] += 1
+    return self.foods_by_ingredient_code[ingredient_code]
+
+  def close(self): pass
+  def get_mapped_by_fdc_ids(self, fdc_ids): raise NotImplementedError
+  def get_by_fdc_id(self, fdc_id): raise NotImplementedError
+  def get_all_fdc_ids(self): raise NotImplementedError
+  def get_mapped_by_fdc_category(self, d): raise NotImplementedError
+  def search_by_description_tokens(self, tokens): raise NotImplementedError
+
+class FakeReferenceSampleStore(AbstractReferenceSampleStore, CloseOnExit):
+  def __init__(self, reference_samples: List[ReferenceSample]):
+    self.reference_samples = reference_samples
+
+  def get_all_mapped_by_fdc_ids(self) -> Mapping[int, ReferenceSample]:
+    return {r.fdc_id: r for r in self.reference_samples}
+
+  def close(self): pass
+  def iter_all(self): raise NotImplementedError
+  def iter_all_fdc_ids(self): raise NotImplementedError
+  def reset_and_put_all(self, reference_samples: Sequence[ReferenceSample]):
+    raise NotImplementedError
+  def append(self, reference_sample: ReferenceSample):
+    raise NotImplementedError
+
+def make_food(
+  code: int, description: str, input_codes: Sequence[int] = ()
+) -> Food:
+  return Food(
+    description=description,
+    fdc_id=code,
+    input_food_stubs=tuple(
+      InputFoodStub(0, "Unknown", input_code) for input_code in input_codes
+    ),
+    fdc_category_description="Miscellany",
+    food_code=code,
+  )
+
+def make_categorizer(
+  foods: Iterable[Food], reference_samples: List[ReferenceSample] = []
+) -> Categorizer:
+  return Categorizer(
+    reference_sample_store=FakeReferenceSampleStore(reference_samples),
+    food_store=FakeFoodStore(foods),
+  )
+
+def test_shared_input_foods_are_categorized_once():
+  # diamond-shaped: both sandwich parts are made of the same bread
+  foods: Dict[int, Food] = {
+    1: make_food(1, "Bread, wheat"),
+    2: make_food(2, "Sandwich part", [1]),
+    3: make_food(3, "Other sandwich part", [1]),
+    4: make_food(4, "Beef, raw"),
+    5: make_food(5, "Sandwich", [2, 3, 4]),
+  }
+  categorizer = make_categorizer(
+    foods.values(),
+    [ReferenceSample(fdc_id=3, expected_category=Category.VEGETARIAN)],
+  )
+  food_store = categorizer.food_store
+  assert isinstance(food_store, FakeFoodStore)
+
+  categorization = categorizer.categorize(foods[5])
+  assert categorization.category == Category.OMNI
+  assert categorizer.categorize(foods[5]) is categorization
+  # 2 lookups of each input food: one in the traversal, one in the heuristic
+  assert food_store.lookups[1] == 4
+  assert all(food_store.lookups[code] == 2 for code in [2, 3, 4])
+
+  # input foods' reference categories are taken into account
+  assert categorizer.categorize(foods[2]).category == Category.VEGAN
+  part_categorization = categorizer.categorize(foods[3])
+  assert part_categorization.category == Category.VEGETARIAN
+  assert part_categorization.source == CategorizationSource.REFERENCE
+  assert part_categorization.discrepancies == {
+    CategorizationSource.HEURISTIC: Category.VEGAN
+  }
+
+def test_categorize_all():
+  foods = [
+    make_food(5, "Sandwich", [2, 3, 4]),
+    make_food(1, "Bread, wheat"),
+    make_food(2, "Sandwich part", [1]),
+    make_food(3, "Other sandwich part", [1, 6]),
+    make_food(4, "Tofu, raw"),
+    make_food(6, "Milk, whole"),
+  ]
+  reference_samples = [
+    ReferenceSample(fdc_id=4, expected_category=Category.OMNI)
+  ]
+  expected = {
+    food: make_categorizer(foods, reference_samples).categorize(food)
+    for food in foods
+  }
+  categorizer = make_categorizer(foods, reference_samples)
+  food_store = categorizer.food_store
+  assert isinstance(food_store, FakeFoodStore)
+
+  # only passing some of the foods, the rest are input foods
+  progress: List[Tuple[int, int]] = []
+  categorizations = categorizer.categorize_all(
+    foods[:1], on_progress=lambda *args: progress.append(args)
+  )
+  assert progress == [(i, 6) for i in range(1, 7)]
+  assert categorizations == {foods[0]: expected[foods[0]]}
+  assert categorizations[foods[0]].category == Category.OMNI
+  # input foods are looked up twice per food made of them (once to build the
+  # graph, once by the heuristics), but never categorized more than once
+  assert food_store.lookups[1] == 4
+  assert all(food_store.lookups[code] == 2 for code in [2, 3, 4, 6])
+
+  categorizations = categorizer.categorize_all(foods)
+  assert list(categorizations) == foods
+  assert categorizations == expected
+  assert food_store.lookups[1] == 4
+
+def test_cyclic_input_foods():
+  foods = [
+    make_food(1, "Bread, wheat", [3]),
+    make_food(2, "Sandwich part", [1]),
+    make_food(3, "Sandwich", [2]),
+  ]
+  categorizer = make_categorizer(foods)
+  with pytest.raises(ValueError, match="1 -> 3 -> 2 -> 1"):
+    categorizer.categorize(foods[0])
+  with pytest.raises(ValueError, match="cyclic"):
+    make_categorizer(foods).categorize_all(foods)
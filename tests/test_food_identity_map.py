@@ -0,0 +1,66 @@
+from pathlib import Path
+from typing import cast
+
+from fooddata_vegattributes.auto_indexed_fooddata import (
+  auto_compressed_indexed_fooddata_json,
+)
+from fooddata_vegattributes.food import Food
+from fooddata_vegattributes.fooddata import FoodDataDict
+from fooddata_vegattributes.food_identity_map import FoodIdentityMap
+from fooddata_vegattributes.indexed_fooddata_food_store import (
+  IndexedFoodDataFoodStore,
+)
+from fooddata_vegattributes.utils.bounded_cache import CachePolicy
+
+
+def make_food(fdc_id: int) -> Food:
+  return Food(
+    description=f"Food {fdc_id}",
+    fdc_id=fdc_id,
+    input_food_stubs=(),
+    fdc_category_description="Miscellany",
+    food_code=1000 + fdc_id,
+  )
+
+def test_food_identity_map():
+  identity_map = FoodIdentityMap(CachePolicy(max_entries=2))
+  food = make_food(1)
+  assert identity_map.get_by_fdc_id(1) is None
+  assert identity_map.add(food) is food
+  # an equal food constructed later is replaced by the known one
+  assert identity_map.add(make_food(1)) is food
+  assert identity_map.get_by_fdc_id(1) is food
+  assert identity_map.get_by_ingredient_code(1001) is food
+  assert identity_map.stats.hits == 2
+  assert identity_map.stats.misses == 1
+  assert identity_map.stats.hit_rate == 2 / 3
+
+  identity_map.add(make_food(2))
+  identity_map.add(make_food(3))
+  assert identity_map.stats.evictions == 1
+  assert identity_map.get_by_fdc_id(1) is None
+  assert identity_map.get_by_fdc_id(3) is not None
+
+def test_store_returns_identical_foods(tmp_path: Path):
+  archive_path = tmp_path/"archive.zip"
+  food_ds = [
+    cast(FoodDataDict, {
+      "fdcId": fdc_id,
+      "description": f"Food {fdc_id}",
+      "inputFoods": [],
+      "foodCode": 1000 + fdc_id,
+      "wweiaFoodCategory": {"wweiaFoodCategoryDescription": "Miscellany"},
+    })
+    for fdc_id in [1, 2]
+  ]
+  with auto_compressed_indexed_fooddata_json(
+    archive_path, lambda: food_ds, build_jobs=1
+  ):
+    pass
+  with IndexedFoodDataFoodStore.from_path(archive_path) as store:
+    food = store.get_by_fdc_id(1)
+    assert store.get_by_fdc_id(1) is food
+    assert store.get_by_ingredient_code(1001) is food
+    assert store.get_mapped_by_fdc_category("Miscellany")[1] is food
+    assert store.identity_map.stats.hits == 2
+    assert store.identity_map.stats.misses == 1
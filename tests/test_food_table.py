@@ -0,0 +1,60 @@
+from dataclasses import replace
+import pickle
+
+from fooddata_vegattributes.food import Food, InputFoodStub
+from fooddata_vegattributes.food_table import FoodTable
+
+
+foods = [
+  Food(
+    description="Cheese sandwich",
+    fdc_id=1,
+    input_food_stubs=(
+      InputFoodStub(10, "Bread", 100),
+      InputFoodStub(11, "Cheese", 101),
+    ),
+    fdc_category_description="Sandwiches",
+    food_code=1000,
+  ),
+  Food(
+    description="Cheese",
+    fdc_id=2,
+    input_food_stubs=(),
+    fdc_category_description="Cheese",
+    ndb_number=2000,
+  ),
+  Food(
+    description="Ham sandwich",
+    fdc_id=3,
+    input_food_stubs=(InputFoodStub(12, "Ham", 102),),
+    fdc_category_description="Sandwiches",
+    food_code=3000,
+  ),
+]
+
+def test_food_equality():
+  renamed = Food(
+    description="Renamed",
+    fdc_id=1,
+    input_food_stubs=(),
+    fdc_category_description="Other",
+  )
+  assert renamed != foods[0]
+  assert {foods[0]: "x"}.get(renamed) is None
+  unpickled = pickle.loads(pickle.dumps(foods[0]))
+  assert unpickled == foods[0]
+  assert {foods[0]: "x"}[unpickled] == "x"
+  # the cached hash is that of all fields, like the generated one would be
+  copy = replace(foods[0])
+  assert copy is not foods[0]
+  assert hash(copy) == hash(foods[0])
+
+def test_food_table():
+  table = FoodTable.from_foods(foods)
+  assert len(table) == 3
+  assert list(table.fdc_ids) == [1, 2, 3]
+  assert table.fdc_category_descriptions == ["Sandwiches", "Cheese"]
+  assert list(table.fdc_category_ordinals) == [0, 1, 0]
+  assert table.count_by_fdc_category() == {"Sandwiches": 2, "Cheese": 1}
+  assert list(table) == foods
+  assert table[-1].input_food_stubs == foods[2].input_food_stubs
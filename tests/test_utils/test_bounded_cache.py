@@ -0,0 +1,73 @@
+import pytest
+
+from fooddata_vegattributes.utils.bounded_cache import (
+  bounded_cache_from_policy,
+  CachePolicy,
+  Eviction,
+)
+
+
+@pytest.mark.parametrize("eviction", list(Eviction))
+def test_max_entries(eviction: Eviction):
+  cache = bounded_cache_from_policy(
+    CachePolicy(max_entries=2, eviction=eviction)
+  )
+  cache.put("a", 1)
+  cache.put("b", 2)
+  assert cache.get("a") == 1
+  cache.put("c", 3)
+  # "a" was used more recently (LRU) or has its reference bit set (CLOCK)
+  assert "a" in cache
+  assert "b" not in cache
+  assert "c" in cache
+  assert len(cache) == 2
+  assert cache.get("b") is None
+  assert cache.stats.hits == 1
+  assert cache.stats.misses == 1
+  assert cache.stats.evictions == 1
+  assert cache.stats.hit_rate == 0.5
+
+@pytest.mark.parametrize("eviction", list(Eviction))
+def test_max_bytes(eviction: Eviction):
+  cache = bounded_cache_from_policy(
+    CachePolicy(max_bytes=10, eviction=eviction), size_func=len
+  )
+  cache.put("a", b"12345")
+  cache.put("b", b"12345")
+  assert cache.n_bytes == 10
+  cache.put("c", b"123")
+  assert "c" in cache
+  assert cache.n_bytes <= 10
+  assert cache.stats.evictions == 1
+  # replacing values keeps the size accounting correct
+  cache.put("c", b"1")
+  assert cache.n_bytes == sum(
+    len(v) for v in (cache.get(k) for k in "abc") if v is not None
+  )
+
+@pytest.mark.parametrize("eviction", list(Eviction))
+def test_discard(eviction: Eviction):
+  cache = bounded_cache_from_policy(
+    CachePolicy(max_entries=2, eviction=eviction), size_func=len
+  )
+  cache.put("a", b"123")
+  cache.put("b", b"45")
+  cache.discard("a")
+  cache.discard("not there")
+  assert "a" not in cache
+  assert len(cache) == 1
+  assert cache.n_bytes == 2
+  cache.put("c", b"6")
+  assert "b" in cache and "c" in cache
+  assert cache.stats.evictions == 0
+
+def test_unbounded():
+  cache = bounded_cache_from_policy(CachePolicy())
+  for i in range(1000):
+    cache.put(i, i)
+  assert len(cache) == 1000
+  assert cache.stats.evictions == 0
+
+def test_max_bytes_requires_size_func():
+  with pytest.raises(ValueError):
+    bounded_cache_from_policy(CachePolicy(max_bytes=10))
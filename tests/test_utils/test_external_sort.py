@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from fooddata_vegattributes.utils.external_sort import ExternalSorter
+
+
+@pytest.mark.parametrize("max_in_memory", [1, 7, 1000])
+def test_sorts_like_sorted(max_in_memory: int):
+  rng = random.Random(0)
+  rows = [(rng.choice("abcde"), i, str(rng.random())) for i in range(100)]
+  # (fan-in too large for any runs to be merged before the end)
+  with ExternalSorter(max_in_memory, max_merge_fan_in=128) as sorter:
+    for row in rows:
+      sorter.add(row)
+    assert sorter.n_runs == 100 // max_in_memory
+    assert list(sorter.iter_sorted()) == sorted(rows)
+    # rows are consumed
+    assert sorter.n_runs == 0
+    assert list(sorter.iter_sorted()) == []
+
+@pytest.mark.parametrize("max_merge_fan_in", [2, 3, 16])
+def test_many_runs(max_merge_fan_in: int):
+  rng = random.Random(0)
+  rows = [(rng.randrange(1000), i) for i in range(2000)]
+  max_n_runs = 0
+  with ExternalSorter(2, max_merge_fan_in=max_merge_fan_in) as sorter:
+    for row in rows:
+      sorter.add(row)
+      max_n_runs = max(max_n_runs, sorter.n_runs)
+    assert list(sorter.iter_sorted()) == sorted(rows)
+  # 1000 spills, but only up to fan-in - 1 runs per level are kept open
+  n_levels = 1
+  while max_merge_fan_in ** n_levels < 1000:
+    n_levels += 1
+  assert max_n_runs <= (max_merge_fan_in - 1) * n_levels
+
+def test_invalid_arguments():
+  with pytest.raises(ValueError):
+    ExternalSorter(0)
+  with pytest.raises(ValueError):
+    ExternalSorter(1, max_merge_fan_in=1)
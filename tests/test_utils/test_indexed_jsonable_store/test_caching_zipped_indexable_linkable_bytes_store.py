@@ -1,12 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict
 
 import pytest
 
+from fooddata_vegattributes.utils.bounded_cache import CachePolicy
 from fooddata_vegattributes.utils.indexed_jsonable_store \
 .caching_zipped_indexable_linkable_bytes_store import (
   CachingZippedIndexableLinkableBytesStore
 )
+from fooddata_vegattributes.utils.indexed_jsonable_store \
+.zipped_indexable_linkable_bytes_store import ZippedIndexableLinkableBytesStore
 
 
 @pytest.fixture()
@@ -57,3 +61,96 @@ def test_links(
     assert store.get_entry("category", "punctuation") == b"!"
     categories = list(store.iter_index("category"))
     assert sorted(categories) == ["punctuation", "word"]
+
+def test_bounded_cache(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  path = tmp_path/"store.zip"
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", sample_entries_by_id.items())
+    store.put_links("category", [("word", [("id", "1"), ("id", "2")])])
+  with (
+    CachingZippedIndexableLinkableBytesStore.from_path(
+      path, mode="r", cache_policy=CachePolicy(max_entries=1)
+    )
+  ) as store:
+    assert sorted(store.iter_entries("category", "word")) == [
+      b"hello", b"world"
+    ]
+    assert store.get_entry("id", "2") == b"world"
+    assert store.get_entry("id", "1") == b"hello"
+    assert store.cache_stats.hits == 1
+    assert store.cache_stats.misses == 3
+    assert store.cache_stats.evictions == 2
+
+def test_concurrent_cache_population(tmp_path: Path):
+  path = tmp_path/"store.zip"
+  entries_by_id = {str(i): f"entry {i}".encode() for i in range(200)}
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", entries_by_id.items())
+    store.put_links("parity", [
+      ("even", [("id", i) for i in entries_by_id if int(i) % 2 == 0]),
+      ("odd", [("id", i) for i in entries_by_id if int(i) % 2 == 1]),
+    ])
+  with (
+    CachingZippedIndexableLinkableBytesStore.from_path(
+      path, mode="r", cache_policy=CachePolicy(max_entries=50)
+    )
+  ) as store:
+    def read(i: str) -> bytes:
+      parity = "even" if int(i) % 2 == 0 else "odd"
+      assert entries_by_id[i] in store.iter_entries("parity", parity)
+      return store.get_entry("id", i)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+      results = list(executor.map(read, list(entries_by_id) * 3))
+    assert results == list(entries_by_id.values()) * 3
+    assert len(store._data) <= 50
+
+def test_writing_doesnt_populate_cache(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  path = tmp_path/"store.zip"
+  with (
+    CachingZippedIndexableLinkableBytesStore.from_path(path, mode="w")
+  ) as store:
+    store.put_entries("id", sample_entries_by_id.items())
+    assert len(store._data) == 0
+    assert store.get_entry("id", "1") == b"hello"
+    assert len(store._data) == 1
+    # replacing an entry invalidates it
+    store.put_entries("id", [("1", b"hi")])
+    assert store.get_entry("id", "1") == b"hi"
+
+def test_merged_links_cached(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path,
+  monkeypatch: pytest.MonkeyPatch,
+):
+  n_merges = 0
+  merge = ZippedIndexableLinkableBytesStore._load_stored_links
+  def counting_merge(self, index_name):
+    nonlocal n_merges
+    n_merges += 1
+    return merge(self, index_name)
+  monkeypatch.setattr(
+    ZippedIndexableLinkableBytesStore, "_load_stored_links", counting_merge
+  )
+  path = tmp_path/"store.zip"
+  with (
+    CachingZippedIndexableLinkableBytesStore.from_path(path, mode="w")
+  ) as store:
+    store.put_entries("id", sample_entries_by_id.items())
+    store.put_sorted_links("category", [("word", [("id", "1"), ("id", "2")])])
+    assert list(store.iter_index("category")) == ["word"]
+    assert store.get_link_targets("category", "word") == [
+      ["id", "1"], ["id", "2"]
+    ]
+    assert n_merges == 1
+    # pending links are merged with the cached ones
+    store.put_links("category", [("punctuation", [("id", "3")])])
+    assert sorted(store.iter_index("category")) == ["punctuation", "word"]
+    assert n_merges == 1
+    # a new link generation supersedes the cached links
+    store._flush_links()
+    assert sorted(store.iter_index("category")) == ["punctuation", "word"]
+    assert sorted(store.iter_index("category")) == ["punctuation", "word"]
+    assert n_merges == 2
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from fooddata_vegattributes.utils.indexed_jsonable_store import entry_codec
+from fooddata_vegattributes.utils.indexed_jsonable_store.entry_codec import (
+  EntryCodec, get_codec_impl, TaggedBinaryCodecImpl
+)
+
+
+SAMPLE = {
+  "fdcId": 1104067,
+  "description": "Milk, whole",
+  "isVegan": False,
+  "isVegetarian": True,
+  "missing": None,
+  "amounts": [0, -1, 2**40, -2**70, 3.25, -0.0],
+  "foodNutrients": [
+    {"nutrient": {"name": "Protein", "unitName": "G"}, "amount": 3.27},
+    {"nutrient": {"name": "Fat", "unitName": "G"}, "amount": 3.2},
+  ],
+  "unicode": "Crème brûlée ✓",
+}
+
+@pytest.mark.parametrize("codec", list(EntryCodec))
+def test_roundtrip(codec: EntryCodec):
+  impl = get_codec_impl(codec)
+  if codec == EntryCodec.JSON and entry_codec.orjson is not None:
+    # orjson can't encode integers beyond 64 bits
+    sample = {k: v for k, v in SAMPLE.items() if k != "amounts"}
+  else:
+    sample = SAMPLE
+  encoded = impl.encode(sample)
+  assert impl.decode(encoded) == sample
+  assert impl.decode(memoryview(encoded)) == sample
+
+def test_json_without_orjson(monkeypatch: pytest.MonkeyPatch):
+  monkeypatch.setattr(entry_codec, "orjson", None)
+  impl = get_codec_impl(EntryCodec.JSON)
+  encoded = impl.encode(SAMPLE)
+  assert json.loads(encoded) == SAMPLE
+  assert impl.decode(memoryview(encoded)) == SAMPLE
+
+def test_tagged_binary_stores_repeated_strings_once():
+  encoded = TaggedBinaryCodecImpl().encode(SAMPLE)
+  assert encoded.count(b"unitName") == 1
+  assert len(encoded) < len(json.dumps(SAMPLE).encode("utf-8"))
+
+def test_tagged_binary_rejects_garbage():
+  impl = TaggedBinaryCodecImpl()
+  with pytest.raises(ValueError):
+    impl.decode(b"\xff")
+  with pytest.raises(ValueError):
+    impl.decode(impl.encode(1) + b"\x00")
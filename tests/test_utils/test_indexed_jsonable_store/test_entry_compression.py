@@ -0,0 +1,45 @@
+import json
+from zipfile import ZIP_DEFLATED, ZIP_STORED
+
+import pytest
+
+from fooddata_vegattributes.utils.indexed_jsonable_store.entry_compression \
+import EntryCompression, train_zdict
+
+
+def make_entry(i: int) -> bytes:
+  return json.dumps({
+    "fdcId": i,
+    "description": f"Food number {i}",
+    "foodNutrients": [
+      {"nutrient": {"name": f"Nutrient {j}", "unitName": "G"}, "amount": i}
+      for j in range(20)
+    ],
+  }).encode("utf-8")
+
+def test_train_zdict():
+  samples = [make_entry(i) for i in range(50)]
+  zdict = train_zdict(samples, max_size=1024)
+  assert 0 < len(zdict) <= 1024
+  # fragments shared by all entries should have made it in
+  assert b'"unitName": "G"}' in zdict
+  # but not ones that are unique to one entry
+  assert b'"Food number 7"' not in zdict
+
+def test_shared_dictionary_roundtrip_and_ratio():
+  samples = [make_entry(i) for i in range(50)]
+  plain = EntryCompression(ZIP_DEFLATED)
+  shared = EntryCompression(
+    ZIP_DEFLATED, shared_dictionary=True, zdict=train_zdict(samples)
+  )
+  entry = make_entry(1234)
+  assert shared.decompress(shared.compress(entry)) == entry
+  assert len(shared.compress(entry)) < len(plain.compress(entry))
+
+def test_untrained_shared_dictionary():
+  compression = EntryCompression(ZIP_DEFLATED, shared_dictionary=True)
+  assert compression.needs_training
+  with pytest.raises(ValueError):
+    compression.compress(b"x")
+  with pytest.raises(ValueError):
+    EntryCompression(ZIP_STORED, shared_dictionary=True)
@@ -1,10 +1,10 @@
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, cast, Dict, List, Optional
 
 import pytest
 
 from fooddata_vegattributes.utils.indexed_jsonable_store import (
-  IndexedJsonableStore, IndexSpec
+  EntryCodec, IndexedJsonableStore, IndexSpec, ProjectionSpec, StoreFormat
 )
 
 
@@ -28,9 +28,13 @@ def sample_entries() -> List[Dict[str, Any]]:
     },
   ]
 
+@pytest.mark.parametrize("format", list(StoreFormat))
 @pytest.mark.parametrize("caching", [True, False])
 def test_write_and_read_entries_and_links(
-  sample_entries: List[Dict[str, Any]], tmp_path: Path, caching: bool
+  sample_entries: List[Dict[str, Any]],
+  tmp_path: Path,
+  caching: bool,
+  format: StoreFormat,
 ):
   path = tmp_path/"store.zip"
   with IndexedJsonableStore.from_path(
@@ -39,6 +43,7 @@ def test_write_and_read_entries_and_links(
     secondary_indices=[IndexSpec.from_dict_key("profession")],
     mode="w",
     caching=caching,
+    format=format,
   ) as store:
     # test with generator to ensure compatibility with iterables (=> no double
     # iterations)
@@ -53,6 +58,7 @@ def test_write_and_read_entries_and_links(
     secondary_indices=[IndexSpec.from_dict_key("profession")],
     mode="r",
     caching=caching,
+    format=format,
   ) as store:
     assert store.get_entry("id", "1")["name"] == "Harold"
     assert store.get_entry("id", "2")["name"] == "Olivia"
@@ -66,3 +72,372 @@ def test_write_and_read_entries_and_links(
       match="Entry for .* not in indexed JSON file"
     ):
       store.get_entry("id", "123")
+
+@pytest.mark.parametrize("format", list(StoreFormat))
+@pytest.mark.parametrize("caching", [True, False])
+def test_get_entries(
+  sample_entries: List[Dict[str, Any]],
+  tmp_path: Path,
+  caching: bool,
+  format: StoreFormat,
+):
+  path = tmp_path/"store.zip"
+  kwargs: Dict[str, Any] = dict(
+    primary_index=IndexSpec.from_dict_key("id"),
+    secondary_indices=[IndexSpec.from_dict_key("name")],
+    caching=caching,
+    format=format,
+  )
+  with IndexedJsonableStore.from_path(path, mode="w", **kwargs) as store:
+    store.put_entries(sample_entries)
+  with IndexedJsonableStore.from_path(path, mode="r", **kwargs) as store:
+    entries = store.get_entries("id", ["3", "1"])
+    assert {k: v["name"] for k, v in entries.items()} == {
+      "3": "Matthew", "1": "Harold",
+    }
+    # also works through links
+    entries = store.get_entries("name", ["Olivia", "Harold"])
+    assert {k: v["id"] for k, v in entries.items()} == {
+      "Olivia": "2", "Harold": "1",
+    }
+    assert store.get_entries("id", []) == {}
+    with pytest.raises(
+      KeyError,
+      match="Entry for .* not in indexed JSON file"
+    ):
+      store.get_entries("id", ["1", "123"])
+
+@pytest.mark.parametrize("format", list(StoreFormat))
+def test_parallel_build(
+  sample_entries: List[Dict[str, Any]],
+  tmp_path: Path,
+  format: StoreFormat,
+):
+  kwargs: Dict[str, Any] = dict(
+    primary_index=IndexSpec.from_dict_key("id"),
+    secondary_indices=[IndexSpec.from_dict_key("profession")],
+    format=format,
+  )
+  serial_path = tmp_path/"serial"
+  parallel_path = tmp_path/"parallel"
+  with IndexedJsonableStore.from_path(
+    serial_path, mode="w", **kwargs
+  ) as store:
+    store.put_entries(sample_entries)
+  with IndexedJsonableStore.from_path(
+    parallel_path, mode="w", build_jobs=2, **kwargs
+  ) as store:
+    store.put_entries(x for x in sample_entries)
+  with IndexedJsonableStore.from_path(serial_path, **kwargs) as serial, (
+    IndexedJsonableStore.from_path(parallel_path, **kwargs)
+  ) as parallel:
+    for entry in sample_entries:
+      assert parallel.get_entry("id", entry["id"]) == entry
+      assert (
+        parallel.indexable_jsonable_store.bytes_store.get_entry(
+          "id", entry["id"]
+        )
+        == serial.indexable_jsonable_store.bytes_store.get_entry(
+          "id", entry["id"]
+        )
+      )
+    assert sorted(
+      x["name"] for x in parallel.iter_entries("profession", "Accountant")
+    ) == ["Harold", "Olivia"]
+
+@pytest.mark.parametrize("format", [StoreFormat.ZIP, StoreFormat.PACKED])
+@pytest.mark.parametrize("build_jobs", [1, 2])
+def test_shared_dictionary(
+  sample_entries: List[Dict[str, Any]],
+  tmp_path: Path,
+  format: StoreFormat,
+  build_jobs: int,
+):
+  path = tmp_path/"store"
+  kwargs: Dict[str, Any] = dict(
+    primary_index=IndexSpec.from_dict_key("id"),
+    secondary_indices=[IndexSpec.from_dict_key("profession")],
+    format=format,
+  )
+  with IndexedJsonableStore.from_path(
+    path, mode="w", shared_dictionary=True, build_jobs=build_jobs, **kwargs
+  ) as store:
+    store.put_entries(x for x in sample_entries)
+    assert store.get_entry("id", "3")["name"] == "Matthew"
+  # reading detects the dictionary on its own
+  with IndexedJsonableStore.from_path(path, **kwargs) as store:
+    bytes_store = store.indexable_jsonable_store.bytes_store
+    assert bytes_store.get_compression().shared_dictionary
+    assert bytes_store.get_metadata("zdict") is not None
+    for entry in sample_entries:
+      assert store.get_entry("id", entry["id"]) == entry
+    assert sorted(
+      x["name"] for x in store.iter_entries("profession", "Accountant")
+    ) == ["Harold", "Olivia"]
+
+@pytest.mark.parametrize("format", list(StoreFormat))
+@pytest.mark.parametrize("codec", list(EntryCodec))
+def test_codecs(
+  sample_entries: List[Dict[str, Any]],
+  tmp_path: Path,
+  format: StoreFormat,
+  codec: EntryCodec,
+):
+  path = tmp_path/"store"
+  kwargs: Dict[str, Any] = dict(
+    primary_index=IndexSpec.from_dict_key("id"),
+    secondary_indices=[IndexSpec.from_dict_key("profession")],
+    format=format,
+  )
+  with IndexedJsonableStore.from_path(
+    path, mode="w", codec=codec, **kwargs
+  ) as store:
+    store.put_entries(sample_entries)
+  # the codec is picked up from the store's metadata
+  with IndexedJsonableStore.from_path(path, **kwargs) as store:
+    assert store.indexable_jsonable_store.codec == codec
+    assert store.get_entries("id", ["1", "3"]) == {
+      "1": sample_entries[0], "3": sample_entries[2],
+    }
+  other_codec = next(c for c in EntryCodec if c != codec)
+  with pytest.raises(ValueError, match="store uses codec"):
+    IndexedJsonableStore.from_path(path, codec=other_codec, **kwargs)
+
+def _professions(store: IndexedJsonableStore) -> Dict[str, List[str]]:
+  return {
+    profession: sorted(
+      cast(Dict[str, Any], x)["id"]
+      for x in store.iter_entries("profession", profession)
+    )
+    for profession in store.iter_index("profession")
+  }
+
+@pytest.mark.parametrize("format", list(StoreFormat))
+@pytest.mark.parametrize("caching", [True, False])
+def test_upsert_and_delete(
+  sample_entries: List[Dict[str, Any]],
+  tmp_path: Path,
+  caching: bool,
+  format: StoreFormat,
+):
+  path = tmp_path/"store"
+  kwargs: Dict[str, Any] = dict(
+    primary_index=IndexSpec.from_dict_key("id"),
+    secondary_indices=[IndexSpec.from_dict_key("profession")],
+    format=format,
+    caching=caching,
+  )
+  def update(store: IndexedJsonableStore):
+    store.upsert_entries([
+      {"id": "1", "name": "Harold", "profession": "Retired"},
+      {"id": "4", "name": "Ruth", "profession": "Accountant"},
+    ])
+    store.delete_entries(["3", "123"])
+    assert store.get_entry("id", "1")["profession"] == "Retired"
+    with pytest.raises(KeyError):
+      store.get_entry("id", "3")
+
+  with IndexedJsonableStore.from_path(path, mode="w", **kwargs) as store:
+    store.put_entries(sample_entries)
+    assert store.get_entry("id", "1")["name"] == "Harold"
+    # packed stores can only be modified while they're being written
+    if format == StoreFormat.PACKED:
+      update(store)
+  if format != StoreFormat.PACKED:
+    with IndexedJsonableStore.from_path(path, mode="a", **kwargs) as store:
+      update(store)
+  for compact in [False, True]:
+    if compact:
+      IndexedJsonableStore.compact(path, format=format)
+    with IndexedJsonableStore.from_path(path, **kwargs) as store:
+      assert sorted(store.iter_index("id")) == ["1", "2", "4"]
+      assert store.get_entry("id", "1")["profession"] == "Retired"
+      assert store.get_entry("id", "4")["name"] == "Ruth"
+      with pytest.raises(KeyError):
+        store.get_entry("id", "3")
+      assert _professions(store) == {
+        "Accountant": ["2", "4"], "Retired": ["1"],
+      }
+
+@pytest.mark.parametrize("format", list(StoreFormat))
+def test_bounded_memory_secondary_indices(
+  sample_entries: List[Dict[str, Any]],
+  tmp_path: Path,
+  format: StoreFormat,
+):
+  path = tmp_path/"store"
+  kwargs: Dict[str, Any] = dict(
+    primary_index=IndexSpec.from_dict_key("id"),
+    secondary_indices=[
+      IndexSpec.from_dict_key("profession"), IndexSpec.from_dict_key("name")
+    ],
+    format=format,
+  )
+  with IndexedJsonableStore.from_path(
+    path, mode="w", max_postings_in_memory=2, **kwargs
+  ) as store:
+    store.put_entries(x for x in sample_entries[:2])
+    # links from earlier calls are kept
+    store.put_entries(x for x in sample_entries[2:])
+    assert not store.auto_indexing_writer.secondary_maps["profession"]
+  with IndexedJsonableStore.from_path(path, **kwargs) as store:
+    assert [
+      x["name"] for x in store.iter_entries("profession", "Accountant")
+    ] == ["Harold", "Olivia"]
+    assert _professions(store) == {
+      "Accountant": ["1", "2"], "Former child": ["3"],
+    }
+    assert store.get_entry("name", "Matthew")["id"] == "3"
+
+@pytest.mark.parametrize("format", list(StoreFormat))
+@pytest.mark.parametrize("max_postings_in_memory", [None, 2])
+def test_put_entries_after_reopening(
+  sample_entries: List[Dict[str, Any]],
+  tmp_path: Path,
+  max_postings_in_memory: Optional[int],
+  format: StoreFormat,
+):
+  path = tmp_path/"store"
+  kwargs: Dict[str, Any] = dict(
+    primary_index=IndexSpec.from_dict_key("id"),
+    secondary_indices=[IndexSpec.from_dict_key("profession")],
+    format=format,
+    max_postings_in_memory=max_postings_in_memory,
+  )
+  new_entry = {"id": "4", "name": "Ruth", "profession": "Accountant"}
+  with IndexedJsonableStore.from_path(path, mode="w", **kwargs) as store:
+    store.put_entries(sample_entries)
+    # packed stores can only be modified while they're being written
+    if format == StoreFormat.PACKED:
+      store.put_entries([new_entry])
+  if format != StoreFormat.PACKED:
+    with IndexedJsonableStore.from_path(path, mode="a", **kwargs) as store:
+      store.put_entries([new_entry])
+  with IndexedJsonableStore.from_path(path, **kwargs) as store:
+    assert store.get_primary_values("profession", "Accountant") == [
+      "1", "2", "4"
+    ]
+    assert _professions(store) == {
+      "Accountant": ["1", "2", "4"], "Former child": ["3"],
+    }
+
+@pytest.mark.parametrize("format", list(StoreFormat))
+@pytest.mark.parametrize("caching", [True, False])
+def test_range_and_prefix(
+  sample_entries: List[Dict[str, Any]],
+  tmp_path: Path,
+  caching: bool,
+  format: StoreFormat,
+):
+  path = tmp_path/"store"
+  kwargs: Dict[str, Any] = dict(
+    primary_index=IndexSpec.from_dict_key("id"),
+    secondary_indices=[IndexSpec.from_dict_key("name")],
+    caching=caching,
+    format=format,
+  )
+  more_entries = [
+    {"id": "10", "name": "Mabel", "profession": "Accountant"},
+    {"id": "21", "name": "Harriet", "profession": "Accountant"},
+  ]
+  with IndexedJsonableStore.from_path(path, mode="w", **kwargs) as store:
+    store.put_entries(sample_entries + more_entries)
+    assert list(store.iter_prefix("id", "1")) == ["1", "10"]
+  with IndexedJsonableStore.from_path(path, **kwargs) as store:
+    assert list(store.iter_range("id", "10", "3")) == ["10", "2", "21"]
+    assert list(store.iter_range("id", lo="20")) == ["21", "3"]
+    assert list(store.iter_range("id", hi="10")) == ["1"]
+    assert list(store.iter_prefix("id", "2")) == ["2", "21"]
+    assert list(store.iter_prefix("name", "Ha")) == ["Harold", "Harriet"]
+    assert list(store.iter_range("name", "M", "N")) == ["Mabel", "Matthew"]
+    assert list(store.iter_prefix("name", "X")) == []
+
+@pytest.mark.parametrize("format", list(StoreFormat))
+@pytest.mark.parametrize("max_postings_in_memory", [None, 2])
+def test_multi_valued_index(
+  sample_entries: List[Dict[str, Any]],
+  tmp_path: Path,
+  format: StoreFormat,
+  max_postings_in_memory: Optional[int],
+):
+  path = tmp_path/"store"
+  kwargs: Dict[str, Any] = dict(
+    primary_index=IndexSpec.from_dict_key("id"),
+    secondary_indices=[
+      IndexSpec(
+        "word",
+        lambda x: f"{x['name']} {x['profession']}".lower().split(),
+        multi_valued=True,
+      ),
+    ],
+    format=format,
+  )
+  with IndexedJsonableStore.from_path(
+    path, mode="w", max_postings_in_memory=max_postings_in_memory, **kwargs
+  ) as store:
+    store.put_entries(sample_entries)
+  with IndexedJsonableStore.from_path(path, **kwargs) as store:
+    assert sorted(store.iter_index("word")) == [
+      "accountant", "child", "former", "harold", "matthew", "olivia",
+    ]
+    assert store.get_primary_values("word", "accountant") == ["1", "2"]
+    assert store.get_primary_values("word", "nonexistent") == []
+    assert store.intersect("word", ["accountant", "olivia"]) == ["2"]
+    assert store.intersect("word", ["accountant", "child"]) == []
+    assert store.intersect("word", ["accountant"]) == ["1", "2"]
+    assert store.intersect("word", []) == []
+
+def test_multi_valued_primary_index(tmp_path: Path):
+  with pytest.raises(ValueError, match="multi-valued"):
+    IndexedJsonableStore.from_path(
+      tmp_path/"store",
+      primary_index=IndexSpec("id", lambda x: [x["id"]], multi_valued=True),
+      secondary_indices=[],
+      mode="w",
+    )
+
+@pytest.mark.parametrize("format", list(StoreFormat))
+@pytest.mark.parametrize("max_postings_in_memory", [None, 2])
+def test_projections(
+  sample_entries: List[Dict[str, Any]],
+  tmp_path: Path,
+  format: StoreFormat,
+  max_postings_in_memory: Optional[int],
+):
+  path = tmp_path/"store"
+  kwargs: Dict[str, Any] = dict(
+    primary_index=IndexSpec.from_dict_key("id"),
+    secondary_indices=[IndexSpec.from_dict_key("profession")],
+    projections=[ProjectionSpec("name-only", lambda x: {"name": x["name"]})],
+    format=format,
+  )
+  with IndexedJsonableStore.from_path(
+    path, mode="w", max_postings_in_memory=max_postings_in_memory, **kwargs
+  ) as store:
+    store.put_entries(sample_entries[:2])
+    store.put_entries(sample_entries[2:])
+  with IndexedJsonableStore.from_path(path, **kwargs) as store:
+    assert store.get_entries("name-only", ["1", "3"]) == {
+      "1": {"name": "Harold"},
+      "3": {"name": "Matthew"},
+    }
+    assert list(
+      store.iter_projected_entries("name-only", "profession", "Accountant")
+    ) == [{"name": "Harold"}, {"name": "Olivia"}]
+    assert list(store.iter_projected_entries("name-only", "id", "2")) == [
+      {"name": "Olivia"},
+    ]
+  if format == StoreFormat.PACKED:
+    # packed stores can't be modified after the fact
+    return
+  with IndexedJsonableStore.from_path(path, mode="a", **kwargs) as store:
+    store.upsert_entries(
+      [{"id": "1", "name": "Harry", "profession": "Accountant"}]
+    )
+    store.delete_entries(["2"])
+  with IndexedJsonableStore.from_path(path, **kwargs) as store:
+    assert list(
+      store.iter_projected_entries("name-only", "profession", "Accountant")
+    ) == [{"name": "Harry"}]
+    with pytest.raises(KeyError):
+      store.get_entry("name-only", "2")
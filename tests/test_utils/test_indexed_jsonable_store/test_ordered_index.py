@@ -0,0 +1,24 @@
+import sys
+
+from fooddata_vegattributes.utils.indexed_jsonable_store.ordered_index import (
+  iter_sorted_range,
+  prefix_range,
+)
+
+
+def test_iter_sorted_range():
+  values = ["a", "b", "ba", "c", "d"]
+  assert list(iter_sorted_range(values, "b", "c")) == ["b", "ba"]
+  assert list(iter_sorted_range(values, "bb", None)) == ["c", "d"]
+  assert list(iter_sorted_range(values, None, "b")) == ["a"]
+  assert list(iter_sorted_range(values, None, None)) == values
+  assert list(iter_sorted_range(values, "x", "y")) == []
+  assert list(iter_sorted_range(values, "c", "a")) == []
+
+def test_prefix_range():
+  assert prefix_range("5") == ("5", "6")
+  assert prefix_range("Chees") == ("Chees", "Cheet")
+  assert prefix_range("") == ("", None)
+  max_char = chr(sys.maxunicode)
+  assert prefix_range(f"a{max_char}") == (f"a{max_char}", "b")
+  assert prefix_range(max_char) == (max_char, None)
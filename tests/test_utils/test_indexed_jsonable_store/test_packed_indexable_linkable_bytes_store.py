@@ -0,0 +1,101 @@
+from pathlib import Path
+from typing import Dict
+from zipfile import ZIP_STORED
+
+import pytest
+
+from fooddata_vegattributes.utils.indexed_jsonable_store \
+.packed_indexable_linkable_bytes_store import (
+  BadPackedFile,
+  PackedIndexableLinkableBytesStore,
+)
+
+
+@pytest.fixture()
+def sample_entries_by_id() -> Dict[str, bytes]:
+  return {"1": b"hello", "2": b"world", "3": b"!"}
+
+def test_write_and_read_entries(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  path = tmp_path/"store.packed"
+  with PackedIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    # test with generator to ensure compatibility with iterables (=> no double
+    # iterations)
+    store.put_entries("id", (x for x in sample_entries_by_id.items()))
+    # test reading back without re-opening
+    assert store.get_entry("id", "1") == b"hello"
+    assert store.get_entry("id", "2") == b"world"
+  # test reading back after re-opening
+  with PackedIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    assert store.get_entry("id", "1") == b"hello"
+    assert store.get_entry("id", "2") == b"world"
+    assert sorted(list(store.iter_index("id"))) == ["1", "2", "3"]
+    with pytest.raises(KeyError):
+      store.get_entry("id", "4")
+
+def test_links(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  path = tmp_path/"store.packed"
+  with PackedIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", sample_entries_by_id.items())
+    category_links = {
+      "word": [("id", "1"), ("id", "2")],
+      "punctuation": [("id", "3")],
+    }
+    # test with generator to ensure compatibility with iterables
+    store.put_links("category", (x for x in category_links.items()))
+  # test reading back after re-opening
+  with PackedIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    words = store.iter_entries("category", "word")
+    assert sorted(words) == [b"hello", b"world"]
+    assert store.get_entry("category", "punctuation") == b"!"
+    categories = list(store.iter_index("category"))
+    assert sorted(categories) == ["punctuation", "word"]
+
+def test_uncompressed_entries_are_views(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  path = tmp_path/"store.packed"
+  with PackedIndexableLinkableBytesStore.from_path(
+    path, mode="w", compression=ZIP_STORED
+  ) as store:
+    store.put_entries("id", sample_entries_by_id.items())
+  with PackedIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    entry = store.get_entry("id", "2")
+    assert isinstance(entry, memoryview)
+    assert entry == b"world"
+    entry.release()
+
+def test_malformed_file(tmp_path: Path):
+  path = tmp_path/"store.packed"
+  path.write_bytes(b"definitely not a packed store")
+  with pytest.raises(BadPackedFile):
+    PackedIndexableLinkableBytesStore.from_path(path, mode="r")
+
+def test_truncated_or_corrupt_file(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  path = tmp_path/"store.packed"
+  with PackedIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", sample_entries_by_id.items())
+    store.put_links("category", [("word", [("id", "1"), ("id", "2")])])
+  data = path.read_bytes()
+  toc_offset = int.from_bytes(data[-24:-16], "little")
+  corrupted = [
+    # shorter than the footer
+    data[:12],
+    # footer intact, but the table of contents is gone
+    data[:8] + data[-24:],
+    # table of contents isn't valid UTF-8/JSON
+    data[:toc_offset] + b"\xff" * (len(data) - toc_offset - 24) + data[-24:],
+    # table of contents is valid JSON, but not what it should be
+    data[:toc_offset] + b"[]".ljust(len(data) - toc_offset - 24)
+    + data[-24:],
+  ]
+  for i, corrupted_data in enumerate(corrupted):
+    corrupted_path = tmp_path/f"corrupted-{i}.packed"
+    corrupted_path.write_bytes(corrupted_data)
+    with pytest.raises(BadPackedFile):
+      PackedIndexableLinkableBytesStore.from_path(corrupted_path, mode="r")
@@ -0,0 +1,91 @@
+from pathlib import Path
+import sqlite3
+from typing import Dict
+
+import pytest
+
+from fooddata_vegattributes.utils.indexed_jsonable_store \
+.sqlite_indexable_linkable_bytes_store import (
+  SqliteIndexableLinkableBytesStore
+)
+
+
+@pytest.fixture()
+def sample_entries_by_id() -> Dict[str, bytes]:
+  return {"1": b"hello", "2": b"world", "3": b"!"}
+
+def test_write_and_read_entries(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  path = tmp_path/"store.sqlite"
+  with SqliteIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    # test with generator to ensure compatibility with iterables (=> no double
+    # iterations)
+    store.put_entries("id", (x for x in sample_entries_by_id.items()))
+    # test reading back without re-opening
+    assert store.get_entry("id", "1") == b"hello"
+    assert store.get_entry("id", "2") == b"world"
+  # test reading back after re-opening
+  with SqliteIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    assert store.get_entry("id", "1") == b"hello"
+    assert store.get_entry("id", "2") == b"world"
+    assert sorted(list(store.iter_index("id"))) == ["1", "2", "3"]
+    with pytest.raises(KeyError):
+      store.get_entry("id", "4")
+
+def test_links(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  path = tmp_path/"store.sqlite"
+  with SqliteIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", sample_entries_by_id.items())
+    category_links = {
+      "word": [("id", "1"), ("id", "2")],
+      "punctuation": [("id", "3")],
+    }
+    # test with generator to ensure compatibility with iterables
+    store.put_links("category", (x for x in category_links.items()))
+  # test reading back after re-opening
+  with SqliteIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    words = store.iter_entries("category", "word")
+    assert sorted(words) == [b"hello", b"world"]
+    assert store.get_entry("category", "punctuation") == b"!"
+    categories = list(store.iter_index("category"))
+    assert sorted(categories) == ["punctuation", "word"]
+    # missing links raise like in the other stores instead of yielding nothing
+    with pytest.raises(KeyError):
+      list(store.iter_entries("category", "emoji"))
+    with pytest.raises(KeyError):
+      store.get_entries("category", ["punctuation", "emoji"])
+    assert store.get_entries("category", ["punctuation"]) == {
+      "punctuation": b"!"
+    }
+
+def test_incremental_update(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  path = tmp_path/"store.sqlite"
+  with SqliteIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", sample_entries_by_id.items())
+    store.put_links("category", [("word", [("id", "1"), ("id", "2")])])
+  # update in place without rewriting the rest
+  with SqliteIndexableLinkableBytesStore.from_path(path, mode="a") as store:
+    store.put_entries("id", [("2", b"there"), ("4", b"?")])
+    store.put_links("category", [("word", [("id", "1"), ("id", "4")])])
+  with SqliteIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    assert store.get_entry("id", "2") == b"there"
+    assert store.get_entry("id", "3") == b"!"
+    assert sorted(store.iter_entries("category", "word")) == [b"?", b"hello"]
+    assert sorted(store.iter_index("id")) == ["1", "2", "3", "4"]
+
+def test_missing_file(tmp_path: Path):
+  with pytest.raises(FileNotFoundError):
+    SqliteIndexableLinkableBytesStore.from_path(
+      tmp_path/"store.sqlite", mode="r"
+    )
+
+def test_malformed_file(tmp_path: Path):
+  path = tmp_path/"store.sqlite"
+  path.write_bytes(b"definitely not an SQLite database")
+  with pytest.raises(sqlite3.DatabaseError):
+    SqliteIndexableLinkableBytesStore.from_path(path, mode="r")
@@ -1,10 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
 from pathlib import Path
 from typing import Dict
+from zipfile import ZIP_BZIP2, ZipFile
 
 import pytest
 
 from fooddata_vegattributes.utils.indexed_jsonable_store \
-.zipped_indexable_linkable_bytes_store import ZippedIndexableLinkableBytesStore
+.precompressed_entry import precompress_entry
+from fooddata_vegattributes.utils.indexed_jsonable_store \
+.pread_zip_member import can_pread_zip_member, pread_zip_member
+from fooddata_vegattributes.utils.indexed_jsonable_store \
+.zipped_indexable_linkable_bytes_store import (
+  LINKS_PER_SHARD,
+  ZippedIndexableLinkableBytesStore,
+)
 
 
 @pytest.fixture()
@@ -47,3 +57,198 @@ def test_links(
     assert store.get_entry("category", "punctuation") == b"!"
     categories = list(store.iter_index("category"))
     assert sorted(categories) == ["punctuation", "word"]
+
+def test_manifest(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  path = tmp_path/"store.zip"
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", sample_entries_by_id.items())
+    store.put_links("category", [("word", [("id", "1"), ("id", "2")])])
+    # manifest is kept up to date while writing
+    assert store.manifest.has_data_entry("id", "3")
+    assert store.manifest.is_link_index("category")
+  # and rebuilt from the member list when re-opening
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    assert store.manifest.is_data_index("id")
+    assert not store.manifest.is_link_index("id")
+    assert store.manifest.is_link_index("category")
+    assert not store.manifest.is_data_index("category")
+    assert not store.manifest.has_data_entry("id", "4")
+    assert sorted(store.manifest.iter_data_index("id")) == ["1", "2", "3"]
+
+def test_iter_index_in_archive_order(tmp_path: Path):
+  path = tmp_path/"store.zip"
+  ids = [str(i) for i in [30, 4, 100, 17, 2, 56, 8]]
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", [(i, i.encode()) for i in ids])
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    assert list(store.iter_index("id")) == ids
+
+def test_concurrent_reads(tmp_path: Path):
+  path = tmp_path/"store.zip"
+  entries_by_id = {
+    str(i): f"entry {i}".encode() * (i % 7 + 1) for i in range(500)
+  }
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", entries_by_id.items())
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    with ThreadPoolExecutor(max_workers=8) as executor:
+      results = list(executor.map(
+        lambda i: store.get_entry("id", i), list(entries_by_id) * 4
+      ))
+  assert results == list(entries_by_id.values()) * 4
+
+def test_pread_unsupported_compression(tmp_path: Path):
+  path = tmp_path/"store.zip"
+  with ZipFile(path, "w", compression=ZIP_BZIP2) as zipfile:
+    zipfile.writestr("member", b"hello")
+  with ZipFile(path) as zipfile, path.open("rb") as f:
+    info = zipfile.getinfo("member")
+    assert not can_pread_zip_member(info)
+    with pytest.raises(ValueError):
+      pread_zip_member(f.fileno(), info)
+
+def test_precompressed_entries(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  normal_path = tmp_path/"normal.zip"
+  precompressed_path = tmp_path/"precompressed.zip"
+  with (
+    ZippedIndexableLinkableBytesStore.from_path(normal_path, mode="w")
+  ) as store:
+    store.put_entries("id", sample_entries_by_id.items())
+  with (
+    ZippedIndexableLinkableBytesStore.from_path(precompressed_path, mode="w")
+  ) as store:
+    store.put_precompressed_entries("id", (
+      (k, precompress_entry(v, store.get_compression()))
+      for k, v in sample_entries_by_id.items()
+    ))
+    # test reading back without re-opening
+    assert store.get_entry("id", "1") == b"hello"
+  with ZipFile(normal_path) as normal, ZipFile(precompressed_path) as pre:
+    assert pre.testzip() is None
+    for normal_info, pre_info in zip(normal.infolist(), pre.infolist()):
+      assert normal_info.filename == pre_info.filename
+      assert normal_info.CRC == pre_info.CRC
+      assert normal_info.compress_size == pre_info.compress_size
+      assert normal.read(normal_info) == pre.read(pre_info)
+  with (
+    ZippedIndexableLinkableBytesStore.from_path(precompressed_path, mode="r")
+  ) as store:
+    assert store.get_entry("id", "2") == b"world"
+    assert sorted(store.iter_index("id")) == ["1", "2", "3"]
+
+def test_sharded_links(tmp_path: Path):
+  path = tmp_path/"store.zip"
+  n = 3 * LINKS_PER_SHARD + 1
+  entries_by_id = {str(i): f"entry {i}".encode() for i in range(n)}
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", entries_by_id.items())
+    store.put_links(
+      "name", ((f"name {i}", [("id", i)]) for i in entries_by_id)
+    )
+    # putting links again before closing doesn't write them twice
+    store.put_links("name", [("name 0", [("id", "1")])])
+    assert store.get_entry("name", "name 0") == b"entry 1"
+  with ZipFile(path) as zipfile:
+    names = zipfile.namelist()
+  assert len(names) == len(set(names))
+  assert sum(name.startswith("by-name/links/0/") for name in names) == 5
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="a") as store:
+    store.put_links(
+      "name", [("name 2", [("id", "3")]), ("new", [("id", "5")])]
+    )
+  with ZipFile(path) as zipfile:
+    names = zipfile.namelist()
+  assert len(names) == len(set(names))
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    assert store.manifest.link_generations["name"] == 1
+    assert store.get_entry("name", "name 0") == b"entry 1"
+    assert store.get_entry("name", "name 2") == b"entry 3"
+    assert store.get_entry("name", "new") == b"entry 5"
+    last = n - 1
+    assert store.get_entry("name", f"name {last}") == f"entry {last}".encode()
+    assert len(list(store.iter_index("name"))) == n + 1
+    with pytest.raises(KeyError):
+      store.get_entry("name", "a value sorting before all others")
+    with pytest.raises(KeyError):
+      store.get_entry("name", "name 1x")
+
+def test_legacy_links(tmp_path: Path):
+  path = tmp_path/"store.zip"
+  with ZipFile(path, "w") as zipfile:
+    zipfile.writestr("by-id/data/1", b"hello")
+    zipfile.writestr("by-word/links.json", json.dumps({"hi": [["id", "1"]]}))
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    assert store.get_entry("word", "hi") == b"hello"
+    assert list(store.iter_index("word")) == ["hi"]
+
+def test_update_and_compact(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  path = tmp_path/"store.zip"
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", sample_entries_by_id.items())
+    store.put_links("category", [("word", [("id", "1"), ("id", "2")])])
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="a") as store:
+    store.put_entries("id", [("1", b"hi")])
+    store.delete_entries("id", ["2", "123"])
+    store.put_links("category", [("word", [("id", "1")])])
+    store.delete_links("category", ["word", "123"])
+    assert store.get_entry("id", "1") == b"hi"
+    with pytest.raises(KeyError):
+      store.get_entry("id", "2")
+    assert list(store.iter_index("category")) == []
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="a") as store:
+    # deleted entries can come back
+    store.put_entries("id", [("2", b"again")])
+    store.put_links("category", [("word", [("id", "2")])])
+  size_before = path.stat().st_size
+  ZippedIndexableLinkableBytesStore.compact(path)
+  assert path.stat().st_size < size_before
+  with ZipFile(path) as zipfile:
+    names = zipfile.namelist()
+  assert len(names) == len(set(names))
+  assert not any("/deleted/" in name for name in names)
+  assert not any(name.startswith("by-category/links/0/") for name in names)
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    assert store.get_entry("id", "1") == b"hi"
+    assert store.get_entry("id", "2") == b"again"
+    assert store.get_entry("id", "3") == b"!"
+    assert store.get_entry("category", "word") == b"again"
+
+def test_sorted_links(
+  sample_entries_by_id: Dict[str, bytes], tmp_path: Path
+):
+  path = tmp_path/"store.zip"
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", sample_entries_by_id.items())
+    store.put_sorted_links(
+      "reversed", ((str(9 - int(i)), [("id", i)]) for i in ["3", "2", "1"])
+    )
+    # written right away rather than on close
+    assert store.manifest.link_generations["reversed"] == 0
+    with pytest.raises(ValueError, match="sorted"):
+      store.put_sorted_links("unsorted", [("b", []), ("a", [])])
+    # indices that already have links are merged
+    store.put_sorted_links("reversed", [("9", [("id", "1")])])
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    assert sorted(store.iter_index("reversed")) == ["6", "7", "8", "9"]
+    assert store.get_entry("reversed", "6") == b"!"
+    assert store.get_entry("reversed", "9") == b"hello"
+
+def test_sharded_link_range(tmp_path: Path):
+  path = tmp_path/"store.zip"
+  values = [f"{i:04}" for i in range(3 * LINKS_PER_SHARD)]
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="w") as store:
+    store.put_entries("id", [("1", b"x")])
+    store.put_links("code", ((v, [("id", "1")]) for v in values))
+  with ZippedIndexableLinkableBytesStore.from_path(path, mode="r") as store:
+    lo, hi = LINKS_PER_SHARD - 5, 2 * LINKS_PER_SHARD + 5
+    assert list(store.iter_range("code", values[lo], values[hi])) == (
+      values[lo:hi]
+    )
+    assert list(store.iter_prefix("code", "00")) == values[:100]
+    assert list(store.iter_range("code")) == values
@@ -3,6 +3,7 @@ from typing import Any, Dict
 
 import pytest
 
+from fooddata_vegattributes.utils.indexed_jsonable_store import StoreFormat
 from fooddata_vegattributes.utils.indexed_jsonable_store \
 .zipped_indexable_linkable_jsonable_store import (
   ZippedIndexableLinkableJsonableStore
@@ -13,13 +14,17 @@ from fooddata_vegattributes.utils.indexed_jsonable_store \
 def sample_entries_by_id() -> Dict[str, Any]:
   return {"1": [1,2,3], "2": "hello", "3": [4, 5]}
 
+@pytest.mark.parametrize("format", list(StoreFormat))
 @pytest.mark.parametrize("caching", [True, False])
 def test_write_and_read_entries(
-  sample_entries_by_id: Dict[str, Any], tmp_path: Path, caching: bool
+  sample_entries_by_id: Dict[str, Any],
+  tmp_path: Path,
+  caching: bool,
+  format: StoreFormat,
 ):
   path = tmp_path/"store.zip"
   with ZippedIndexableLinkableJsonableStore.from_path(
-    path, mode="w", caching=caching
+    path, mode="w", caching=caching, format=format
   ) as store:
     # test with generator to ensure compatibility with iterables (=> no double
     # iterations)
@@ -29,19 +34,23 @@ def test_write_and_read_entries(
     assert store.get_entry("id", "2") == "hello"
   # test reading back after re-opening
   with ZippedIndexableLinkableJsonableStore.from_path(
-    path, mode="r", caching=caching
+    path, mode="r", caching=caching, format=format
   ) as store:
     assert store.get_entry("id", "1") == [1,2,3]
     assert store.get_entry("id", "2") == "hello"
     assert sorted(list(store.iter_index("id"))) == ["1", "2", "3"]
 
+@pytest.mark.parametrize("format", list(StoreFormat))
 @pytest.mark.parametrize("caching", [True, False])
 def test_links(
-  sample_entries_by_id: Dict[str, Any], tmp_path: Path, caching: bool
+  sample_entries_by_id: Dict[str, Any],
+  tmp_path: Path,
+  caching: bool,
+  format: StoreFormat,
 ):
   path = tmp_path/"store.zip"
   with ZippedIndexableLinkableJsonableStore.from_path(
-    path, mode="w", caching=caching
+    path, mode="w", caching=caching, format=format
   ) as store:
     store.put_entries("id", sample_entries_by_id.items())
     category_links = {
@@ -52,7 +61,7 @@ def test_links(
     store.put_links("category", (x for x in category_links.items()))
   # test reading back after re-opening
   with ZippedIndexableLinkableJsonableStore.from_path(
-    path, mode="r", caching=caching
+    path, mode="r", caching=caching, format=format
   ) as store:
     numbers = store.iter_entries("category", "numbers")
     assert sorted(numbers) == [[1, 2, 3], [4, 5]]
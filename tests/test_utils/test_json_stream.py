@@ -0,0 +1,81 @@
+from io import StringIO
+import json
+from pathlib import Path
+
+import pytest
+
+from fooddata_vegattributes.utils.json_stream import (
+  iter_json_array_member,
+  iter_json_array_members_parallel,
+)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1 << 16])
+def test_iter_json_array_member(chunk_size: int):
+  doc = {
+    "before": {"nested": [1, 2, {"SurveyFoods": "decoy"}]},
+    "SurveyFoods": [
+      {"fdcId": 1, "description": "Tea, \"black\" ☕"},
+      12345,
+      -1.5e3,
+      "str",
+      None,
+      [],
+    ],
+    "after": True,
+  }
+  for indent in [None, 2]:
+    f = StringIO(json.dumps(doc, indent=indent))
+    assert list(
+      iter_json_array_member(f, "SurveyFoods", chunk_size=chunk_size)
+    ) == doc["SurveyFoods"]
+
+def test_iter_json_array_member_is_lazy():
+  f = StringIO('{"a": [{"x": 1}, {"x": 2}, oops]}')
+  items = iter_json_array_member(f, "a", chunk_size=1)
+  assert next(items) == {"x": 1}
+  assert next(items) == {"x": 2}
+  with pytest.raises(ValueError):
+    next(items)
+
+@pytest.mark.parametrize(
+  "s", ['{"a": []}', '{"b": {}, "a": [], "c": 1}'],
+)
+def test_iter_json_array_member_missing_or_empty(s: str):
+  assert list(iter_json_array_member(StringIO(s), "a")) == []
+  with pytest.raises(KeyError):
+    list(iter_json_array_member(StringIO(s), "d"))
+
+@pytest.mark.parametrize("jobs", [1, 2])
+@pytest.mark.parametrize("chunk_bytes", [1, 10, 100, 1 << 20])
+@pytest.mark.parametrize("indent", [None, 1])
+def test_iter_json_array_members_parallel(
+  tmp_path: Path, jobs: int, chunk_bytes: int, indent: int
+):
+  a_items = [
+    # strings that look like item boundaries must not confuse chunking
+    {"id": i, "s": ", {\"id\": -1}," * (i % 3), "ü": "€" * i}
+    for i in range(30)
+  ]
+  a_path = tmp_path/"a.json"
+  a_path.write_text(
+    json.dumps({"x": {"y": [{}]}, "a": a_items, "z": [{}]}, indent=indent),
+    encoding="utf-8",
+  )
+  b_path = tmp_path/"b.json"
+  b_path.write_text(json.dumps({"b": [{"id": 1}]}), encoding="utf-8")
+  empty_path = tmp_path/"empty.json"
+  empty_path.write_text(json.dumps({"c": []}), encoding="utf-8")
+  assert list(
+    iter_json_array_members_parallel(
+      [(a_path, "a"), (empty_path, "c"), (b_path, "b")],
+      jobs=jobs,
+      chunk_bytes=chunk_bytes,
+    )
+  ) == a_items + [{"id": 1}]
+  with pytest.raises(KeyError):
+    list(
+      iter_json_array_members_parallel(
+        [(b_path, "a")], jobs=jobs, chunk_bytes=chunk_bytes
+      )
+    )
@@ -0,0 +1,18 @@
+import pytest
+
+from fooddata_vegattributes.utils.parallel_map import ordered_parallel_map
+
+
+def square(x: int) -> int:
+  return x * x
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_ordered_parallel_map(jobs: int):
+  # generator to ensure the input is only iterated once
+  results = ordered_parallel_map(
+    square, (x for x in range(1000)), jobs=jobs, chunk_size=7
+  )
+  assert list(results) == [x * x for x in range(1000)]
+
+def test_ordered_parallel_map_empty():
+  assert list(ordered_parallel_map(square, [], jobs=2)) == []
@@ -0,0 +1,36 @@
+import pytest
+
+from fooddata_vegattributes.utils.parsing import (
+  MaxiMunchTokenFinder,
+  TrieTokenFinder,
+  tokenize_words,
+)
+
+
+def test_tokenize_words():
+  assert tokenize_words("Cheese, Cheddar (2% fat) crème_fraîche") == [
+    "cheese", "cheddar", "2", "fat", "crème", "fraîche",
+  ]
+  assert tokenize_words(" ,; ") == []
+
+@pytest.mark.parametrize("s", [
+  "",
+  "cheese",
+  "cream cheese, cheesecake with creamy milk",
+  "cheesecheesecake",
+  "milkshake and milk",
+  "ham, hamburger, hamburg",
+  "xyz",
+])
+def test_trie_token_finder_matches_regex(s: str):
+  tokens = [
+    "cheese", "cheesecake", "cream", "creamy", "milk", "milkshake", "ham",
+    "hamburger", "burger", "cake",
+  ]
+  assert TrieTokenFinder(tokens).find_all(s) == (
+    MaxiMunchTokenFinder(tokens).find_all(s)
+  )
+
+def test_trie_token_finder_rejects_empty_tokens():
+  with pytest.raises(ValueError):
+    TrieTokenFinder(["milk", ""])
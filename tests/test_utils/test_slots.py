@@ -0,0 +1,48 @@
+from dataclasses import dataclass, field, FrozenInstanceError
+import pickle
+from typing import Optional
+
+import pytest
+
+from fooddata_vegattributes.utils.slots import add_slots
+
+
+@add_slots
+@dataclass(frozen=True)
+class Point:
+  x: int
+  y: int
+  label: Optional[str] = None
+
+def test_add_slots():
+  p = Point(1, 2)
+  assert p.label is None
+  assert not hasattr(p, "__dict__")
+  with pytest.raises(FrozenInstanceError):
+    p.x = 3  # type: ignore[misc]
+  with pytest.raises(AttributeError):
+    object.__setattr__(p, "z", 3)
+  assert pickle.loads(pickle.dumps(Point(1, 2, "a"))) == Point(1, 2, "a")
+
+@add_slots
+@dataclass(frozen=True)
+class Segment:
+  start: int
+  end: int
+  length: int = field(init=False, compare=False)
+
+  def __post_init__(self):
+    object.__setattr__(self, "length", self.end - self.start)
+
+def test_add_slots_derived_fields():
+  segment = Segment(1, 4)
+  assert segment.length == 3
+  # derived fields aren't pickled, but derived again
+  assert segment.__getstate__() == (1, 4)
+  unpickled = pickle.loads(pickle.dumps(segment))
+  assert unpickled == segment
+  assert unpickled.length == 3
+
+def test_add_slots_requires_dataclass():
+  with pytest.raises(TypeError):
+    add_slots(int)
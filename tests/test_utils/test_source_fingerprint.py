@@ -0,0 +1,25 @@
+import os
+from pathlib import Path
+
+from fooddata_vegattributes.utils.source_fingerprint import SourceFingerprint
+
+
+def test_source_fingerprint(tmp_path: Path):
+  path = tmp_path/"source.json"
+  path.write_text("abc")
+  fingerprint = SourceFingerprint.from_path(path)
+  assert SourceFingerprint.from_dict(fingerprint.to_dict()) == fingerprint
+  assert fingerprint.matches(path)
+  # same size and mtime => assumed unchanged without reading the file
+  path.write_text("abd")
+  os.utime(path, ns=(0, fingerprint.mtime_ns))
+  assert fingerprint.matches(path)
+  # touched, even if unchanged
+  path.write_text("abc")
+  os.utime(path, ns=(0, fingerprint.mtime_ns + 10**9))
+  assert not fingerprint.matches(path)
+  path.write_text("abcd")
+  os.utime(path, ns=(0, fingerprint.mtime_ns))
+  assert not fingerprint.matches(path)
+  path.unlink()
+  assert not fingerprint.matches(path)